@@ -8,8 +8,29 @@ The functionality is similar to the ``pylhc_submitter.job_submitter`` in that th
 is used to automatically create a set of job-directories to gather the data.
 To avoid conflicts, each of these job-directories is a ``SixDesk`` workspace,
 meaning there can be only one study per directory.
+The workspaces are copied from a pristine template workspace (in ``.autosix_template``),
+which is created via ``SixDesk`` only once per ``working_directory``.
 Beware that the ``max_materialize`` limit is set for each of these workspaces
 individually, not for all Jobs together (i.e. it should be <=MAX_USER_JOBS / NUMBER_OF_WORKSPACES).
+Alternatively, ``max_materialize_total`` sets a limit for all workspaces together,
+which is distributed among the tracking workspaces, weighted by their number of unfinished jobs.
+This distribution is updated at the end of each run (and regularly in ``watch`` mode),
+so the budget of the finished workspaces is given to the others.
+New workspaces are submitted with an equal share of the budget, which is taken from the others
+and balanced again right after the submission.
+
+The stages of the workspaces are run one workspace after another, unless ``parallel_workspaces``
+is set, in which case the stages of that many workspaces are advanced at the same time.
+The workspaces ready for post-processing are then post-processed at once, reading their
+databases concurrently and creating their polar plots in that many parallel processes.
+In both cases, the log of each workspace is also written into its own file
+in the ``autosix_logs`` folder of the ``working_directory``.
+
+Usually, autosix stops after the input-generation and the tracking jobs have been submitted
+and needs to be restarted once they have finished.
+In ``watch`` mode, autosix keeps running instead and checks the scheduler queue every
+``watch_interval`` seconds. The next stages of a workspace are run as soon as
+none of its jobs are in the queue anymore, until all workspaces are done (or failed).
 
 The ``replace_dict`` contains variables for your mask as well as variables for the SixDesk environment.
 See the description of ``replace_dict`` below.
@@ -95,7 +116,8 @@ Arguments:
 
 - **da_turnstep** *(int)*:
 
-    Step between turns used in DA-vs-Turns plot.
+    Step between turns used in DA-vs-Turns plot. Only used with
+    ``native_sixdb``.
 
     default: ``100``
 
@@ -114,13 +136,31 @@ Arguments:
     keys.
 
 
+- **full_lock_scan**:
+
+    Look for SixDesk locks in the whole workspace, including the ``track``
+    directory tree. Otherwise only the directories locked by SixDesk are
+    checked, which is much faster.
+
+    action: ``store_true``
+
+
 - **max_materialize** *(int)*:
 
     Maximum jobs to be materialized in scheduler (per SixDesk Workspace!)..
     Here: ``None`` leaves the settings as defined in the SixDesk
     htcondor_run_six.sub template and ``0`` removes it from the template.
-    Warning: This setting modifies the template in the ``sixdesk_directory``
-    permanently. For more details see the htcondor API.
+    The template is modified in a copy for each workspace, the
+    ``sixdesk_directory`` itself is not changed. For more details see the
+    htcondor API.
+
+
+- **max_materialize_total** *(int)*:
+
+    Maximum jobs to be materialized in scheduler for all SixDesk
+    Workspaces together. The budget is distributed among the workspaces
+    by their number of unfinished jobs. Cannot be used together with
+    ``max_materialize``.
 
 
 - **max_stage** *(str)*:
@@ -128,6 +168,24 @@ Arguments:
     Last stage to be run. All following stages are skipped.
 
 
+- **native_sixdb**:
+
+    Load the tracking results natively and in parallel into a store in the
+    ``autosix_output`` of each workspace and calculate the DA (and DA-vs-
+    Turns) from them, instead of using ``sixdb load_dir`` and ``sixdb
+    da``.
+
+    action: ``store_true``
+
+
+- **parallel_workspaces** *(int)*:
+
+    Number of workspaces to run the stages for in parallel. Most of the
+    time in the stages is spent waiting for the SixDesk scripts to finish.
+
+    default: ``1``
+
+
 - **python2** *(PathOrStr)*:
 
     Path to python to use with run_six.sh (python2 with requirements
@@ -154,6 +212,16 @@ Arguments:
     action: ``store_true``
 
 
+- **share_sixtrack_input**:
+
+    Generate the sixtrack-input (i.e. run ``mad6t.sh``) only once for all
+    workspaces with the same filled mask, seeds and executable, e.g. if
+    they differ only in tracking settings. The other workspaces link to
+    these input files.
+
+    action: ``store_true``
+
+
 - **sixdesk_directory** *(Path)*:
 
     Path to the directory of SixDesk. Defaults to the PRO-version on AFS.
@@ -184,6 +252,21 @@ Arguments:
     action: ``store_true``
 
 
+- **watch**:
+
+    Keep autosix running and continue with the next stages of a
+    workspace, as soon as its jobs on the scheduler have finished.
+
+    action: ``store_true``
+
+
+- **watch_interval** *(int)*:
+
+    Seconds between the checks of the scheduler queue in ``watch`` mode.
+
+    default: ``300``
+
+
 :author: jdilly
 
 """
@@ -192,10 +275,11 @@ from __future__ import annotations
 
 import itertools
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import numpy as np
-import tfs
 from generic_parser import EntryPointParameters, entrypoint
 from generic_parser.entry_datatypes import DictAsString
 
@@ -204,9 +288,14 @@ from pylhc_submitter.constants.autosix import (
     SIXENV_OPTIONAL,
     SIXENV_REQUIRED,
     AutoSixEnvironment,
+    get_da_cube_path,
+    get_log_path,
+    get_tfs_da_path,
+    get_trace_path,
 )
 from pylhc_submitter.constants.job_submitter import COLUMN_JOBID, JOBSUMMARY_FILE
-from pylhc_submitter.sixdesk_tools.stages import STAGE_ORDER, Stage
+from pylhc_submitter.sixdesk_tools.scheduler import balance_materialize_limits, get_queued_jobs
+from pylhc_submitter.sixdesk_tools.stages import STAGE_ORDER, PostProcess, Stage, StageMeta
 from pylhc_submitter.sixdesk_tools.utils import check_mask, is_locked
 from pylhc_submitter.submitter.mask import generate_jobdf_index
 from pylhc_submitter.utils.iotools import (
@@ -215,10 +304,18 @@ from pylhc_submitter.utils.iotools import (
     make_replace_entries_iterable,
     save_config,
 )
-from pylhc_submitter.utils.logging_tools import log_setup
+from pylhc_submitter.utils.logging_tools import log_setup, thread_log_file
+from pylhc_submitter.utils.tracing import span, trace_run
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    import tfs
 
 LOG = logging.getLogger(__name__)
 
+MAX_QUEUE_FAILURES = 5  # consecutive failed queries of the scheduler queue in watch mode
+
 
 def get_params():
     params = EntryPointParameters()
@@ -298,6 +395,13 @@ def get_params():
         help="Forces unlocking of folders (if they have been locked by Sixdesk).",
         action="store_true",
     )
+    params.add_parameter(
+        name="full_lock_scan",
+        help="Look for SixDesk locks in the whole workspace, including the ``track`` "
+        "directory tree. Otherwise only the directories locked by SixDesk are checked, "
+        "which is much faster.",
+        action="store_true",
+    )
     params.add_parameter(
         name="apply_mad6t_hacks",
         help=(
@@ -324,7 +428,7 @@ def get_params():
     params.add_parameter(
         name="da_turnstep",
         type=int,
-        help="Step between turns used in DA-vs-Turns plot.",
+        help="Step between turns used in DA-vs-Turns plot. Only used with ``native_sixdb``.",
         default=AutoSixEnvironment.da_turnstep,
     )
     params.add_parameter(
@@ -338,10 +442,50 @@ def get_params():
         help="Maximum jobs to be materialized in scheduler (per SixDesk Workspace!). "
         "Here: ``None`` leaves the settings as defined in the SixDesk "
         "htcondor_run_six.sub template and ``0`` removes it from the "
-        "template. Warning: This setting modifies the template in the "
-        "``sixdesk_directory`` permanently. For more details see the "
+        "template. The template is modified in a copy for each workspace, "
+        "the ``sixdesk_directory`` itself is not changed. For more details see the "
         "htcondor API.",
     )
+    params.add_parameter(
+        name="max_materialize_total",
+        type=int,
+        help="Maximum jobs to be materialized in scheduler for all SixDesk Workspaces together. "
+        "The budget is distributed among the workspaces by their number of unfinished jobs. "
+        "Cannot be used together with ``max_materialize``.",
+    )
+    params.add_parameter(
+        name="native_sixdb",
+        help="Load the tracking results natively and in parallel into a store "
+        "in the ``autosix_output`` of each workspace and calculate the DA (and DA-vs-Turns) "
+        "from them, instead of using ``sixdb load_dir`` and ``sixdb da``.",
+        action="store_true",
+    )
+    params.add_parameter(
+        name="parallel_workspaces",
+        type=int,
+        help="Number of workspaces to run the stages for in parallel. "
+        "Most of the time in the stages is spent waiting for the SixDesk scripts to finish.",
+        default=AutoSixEnvironment.parallel_workspaces,
+    )
+    params.add_parameter(
+        name="share_sixtrack_input",
+        help="Generate the sixtrack-input (i.e. run ``mad6t.sh``) only once for all workspaces "
+        "with the same filled mask, seeds and executable, e.g. if they differ only in "
+        "tracking settings. The other workspaces link to these input files.",
+        action="store_true",
+    )
+    params.add_parameter(
+        name="watch",
+        help="Keep autosix running and continue with the next stages of a workspace, "
+        "as soon as its jobs on the scheduler have finished.",
+        action="store_true",
+    )
+    params.add_parameter(
+        name="watch_interval",
+        type=int,
+        help="Seconds between the checks of the scheduler queue in ``watch`` mode.",
+        default=AutoSixEnvironment.watch_interval,
+    )
     return params
 
 
@@ -359,27 +503,203 @@ def main(opt):
     )
     env = AutoSixEnvironment(**opt)  # basically checks that everything is there
 
-    for jobname, jobargs in jobdf.iterrows():
-        run_job(jobname=jobname, jobargs=jobargs, env=env)
+    with trace_run(get_trace_path(env.working_directory)):
+        if env.watch:
+            watch_jobs(jobdf, env)
+        else:
+            run_jobs(jobdf, env)
+            balance_materialize_budget(env)
+        update_da_cube(jobdf, env)
+
+
+def watch_jobs(jobdf: tfs.TfsDataFrame, env: AutoSixEnvironment):
+    """Keep running the stages of the jobs, until none of them is waiting
+    for jobs on the scheduler anymore.
+    Every ``env.watch_interval`` seconds the scheduler queue is queried once,
+    and the stages of the workspaces without queued jobs are run again.
+    If the query fails ``MAX_QUEUE_FAILURES`` times in a row, the error is raised.
+
+    Args:
+        jobdf (TfsDataFrame): The jobs to run, with their names as index and the
+                              Key=Values to fill the mask as columns.
+        env (DotDict): The ensemble of autosix settings as an ``AutoSixEnvironment`` object.
+    """
+    # Initially, all are assumed to be waiting, so that running jobs
+    # from a previous call are not checked (and failing) right away.
+    waiting = list(jobdf.index)
+    n_failures = 0
+    while True:
+        try:
+            queued = get_queued_jobs(waiting, env.working_directory, ssh=env.ssh)
+        except OSError as e:
+            n_failures += 1
+            if n_failures >= MAX_QUEUE_FAILURES:
+                LOG.error(f"Querying the scheduler queue failed {n_failures:d} times in a row.")
+                raise
+            LOG.warning(f"{e!s}. Trying again later ({n_failures:d}/{MAX_QUEUE_FAILURES:d}).")
+        else:
+            n_failures = 0
+            ready = [jobname for jobname in waiting if jobname not in queued]
+            waiting = [jobname for jobname in waiting if jobname in queued]
+            if ready:
+                waiting += run_jobs(jobdf.loc[ready], env)
+            balance_materialize_budget(env)
+
+        if not waiting:
+            break
+
+        LOG.info(
+            f"Waiting for the scheduler jobs of {len(waiting):d} workspaces. "
+            f"Checking again in {env.watch_interval:d}s."
+        )
+        time.sleep(env.watch_interval)
+    LOG.info("No workspaces are waiting for the scheduler anymore. Stopping watch.")
+
+
+def balance_materialize_budget(env: AutoSixEnvironment):
+    """Distribute the ``max_materialize_total`` among the tracking jobs of the workspaces,
+    if it is set.
+
+    Args:
+        env (DotDict): The ensemble of autosix settings as an ``AutoSixEnvironment`` object.
+    """
+    if env.max_materialize_total is None:
+        return
+
+    try:
+        balance_materialize_limits(env.working_directory, env.max_materialize_total, ssh=env.ssh)
+    except OSError as e:
+        LOG.warning(f"Materialization budget not distributed: {e!s}")
 
 
-def run_job(jobname: str, jobargs: dict, env: AutoSixEnvironment):
+def update_da_cube(jobdf: tfs.TfsDataFrame, env: AutoSixEnvironment):
+    """Create the DA cube of the study again, if the DA results of any workspace
+    are newer than the cube (i.e. after their post-processing).
+
+    Args:
+        jobdf (TfsDataFrame): The jobs, with their names as index and the
+                              Key=Values to fill the mask as columns.
+        env (DotDict): The ensemble of autosix settings as an ``AutoSixEnvironment`` object.
+    """
+    if not _is_da_cube_outdated(jobdf.index, env.working_directory):
+        LOG.debug("DA cube is up to date.")
+        return
+
+    from pylhc_submitter.sixdesk_tools.da_cube import create_da_cube  # needs numpy/pandas
+
+    with span("create_da_cube", items=len(jobdf)):
+        create_da_cube(jobdf, env.working_directory)
+
+
+def run_jobs(jobdf: tfs.TfsDataFrame, env: AutoSixEnvironment) -> list[str]:
+    """Run the stages of all jobs, either one after another or
+    ``env.parallel_workspaces`` jobs at a time.
+    In the latter case, the jobs are run up to the ``PostProcess`` stage first,
+    which is then run for all (ready) jobs at once, before the remaining stages are run.
+
+    Args:
+        jobdf (TfsDataFrame): The jobs to run, with their names as index and the
+                              Key=Values to fill the mask as columns.
+        env (DotDict): The ensemble of autosix settings as an ``AutoSixEnvironment`` object.
+
+    Returns:
+        List[str]: The names of the jobs waiting for their submitted jobs on the scheduler.
+    """
+    if env.parallel_workspaces <= 1:
+        submitted = [
+            run_job(jobname=jobname, jobargs=jobargs, env=env)
+            for jobname, jobargs in jobdf.iterrows()
+        ]
+    else:
+        LOG.info(f"Running the stages of {env.parallel_workspaces:d} workspaces in parallel.")
+        submitted = _run_jobs_in_parallel(
+            jobdf, env, [stage for stage in STAGE_ORDER.values() if stage < PostProcess]
+        )
+        ready = jobdf.loc[
+            [jobname for jobname, waiting in zip(jobdf.index, submitted) if not waiting]
+        ]
+        PostProcess.run_for_jobs(ready, env)
+        _run_jobs_in_parallel(
+            ready,
+            env,
+            [stage for stage in STAGE_ORDER.values() if stage >= PostProcess],
+            continued=True,
+        )
+    return [jobname for jobname, waiting in zip(jobdf.index, submitted) if waiting]
+
+
+def run_job(
+    jobname: str,
+    jobargs: dict,
+    env: AutoSixEnvironment,
+    stages: Iterable[StageMeta] | None = None,
+    continued: bool = False,
+) -> bool:
     """Main submitting procedure for single job.
 
     Args:
         jobname (str): Name of the job/study
         env (DotDict): The ensemble of autosix settings as an ``AutoSixEnvironment`` object.
         jobargs(dict): All Key=Values needed to fill the mask!
+        stages (Iterable[StageMeta]): Only run these stages (in order). Default: all stages.
+        continued (bool): The stages continue a previous call for this job in the same run,
+                          so the lock check (and the job banner) are not repeated.
+
+    Returns:
+        bool: ``True`` if jobs have been submitted, which need to finish before the next stages.
     """
-    if is_locked(jobname, env.working_directory, unlock=env.unlock):
-        LOG.info(f"{jobname} is locked. Try 'unlock' flag if this causes errors.")
+    log_path = get_log_path(jobname, env.working_directory)
+    log_path.parent.mkdir(parents=True, exist_ok=True)
 
-    Stage.run_all_stages(jobname, jobargs, env)
+    with thread_log_file(log_path):
+        if not continued and is_locked(
+            jobname, env.working_directory, unlock=env.unlock, full_scan=env.full_lock_scan
+        ):
+            LOG.info(f"{jobname} is locked. Try 'unlock' flag if this causes errors.")
+
+        return Stage.run_all_stages(jobname, jobargs, env, stages=stages, continued=continued)
 
 
 # Helper  ----------------------------------------------------------------------
 
 
+def _run_jobs_in_parallel(
+    jobdf: tfs.TfsDataFrame,
+    env: AutoSixEnvironment,
+    stages: list[StageMeta],
+    continued: bool = False,
+) -> list[bool]:
+    """Run the given stages of ``env.parallel_workspaces`` jobs at a time.
+
+    Returns:
+        List[bool]: Per job, whether jobs have been submitted to the scheduler.
+    """
+    with ThreadPoolExecutor(max_workers=env.parallel_workspaces) as pool:
+        futures = [
+            pool.submit(
+                run_job,
+                jobname=jobname,
+                jobargs=jobargs,
+                env=env,
+                stages=stages,
+                continued=continued,
+            )
+            for jobname, jobargs in jobdf.iterrows()
+        ]
+    return [future.result() for future in futures]  # also raises possible errors
+
+
+def _is_da_cube_outdated(jobnames: Iterable[str], basedir: Path) -> bool:
+    """Checks if the DA results of any of the jobs are newer than the DA cube."""
+    cube_path = get_da_cube_path(basedir)
+    cube_time = cube_path.stat().st_mtime_ns if cube_path.exists() else -1
+    for jobname in jobnames:
+        da_path = get_tfs_da_path(jobname, basedir)
+        if da_path.exists() and da_path.stat().st_mtime_ns > cube_time:
+            return True
+    return False
+
+
 def _check_opts(opt):
     opt = keys_to_path(opt, "mask", "working_directory", "executable")
 
@@ -388,12 +708,16 @@ def _check_opts(opt):
     del opt.mask
 
     opt.replace_dict = make_replace_entries_iterable(opt.replace_dict)
+    if opt.max_materialize is not None and opt.max_materialize_total is not None:
+        raise ValueError("Only one of 'max_materialize' and 'max_materialize_total' can be set.")
     if opt.max_stage is not None and not isinstance(opt.max_stage, Stage):
         opt.max_stage = STAGE_ORDER[opt.max_stage]
     return opt
 
 
 def get_jobs_and_values(jobid_mask, **kwargs):
+    import numpy as np
+
     values_grid = np.array(list(itertools.product(*kwargs.values())), dtype=object)
     job_names = generate_jobdf_index(None, jobid_mask, kwargs.keys(), values_grid)
     return job_names, values_grid
@@ -401,6 +725,8 @@ def get_jobs_and_values(jobid_mask, **kwargs):
 
 def _generate_jobs(basedir, jobid_mask, **kwargs) -> tfs.TfsDataFrame:
     """Generates product matrix for job-values and stores it as TfsDataFrame."""
+    import tfs
+
     LOG.debug("Creating Jobs")
     job_names, values_grid = get_jobs_and_values(jobid_mask, **kwargs)
     job_df = tfs.TfsDataFrame(
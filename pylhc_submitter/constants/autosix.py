@@ -28,6 +28,8 @@ MAD_TO_SIXTRACK_SH: Path = BASH_DIR / "mad6t.sh"
 RUNSIX_SH: Path = BASH_DIR / "run_six.sh"
 RUNSTATUS_SH: Path = BASH_DIR / "run_status"
 DOT_PROFILE: Path = BASH_DIR / "dot_profile"
+HTCONDOR_TEMPLATES_DIR: Path = UTILITIES_DIR / "templates" / "htcondor"
+HTCONDOR_RUNSIX_SUB: Path = HTCONDOR_TEMPLATES_DIR / "htcondor_run_six.sub"
 SIXDB: Path = UTILITIES_DIR / "externals" / "SixDeskDB" / "sixdb"
 SIXDESKLOCKFILE: Path = "sixdesklock"
 
@@ -47,12 +49,19 @@ class AutoSixEnvironment:
     da_turnstep: int = 100
     sixdesk_directory: Path = SIXDESK_UTILS
     unlock: bool = False
+    full_lock_scan: bool = False
     max_stage: Stage = None  # noqa: F821
     ssh: str = None
     stop_workspace_init: bool = False
     apply_mad6t_hacks: bool = False
     resubmit: bool = False
     max_materialize: int = None
+    max_materialize_total: int = None
+    parallel_workspaces: int = 1
+    watch: bool = False
+    watch_interval: int = 300
+    share_sixtrack_input: bool = False
+    native_sixdb: bool = False
 
 
 # Sixenv ---
@@ -144,6 +153,8 @@ SIXTRACK_INPUT_CHECK_FILES = "JOB_NOT_YET_STARTED", "JOB_NOT_YET_COMPLETED"
 HEADER_NTOTAL, HEADER_INFO, HEADER_HINT = "NTOTAL", "INFO", "HINT"
 MEAN, STD, MIN, MAX, N = "MEAN", "STD", "MIN", "MAX", "N"
 SEED, ANGLE, ALOST1, ALOST2, AMP = "SEED", "ANGLE", "ALOST1", "ALOST2", "A"
+TURNS, DA = "TURNS", "DA"
+DA_COLUMNS = (ALOST1, ALOST2)
 
 
 # Errors ---
@@ -165,6 +176,16 @@ class StageStopError(Exception):
     pass
 
 
+class StageWaitError(StageSkipError):
+    """Indicates that the stage was not completed, as it needs to wait
+    for jobs on the scheduler to finish first."""
+
+
+class StageResubmitError(StageWaitError):
+    """Indicates that the stage was not completed, but that the failed
+    jobs have been resubmitted and the user needs to wait for them to finish."""
+
+
 # Workspace Paths --------------------------------------------------------------
 
 
@@ -177,6 +198,16 @@ def get_scratch_path(basedir: Path) -> Path:
     return basedir / "scratch-0"
 
 
+def get_sixdesk_overlay_path(jobname: str, basedir: Path) -> Path:
+    # not in the workspace, as it links to the whole SixDesk installation
+    return basedir / ".autosix_sixdesk" / jobname
+
+
+def get_template_path(basedir: Path) -> Path:
+    # contains the pristine workspace, from which all workspaces of the study are copied
+    return basedir / ".autosix_template"
+
+
 def get_sixjobs_path(jobname: str, basedir: Path) -> Path:
     return get_workspace_path(jobname, basedir) / "sixjobs"
 
@@ -197,6 +228,10 @@ def get_track_path(jobname: str, basedir: Path) -> Path:
     return get_sixjobs_path(jobname, basedir) / "track"
 
 
+def get_incomplete_cases_path(jobname: str, basedir: Path) -> Path:
+    return get_sixjobs_path(jobname, basedir) / "work" / "incomplete_cases"
+
+
 def get_database_path(jobname: str, basedir: Path) -> Path:
     return get_sixjobs_path(jobname, basedir) / f"{jobname}.db"
 
@@ -205,6 +240,12 @@ def get_sixtrack_input_path(jobname: str, basedir: Path) -> Path:
     return get_sixjobs_path(jobname, basedir) / "sixtrack_input"
 
 
+def get_scratch_sixtrack_input_path(jobname: str, basedir: Path) -> Path:
+    # the `sixtrack_input` as defined in the sixdeskenv, containing the mad6t output
+    workspace_name = get_workspace_path(jobname, basedir).name
+    return get_scratch_path(basedir) / "sixtrack_input" / workspace_name / jobname
+
+
 def get_mad6t_mask_path(jobname: str, basedir: Path) -> Path:
     return get_sixtrack_input_path(jobname, basedir) / "mad6t.sh"
 
@@ -220,10 +261,36 @@ def get_autosix_results_path(jobname: str, basedir: Path) -> Path:
     return get_sixjobs_path(jobname, basedir) / "autosix_output"
 
 
+def get_log_path(jobname: str, basedir: Path) -> Path:
+    # not in the workspace, as it needs to exist before the workspace is created
+    return basedir / "autosix_logs" / f"{jobname}.log"
+
+
 def get_stagefile_path(jobname: str, basedir: Path) -> Path:
+    # only read, to migrate the completed stages into the stage-store
     return get_autosix_results_path(jobname, basedir) / "stages_completed.txt"
 
 
+def get_stage_store_path(basedir: Path) -> Path:
+    return basedir / "autosix_stages.json"
+
+
+def get_trace_path(basedir: Path) -> Path:
+    return basedir / "autosix_trace.json"
+
+
+def get_da_cube_path(basedir: Path) -> Path:
+    return basedir / "autosix_da_cube.npz"
+
+
+def get_track_index_path(jobname: str, basedir: Path) -> Path:
+    return get_autosix_results_path(jobname, basedir) / "track_index.json"
+
+
+def get_tracking_results_path(jobname: str, basedir: Path) -> Path:
+    return get_autosix_results_path(jobname, basedir) / "tracking_results"
+
+
 def get_tfs_da_path(jobname: str, basedir: Path) -> Path:
     return get_autosix_results_path(jobname, basedir) / f"{jobname}_da.tfs"
 
@@ -234,3 +301,11 @@ def get_tfs_da_seed_stats_path(jobname: str, basedir: Path) -> Path:
 
 def get_tfs_da_angle_stats_path(jobname: str, basedir: Path) -> Path:
     return get_autosix_results_path(jobname, basedir) / f"{jobname}_da_per_angle.tfs"
+
+
+def get_da_cache_path(jobname: str, basedir: Path) -> Path:
+    return get_autosix_results_path(jobname, basedir) / "da_cache.pkl"
+
+
+def get_tfs_da_vs_turns_path(jobname: str, basedir: Path) -> Path:
+    return get_autosix_results_path(jobname, basedir) / f"{jobname}_da_vs_turns.tfs"
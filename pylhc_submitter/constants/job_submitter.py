@@ -12,6 +12,12 @@ from pylhc_submitter.constants.external_paths import MADX_BIN, PYTHON2_BIN, PYTH
 JOBSUMMARY_FILE = "Jobs.tfs"
 JOBDIRECTORY_PREFIX = "Job"
 CONFIG_FILE = "config.ini"
+TRACE_FILE = "job_submitter_trace.json"
+
+RESULTS_NAME = "Results"
+RESULTS_SUFFIX = ".parquet"
+RESULTS_MANIFEST_SUFFIX = ".manifest.json"
+RESULTS_PART_MASK = "part-{:05d}.parquet"
 
 SCRIPT_EXTENSIONS = {
     "madx": ".madx",
@@ -31,6 +37,7 @@ COLUMN_SHELL_SCRIPT = "ShellScript"
 COLUMN_JOB_DIRECTORY = "JobDirectory"
 COLUMN_DEST_DIRECTORY = "DestDirectory"
 COLUMN_JOB_FILE = "JobFile"
+COLUMN_OUTPUT_FILE = "OutputFile"
 
 NON_PARAMETER_COLUMNS = (
     COLUMN_SHELL_SCRIPT,
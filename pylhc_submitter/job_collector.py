@@ -0,0 +1,160 @@
+"""
+Job Collector
+-------------
+
+The ``job_collector`` gathers the output of the jobs of a parametric study,
+as created by the ``job_submitter``, into a single columnar file.
+
+The per-job output files in the ``job_output_dir`` (or their copies in the
+``output_destination``, as listed in the **Jobs.tfs**) matching the given ``file_pattern``
+are read in parallel, the job-parameters from the **Jobs.tfs** are attached as columns
+and everything is written into a ``parquet``-dataset in the working directory.
+Next to it, a **manifest** is written, listing the jobs that have already been collected.
+Running the ``job_collector`` again will only ingest the jobs, that have finished since.
+
+The output files need to be in ``tfs``-format and should all contain the same columns.
+This requires the ``pyarrow`` package, which can be installed via the
+``pylhc_submitter[collect]`` extra.
+
+
+*--Required--*
+
+- **working_directory** *(PathOrStr)*:
+
+    Directory of the study, containing the Jobs.tfs
+
+
+*--Optional--*
+
+- **file_pattern** *(str)*:
+
+    Pattern of the files in the 'job_output_dir' to collect. Uses the
+    'glob' function, so unix-wildcards (*) are allowed.
+
+    default: ``*.tfs``
+
+
+- **job_output_dir** *(str)*:
+
+    The name of the output dir of the jobs.
+
+    default: ``Outputdata``
+
+
+- **num_processes** *(int)*:
+
+    Number of processes to be used to read the output files.
+
+    default: ``4``
+
+
+- **output_name** *(str)*:
+
+    Name of the collected results in the working directory.
+
+    default: ``Results``
+
+
+- **recollect**:
+
+    Ignore previous collections and collect all jobs from scratch.
+
+    action: ``store_true``
+
+
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import fields
+from pathlib import Path
+
+from generic_parser import EntryPointParameters, entrypoint
+
+from pylhc_submitter.constants.job_submitter import RESULTS_NAME
+from pylhc_submitter.submitter import results
+from pylhc_submitter.utils.iotools import PathOrStr, save_config
+from pylhc_submitter.utils.logging_tools import log_setup
+
+LOG = logging.getLogger(__name__)
+
+
+def get_params():
+    params = EntryPointParameters()
+    params.add_parameter(
+        name="working_directory",
+        type=PathOrStr,
+        required=True,
+        help="Directory of the study, containing the Jobs.tfs",
+    )
+    params.add_parameter(
+        name="job_output_dir",
+        help="The name of the output dir of the jobs.",
+        type=str,
+        default="Outputdata",
+    )
+    params.add_parameter(
+        name="file_pattern",
+        help=(
+            "Pattern of the files in the 'job_output_dir' to collect. "
+            "Uses the 'glob' function, so unix-wildcards (*) are allowed."
+        ),
+        type=str,
+        default="*.tfs",
+    )
+    params.add_parameter(
+        name="output_name",
+        help="Name of the collected results in the working directory.",
+        type=str,
+        default=RESULTS_NAME,
+    )
+    params.add_parameter(
+        name="num_processes",
+        help="Number of processes to be used to read the output files.",
+        type=int,
+        default=4,
+    )
+    params.add_parameter(
+        name="recollect",
+        help="Ignore previous collections and collect all jobs from scratch.",
+        action="store_true",
+    )
+    return params
+
+
+@entrypoint(get_params(), strict=True)
+def main(opt) -> list[str]:
+    """Collect the results of all finished jobs, which have not been collected yet.
+
+    Returns:
+        List[str]: The ids of the newly collected jobs.
+    """
+    LOG.info("Starting Job-collector.")
+    _check_pyarrow_presence()
+
+    opt.working_directory = Path(opt.working_directory)
+    save_config(opt.working_directory, opt, "job_collector")
+
+    opt.output_dir = opt.job_output_dir  # renaming
+    collection_opt = results.CollectionOpts(
+        **{f.name: opt[f.name] for f in fields(results.CollectionOpts)}
+    )
+    return results.collect_results(collection_opt)
+
+
+def _check_pyarrow_presence() -> None:
+    """Raises an error if pyarrow is not installed."""
+    if results.pa is None:
+        raise ImportError(
+            "pyarrow is necessary to run this module. "
+            "Install it e.g. via `pip install pylhc_submitter[collect]`."
+        )
+
+
+# Script Mode ------------------------------------------------------------------
+
+
+if __name__ == "__main__":
+    log_setup()
+    main()
@@ -101,6 +101,16 @@ For additional information and guides, see the `Job Submitter page
     Mask to name jobs from replace_dict
 
 
+- **lazy_destination**:
+
+    Only create the top-level `output_destination` at submission time. The
+    per-job destination directories are recorded in the Jobs.tfs and
+    created by the jobs themselves when they run. Recommended for large
+    studies on EOS.
+
+    action: ``store_true``
+
+
 - **num_processes** *(int)*:
 
     Number of processes to be used if run locally
@@ -154,7 +164,6 @@ For additional information and guides, see the `Job Submitter page
 from __future__ import annotations
 
 import logging
-import sys
 from dataclasses import fields
 from pathlib import Path
 
@@ -163,7 +172,12 @@ from generic_parser.entry_datatypes import DictAsString
 from generic_parser.tools import print_dict_tree
 
 from pylhc_submitter.constants.htcondor import JOBFLAVOURS
-from pylhc_submitter.constants.job_submitter import EXECUTEABLEPATH, SCRIPT_EXTENSIONS
+from pylhc_submitter.constants.job_submitter import (
+    EXECUTEABLEPATH,
+    SCRIPT_EXTENSIONS,
+    TRACE_FILE,
+)
+from pylhc_submitter.submitter.htc_utils import get_htcondor
 from pylhc_submitter.submitter.iotools import CreationOpts, create_jobs, is_eos_uri, print_stats
 from pylhc_submitter.submitter.mask import (
     check_percentage_signs_in_mask,
@@ -178,33 +192,10 @@ from pylhc_submitter.utils.iotools import (
     save_config,
 )
 from pylhc_submitter.utils.logging_tools import log_setup
+from pylhc_submitter.utils.tracing import span, trace_run
 
 LOG = logging.getLogger(__name__)
 
-# ------------------------------------------------------------------ #
-# Importing htcondor is tricky because they broke the API in v25 LTS #
-# ------------------------------------------------------------------ #
-
-try:
-    # First, try HTCondor 25.x API
-    import htcondor2 as htcondor
-
-    LOG.debug("Using htcondor2 bindings (HTCondor 25.x+).")
-except ImportError:
-    try:
-        # Fallback to previous LTS HTCondor API
-        import htcondor
-
-        LOG.debug("Using htcondor bindings (HTCondor <25).")
-    except ImportError:
-        # Neither available: must be macOS or Windows
-        platform = "macOS" if sys.platform == "darwin" else "windows"
-        LOG.warning(
-            f"htcondor python bindings are linux-only. You can still use job_submitter on {platform}, "
-            "but only for local runs."
-        )
-        htcondor = None
-
 
 def get_params():
     params = EntryPointParameters()
@@ -320,6 +311,15 @@ def get_params():
         "Can be on EOS, preferrably via EOS-URI format ('root://eosuser.cern.ch//eos/...').",
         type=PathOrStr,
     )
+    params.add_parameter(
+        name="lazy_destination",
+        help=(
+            "Only create the top-level `output_destination` at submission time. "
+            "The per-job destination directories are recorded in the Jobs.tfs and created by "
+            "the jobs themselves when they run. Recommended for large studies on EOS."
+        ),
+        action="store_true",
+    )
     params.add_parameter(
         name="htc_arguments",
         help=(
@@ -351,9 +351,13 @@ def main(opt):
     save_config(Path(opt.working_directory), opt, "job_submitter")
     creation_opt, runner_opt = check_opts(opt)
 
-    job_df, dropped_jobs = create_jobs(creation_opt)
+    with trace_run(Path(opt.working_directory) / TRACE_FILE):
+        with span("create_jobs") as create_span:
+            job_df, dropped_jobs = create_jobs(creation_opt)
+            create_span.items = len(job_df)
 
-    run_jobs(job_df, runner_opt)
+        with span("run_jobs", items=len(job_df), local=runner_opt.run_local):
+            run_jobs(job_df, runner_opt)
 
     print_stats(job_df.index, dropped_jobs)
 
@@ -383,6 +387,9 @@ def check_opts(opt):
             "The 'output_destination' is an EOS-URI but missing '://' or '//eos' (double slashes?). "
         )
 
+    if opt.lazy_destination and not opt.output_destination:
+        LOG.warning("'lazy_destination' has no effect without an 'output_destination'.")
+
     # Replace dict ---
     dict_keys = set(opt.replace_dict.keys())
     mask_keys = find_named_variables_in_mask(mask_content)
@@ -423,7 +430,7 @@ def check_opts(opt):
 
 def _check_htcondor_presence() -> None:
     """Raises an error if htcondor is not installed."""
-    if htcondor is None:
+    if get_htcondor() is None:
         raise OSError("htcondor bindings are necessary to run this module.")
 
 
@@ -9,14 +9,18 @@ from __future__ import annotations
 
 import contextlib
 import logging
+import math
+import os
 import re
 import shutil
+import threading
 from dataclasses import asdict
 from pathlib import Path
 
-import numpy as np
-
 from pylhc_submitter.constants.autosix import (
+    BASH_DIR,
+    HTCONDOR_RUNSIX_SUB,
+    HTCONDOR_TEMPLATES_DIR,
     SEED_KEYS,
     SETENV_SH,
     SIXENV_OPTIONAL,
@@ -27,9 +31,11 @@ from pylhc_submitter.constants.autosix import (
     get_mad6t_mask_path,
     get_masks_path,
     get_scratch_path,
+    get_sixdesk_overlay_path,
     get_sixdeskenv_path,
     get_sixjobs_path,
     get_sysenv_path,
+    get_template_path,
     get_workspace_path,
 )
 from pylhc_submitter.constants.external_paths import SIXDESK_UTILS
@@ -40,6 +46,14 @@ SIXDESKENV_MASK = Path(__file__).parent / "mask_sixdeskenv"
 
 LOG = logging.getLogger(__name__)
 
+TEMPLATE_JOBNAME = "template"
+
+# Only one workspace at a time can ask the user for input
+PROMPT_LOCK = threading.Lock()
+
+# Only one workspace at a time can create the template workspace
+TEMPLATE_LOCK = threading.Lock()
+
 
 # Main -------------------------------------------------------------------------
 
@@ -116,14 +130,31 @@ def fix_pythonfile_call(jobname: str, basedir: Path):
         Path(mad6t_path).write_text("".join(lines))
 
 
+def create_sixdesk_overlay(jobname: str, basedir: Path, sixdesk: Path = SIXDESK_UTILS) -> Path:
+    """Creates a SixDesk directory for the workspace, which links to the given installation,
+    but has its own copies of the htcondor-templates (and the bash scripts using them),
+    so these can be modified for this workspace only.
+
+    Returns:
+        Path: Path to the SixDesk overlay directory.
+    """
+    overlay_path = get_sixdesk_overlay_path(jobname, basedir)
+    LOG.debug(f'Creating SixDesk overlay in "{str(overlay_path)}"')
+    if overlay_path.exists():
+        shutil.rmtree(overlay_path)  # fresh, in case the installation has changed
+    _mirror_directory(sixdesk, overlay_path, copy=[BASH_DIR, HTCONDOR_TEMPLATES_DIR])
+    return overlay_path
+
+
 def set_max_materialize(sixdesk: Path, max_materialize: int = None):
     """Adds the ``max_materialize`` option into the htcondor sixtrack
-    submission-file."""
+    submission-file. To only modify it for a single workspace, use the
+    SixDesk directory from :func:`create_sixdesk_overlay`."""
     if max_materialize is None:
         return
 
     LOG.info(f"Setting max_materialize for SixTrack to {max_materialize}.")
-    sub_path = sixdesk / "utilities" / "templates" / "htcondor" / "htcondor_run_six.sub"
+    sub_path = sixdesk / HTCONDOR_RUNSIX_SUB
     sub_content = sub_path.read_text()
 
     # Remove whole max_materialize line if present
@@ -163,9 +194,10 @@ def _create_workspace(jobname: str, basedir: Path, sixdesk: Path = SIXDESK_UTILS
     LOG.info(f'Creating new workspace in "{str(workspace_path)}"')
 
     if workspace_path.exists():
-        LOG.warning(f'Workspace in "{str(workspace_path)}" already exists. ')
-        LOG.info("Do you want to delete the old workspace? [y/N]")
-        user_answer = input()
+        with PROMPT_LOCK:
+            LOG.warning(f'Workspace in "{str(workspace_path)}" already exists. ')
+            LOG.info("Do you want to delete the old workspace? [y/N]")
+            user_answer = input()
         if user_answer.lower().startswith("y"):
             shutil.rmtree(workspace_path)
             with contextlib.suppress(FileNotFoundError):
@@ -176,16 +208,61 @@ def _create_workspace(jobname: str, basedir: Path, sixdesk: Path = SIXDESK_UTILS
 
     scratch_path.mkdir(parents=True, exist_ok=True)
 
-    # create environment with all necessary files
-    # _start_subprocess(['git', 'clone', GIT_REPO, basedir])
-    start_subprocess([sixdesk / SETENV_SH, "-N", workspace_path.name], cwd=basedir, ssh=ssh)
+    # create environment with all necessary files, by copying the template workspace,
+    # as the workspaces only differ in the files written afterwards.
+    # Plain copies, as some of the files are modified in place later on.
+    template_workspace_path = _get_template_workspace(basedir, sixdesk=sixdesk, ssh=ssh)
+    shutil.copytree(template_workspace_path, workspace_path, symlinks=True)
 
     # create autosix results folder.
-    # Needs to be done after above command (as it crashes if folder exists)
-    # but before end of this stage (as it needs to write the stagefile)
     get_autosix_results_path(jobname, basedir).mkdir(exist_ok=True, parents=True)
 
 
+def _get_template_workspace(
+    basedir: Path, sixdesk: Path = SIXDESK_UTILS, ssh: str | None = None
+) -> Path:
+    """Returns the path to the pristine workspace of the study, which is created via
+    SixDesk on first call (or if the ``sixdesk`` directory has changed)."""
+    template_path = get_template_path(basedir)
+    template_workspace_path = get_workspace_path(TEMPLATE_JOBNAME, template_path)
+    sixdesk_file = template_path / "sixdesk_directory"
+
+    with TEMPLATE_LOCK:
+        if sixdesk_file.is_file() and sixdesk_file.read_text() == str(sixdesk):
+            return template_workspace_path
+
+        LOG.info(f'Creating template workspace in "{str(template_path)}"')
+        # created next to the final location and then moved, so that other autosix
+        # runs in the same directory never see an incomplete template
+        tmp_path = template_path.with_name(f"{template_path.name}.{os.getpid()}.tmp")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        tmp_path.mkdir(parents=True)
+        # _start_subprocess(['git', 'clone', GIT_REPO, basedir])
+        start_subprocess(
+            [sixdesk / SETENV_SH, "-N", template_workspace_path.name], cwd=tmp_path, ssh=ssh
+        )
+        (tmp_path / sixdesk_file.name).write_text(str(sixdesk))
+
+        shutil.rmtree(template_path, ignore_errors=True)
+        tmp_path.rename(template_path)
+    return template_workspace_path
+
+
+def _mirror_directory(source: Path, target: Path, copy: list[Path], relative: Path = Path()):
+    """Mirrors the ``source`` directory into ``target`` via symlinks,
+    apart from the ``copy`` directories (relative to ``source``), which are copied."""
+    target.mkdir(parents=True)
+    for source_path in sorted(source.iterdir()):
+        relative_path = relative / source_path.name
+        target_path = target / source_path.name
+        if relative_path in copy:
+            shutil.copytree(source_path, target_path, symlinks=True)
+        elif any(relative_path in copy_path.parents for copy_path in copy):
+            _mirror_directory(source_path, target_path, copy=copy, relative=relative_path)
+        else:
+            target_path.symlink_to(source_path.absolute())
+
+
 def _create_sixdeskenv(jobname: str, basedir: Path, **kwargs):
     """Fills sixdeskenv mask and copies it to workspace"""
     workspace_path = get_workspace_path(jobname, basedir)
@@ -201,7 +278,7 @@ def _create_sixdeskenv(jobname: str, basedir: Path, **kwargs):
         WORKSPACE=workspace_path.name,
         BASEDIR=str(basedir),
         SCRATCHDIR=str(scratch_path),
-        TURNSPOWER=np.log10(kwargs["TURNS"]),
+        TURNSPOWER=math.log10(kwargs["TURNS"]),
         **{k: v for k, v in kwargs.items() if k in SIXENV_REQUIRED + SIXENV_OPTIONAL},
     )
 
@@ -0,0 +1,145 @@
+"""
+DA Cube
+-------
+
+Combines the DA results of all workspaces of an autosix parameter scan into a single,
+dense array with the axes ``(*replace_dict parameters, SEED, ANGLE, DA-column)``.
+
+The array is saved together with its coordinates (i.e. the values along each axis)
+into a single ``.npz`` file in the autosix working directory, so that the results
+of the whole scan can be loaded and sliced at once.
+Entries of workspaces (or seeds and angles) without results are ``NaN``.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+import pandas as pd
+import tfs
+
+from pylhc_submitter.constants.autosix import (
+    ANGLE,
+    DA_COLUMNS,
+    SEED,
+    get_da_cube_path,
+    get_tfs_da_path,
+)
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+LOG = logging.getLogger(__name__)
+
+DA_COLUMN = "DA_COLUMN"
+DATA_KEY = "data"
+META_KEY = "meta"
+
+
+@dataclass
+class DACube:
+    """DA results of a parameter scan, with the names (``dims``) and values (``coords``)
+    of the axes of the ``data`` array."""
+
+    data: np.ndarray
+    dims: list[str]
+    coords: dict[str, list[Any]]
+
+    def sel(self, **selection) -> DACube:
+        """Select by coordinate values. Axes selected with a single value are dropped,
+        with a list of values they are kept."""
+        index, dims, coords = [], [], {}
+        for dim in self.dims:
+            if dim not in selection:
+                index.append(slice(None))
+                dims.append(dim)
+                coords[dim] = self.coords[dim]
+                continue
+
+            values = selection[dim]
+            if isinstance(values, (list, tuple)):
+                index.append([self.coords[dim].index(value) for value in values])
+                dims.append(dim)
+                coords[dim] = list(values)
+            else:
+                index.append(self.coords[dim].index(values))
+
+        # select axes one after another, so that multiple lists are not broadcast together
+        data = self.data
+        for axis, idx in reversed(list(enumerate(index))):
+            data = data[(slice(None),) * axis + (idx,)]
+        return DACube(data=data, dims=dims, coords=coords)
+
+
+def create_da_cube(jobdf: pd.DataFrame, basedir: Path) -> Path | None:
+    """Read the DA results of all jobs and save them as a single DA cube.
+
+    Args:
+        jobdf (DataFrame): The jobs, with their names as index and the
+                           replace_dict parameters as columns.
+        basedir (Path): SixDesk Basefolder Location
+
+    Returns:
+        Path: Path to the saved cube, or ``None`` if no DA results were found.
+    """
+    with ThreadPoolExecutor() as pool:
+        results = dict(zip(jobdf.index, pool.map(lambda j: _read_da(j, basedir), jobdf.index)))
+
+    results = {jobname: df_da for jobname, df_da in results.items() if df_da is not None}
+    if not results:
+        LOG.debug("No DA results found. DA cube not created.")
+        return None
+
+    df_all = pd.concat(results.values())
+    coords = {param: [_to_python(v) for v in pd.unique(jobdf[param])] for param in jobdf.columns}
+    coords[SEED] = sorted(_to_python(v) for v in df_all[SEED].unique())
+    coords[ANGLE] = sorted(_to_python(v) for v in df_all[ANGLE].unique())
+    coords[DA_COLUMN] = list(DA_COLUMNS)
+    dims = list(coords.keys())
+
+    data = np.full([len(values) for values in coords.values()], np.nan)
+    seed_index = {seed: idx for idx, seed in enumerate(coords[SEED])}
+    angle_index = {angle: idx for idx, angle in enumerate(coords[ANGLE])}
+    for jobname, df_da in results.items():
+        job_index = tuple(
+            coords[param].index(_to_python(jobdf.loc[jobname, param])) for param in jobdf.columns
+        )
+        seeds = df_da[SEED].map(lambda s: seed_index[_to_python(s)]).to_numpy()
+        angles = df_da[ANGLE].map(lambda a: angle_index[_to_python(a)]).to_numpy()
+        data[job_index][seeds, angles, :] = df_da[list(DA_COLUMNS)].to_numpy()
+
+    cube_path = get_da_cube_path(basedir)
+    tmp_path = cube_path.with_name(f".{cube_path.stem}.{os.getpid()}.tmp.npz")
+    meta = json.dumps({"dims": dims, "coords": coords})
+    np.savez(tmp_path, **{DATA_KEY: data, META_KEY: np.array(meta)})
+    tmp_path.replace(cube_path)
+    LOG.info(f"DA cube of {len(results):d} workspaces saved to {str(cube_path)}.")
+    return cube_path
+
+
+def load_da_cube(basedir: Path) -> DACube:
+    """Load the DA cube of the parameter scan in the autosix working directory."""
+    with np.load(get_da_cube_path(basedir)) as npz:
+        meta = json.loads(str(npz[META_KEY]))
+        return DACube(data=npz[DATA_KEY], dims=meta["dims"], coords=meta["coords"])
+
+
+# Helper -----------------------------------------------------------------------
+
+
+def _read_da(jobname: str, basedir: Path) -> pd.DataFrame | None:
+    da_path = get_tfs_da_path(jobname, basedir)
+    if not da_path.is_file():
+        return None
+    return tfs.read(da_path)
+
+
+def _to_python(value: Any) -> Any:
+    """Convert numpy scalars into python types, to be stored as json."""
+    return value.item() if isinstance(value, np.generic) else value
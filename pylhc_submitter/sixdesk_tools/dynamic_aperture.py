@@ -0,0 +1,158 @@
+"""
+Dynamic Aperture
+----------------
+
+Calculation of the dynamic aperture from the tracking results,
+as an alternative to ``sixdb <jobname> da``.
+
+The tracking results are read from the store of the native loader
+(see ``tracking_results``) or, if not present, from the ``six_results`` table
+of the workspace database (as loaded by ``sixdb load_dir``).
+All seeds and angles are reduced at once, using grouped ``pandas``/``numpy`` operations:
+
+- ``Amin``/``Amax``: smallest/largest initial amplitude tracked (in beam sigma).
+- ``alost2``: smallest amplitude of a lost particle pair.
+- ``alost1``: smallest amplitude of a lost particle pair above the
+  largest amplitude that survived, i.e. ignoring lost islands below stable amplitudes.
+
+The losses are zero if no particle pair was lost.
+The results are written into the ``da_post`` table of the workspace database,
+from which they are post-processed, and the DA-vs-turns into a tfs-file.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3 as sql
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+from tfs import TfsDataFrame, write_tfs
+
+from pylhc_submitter.constants.autosix import (
+    ANGLE,
+    DA,
+    SEED,
+    TURNS,
+    get_database_path,
+    get_tfs_da_vs_turns_path,
+)
+from pylhc_submitter.sixdesk_tools.extract_data_from_db import extract_tracking_results
+from pylhc_submitter.sixdesk_tools.tracking_results import SEED_COLUMN, read_tracking_results
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+LOG = logging.getLogger(__name__)
+
+DA_POST_TABLE = "da_post"
+GROUP_COLUMNS = [SEED_COLUMN, "angle"]
+
+
+def calculate_da(
+    jobname: str, basedir: Path, emittance: float, gamma: float, turnstep: int
+) -> tuple[pd.DataFrame, TfsDataFrame]:
+    """Calculate the DA and DA-vs-turns of the job and write them into the
+    ``da_post`` table of the database and the DA-vs-turns tfs-file, respectively.
+
+    Args:
+        jobname (str): Name of the job/study
+        basedir (Path): SixDesk Basefolder Location
+        emittance (float): Normalized emittance (in um), to convert the amplitudes into sigma.
+        gamma (float): Relativistic gamma.
+        turnstep (int): Step between the turns for the DA-vs-turns.
+    """
+    LOG.info(f"Calculating DA for {jobname}.")
+    try:
+        df_results = read_tracking_results(jobname, basedir)
+    except FileNotFoundError:
+        LOG.debug("No natively loaded tracking results found. Reading from database.")
+        df_results = extract_tracking_results(jobname, basedir)
+
+    df_results = prepare_results(df_results, emittance, gamma)
+    df_da = compute_da(df_results)
+    df_da_vs_turns = compute_da_vs_turns(df_results, turnstep)
+
+    db = sql.connect(get_database_path(jobname, basedir))
+    try:
+        df_da.to_sql(DA_POST_TABLE, db, if_exists="replace", index=False)
+    finally:
+        db.close()
+    write_tfs(get_tfs_da_vs_turns_path(jobname, basedir), df_da_vs_turns)
+    LOG.info(f"DA calculated for {len(df_da):d} seeds and angles.")
+    return df_da, df_da_vs_turns
+
+
+def compute_da(df: pd.DataFrame) -> pd.DataFrame:
+    """Reduce the prepared tracking results (see :func:`prepare_results`)
+    into the DA per seed and angle, as in the ``da_post`` table of sixdb."""
+    lost_amp = df["amp"].where(df["lost"])
+    max_stable_amp = df["amp"].where(~df["lost"]).groupby([df[c] for c in GROUP_COLUMNS])
+    above_stable = lost_amp > max_stable_amp.transform("max").fillna(-np.inf)
+
+    return (
+        df.assign(alost1=lost_amp.where(above_stable), alost2=lost_amp)
+        .groupby(GROUP_COLUMNS)
+        .agg(
+            alost1=("alost1", "min"),
+            alost2=("alost2", "min"),
+            Amin=("amp", "min"),
+            Amax=("amp", "max"),
+        )
+        .fillna({"alost1": 0, "alost2": 0})
+        .reset_index()
+    )
+
+
+def compute_da_vs_turns(df: pd.DataFrame, turnstep: int) -> TfsDataFrame:
+    """DA (i.e. smallest amplitude lost before the given turn) per seed and angle, for
+    turns in steps of ``turnstep``. As long as no particles are lost, the largest
+    amplitude tracked is used, as the DA is at least as large."""
+    max_turn = int(df["turn_max"].max())
+    turns = np.unique(np.append(np.arange(turnstep, max_turn + 1, turnstep), max_turn))
+
+    df_amax = df.groupby(GROUP_COLUMNS)["amp"].max().rename("amax").reset_index()
+    df_grid = df_amax.merge(pd.DataFrame({"turn": turns.astype(float)}), how="cross")
+    df_grid = df_grid.sort_values("turn")
+
+    df_lost = df.loc[df["lost"], [*GROUP_COLUMNS, "loss_turn", "amp"]].sort_values(
+        [*GROUP_COLUMNS, "loss_turn"]
+    )
+    df_lost["da"] = df_lost.groupby(GROUP_COLUMNS)["amp"].cummin()
+    df_grid = pd.merge_asof(
+        df_grid,
+        df_lost.sort_values("loss_turn"),
+        left_on="turn",
+        right_on="loss_turn",
+        by=GROUP_COLUMNS,
+        allow_exact_matches=False,  # lost before the turn
+    )
+
+    df_da_vs_turns = TfsDataFrame(
+        {
+            SEED: df_grid[SEED_COLUMN].astype(int),
+            ANGLE: df_grid["angle"],
+            TURNS: df_grid["turn"].astype(int),
+            DA: df_grid["da"].fillna(df_grid["amax"]),
+        }
+    )
+    return df_da_vs_turns.sort_values([SEED, ANGLE, TURNS], ignore_index=True)
+
+
+def prepare_results(df: pd.DataFrame, emittance: float, gamma: float) -> pd.DataFrame:
+    """Select the valid results and add the angle (in degree), the initial amplitude
+    (in sigma) and the turn of the loss of each particle pair."""
+    df = df.loc[(df["betx"] > 0) & (df["bety"] > 0) & (df["turn_max"] > 0), :].copy()
+    n_angles = df["angle"].max()  # SixDesk numbers the angles 1...n
+    df["angle"] = 90 * df["angle"] / (n_angles + 1)
+
+    geometric_emittance = emittance / gamma  # sigx1/y1 in mm, betx/y in m
+    df["amp"] = np.sqrt(
+        (df["sigx1"] ** 2 / df["betx"] + df["sigy1"] ** 2 / df["bety"]) / geometric_emittance
+    )
+
+    df["turn_max"] = df["turn_max"].astype(float)
+    df["loss_turn"] = np.minimum(df["sturns1"], df["sturns2"]).astype(float)
+    df["lost"] = df["loss_turn"] < df["turn_max"]
+    return df[[*GROUP_COLUMNS, "turn_max", "loss_turn", "lost", "amp"]]
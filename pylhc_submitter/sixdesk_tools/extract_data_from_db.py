@@ -1,87 +1,156 @@
-"""
-Extract Data From DataBase
------------------------------
-
-These functions operate on the SixDesk database and help to extract data
-form it.
-
-TODO: Implement extraction of data into ``.csv`` (and/or tfs?)
-like fvanderv does.
-"""
-
-from __future__ import annotations
-
-import logging
-import sqlite3 as sql
-from contextlib import contextmanager
-from typing import TYPE_CHECKING
-
-import pandas as pd
-from tfs import TfsDataFrame
-
-from pylhc_submitter.constants.autosix import (
-    ALOST1,
-    ALOST2,
-    AMP,
-    ANGLE,
-    MAX,
-    MIN,
-    SEED,
-    get_database_path,
-)
-
-if TYPE_CHECKING:
-    from pathlib import Path
-
-LOG = logging.getLogger(__name__)
-
-
-def extract_da_data(jobname: str, basedir: Path) -> TfsDataFrame:
-    """Extract DA data directly from the database.
-
-    Args:
-        jobname (str): Name of the Job
-        basedir (Path): SixDesk Basefolder Location
-    """
-    with _get_database(jobname, basedir) as db:
-        df_da = pd.read_sql(
-            "SELECT seed, angle, alost1, alost2, Amin, Amax FROM da_post ORDER BY seed, angle", db
-        )
-
-    df_da = df_da.rename(
-        columns={
-            "seed": SEED,
-            "angle": ANGLE,
-            "alost1": ALOST1,
-            "alost2": ALOST2,
-            "Amin": f"{MIN}{AMP}",
-            "Amax": f"{MAX}{AMP}",
-        }
-    )
-    return TfsDataFrame(df_da)
-
-
-def extract_meta_data(jobname: str, basedir: Path) -> TfsDataFrame:
-    """Extract the meta-data directly from the database.
-
-    Args:
-        jobname (str): Name of the Job
-        basedir (Path): SixDesk Basefolder Location
-    """
-    with _get_database(jobname, basedir) as db:
-        df_da = pd.read_sql("SELECT keyname, value FROM env", db)
-    return TfsDataFrame(df_da)
-
-
-@contextmanager
-def _get_database(jobname, basedir):
-    """Context to connect to DataBase and always close the connection afterwards.
-
-    Args:
-        jobname (str): Name of the Job
-        basedir (Path): SixDesk Basefolder Location
-    """
-    db_path = get_database_path(jobname, basedir)
-    db = sql.connect(db_path)
-    yield db
-    db.close()
+"""
+Extract Data From DataBase
+-----------------------------
+
+These functions operate on the SixDesk database and help to extract data
+form it.
+
+The databases are opened read-only and as immutable, so that the extraction never
+modifies or locks them (e.g. on a shared file system) and can run for many
+workspaces concurrently. The results are read in chunks into typed ``numpy`` arrays.
+
+TODO: Implement extraction of data into ``.csv`` (and/or tfs?)
+like fvanderv does.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3 as sql
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+import pandas as pd
+from tfs import TfsDataFrame
+
+from pylhc_submitter.constants.autosix import (
+    ALOST1,
+    ALOST2,
+    AMP,
+    ANGLE,
+    MAX,
+    MIN,
+    SEED,
+    get_database_path,
+)
+from pylhc_submitter.utils.logging_tools import submit_in_context
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from pathlib import Path
+
+LOG = logging.getLogger(__name__)
+
+CHUNK_SIZE = 10_000
+DA_DTYPES = {
+    SEED: np.int64,
+    ANGLE: np.float64,
+    ALOST1: np.float64,
+    ALOST2: np.float64,
+    f"{MIN}{AMP}": np.float64,
+    f"{MAX}{AMP}": np.float64,
+}
+TRACKING_DTYPES = {
+    "seed": np.int64,
+    "angle": np.float64,
+    "turn_max": np.float64,
+    "sturns1": np.float64,
+    "sturns2": np.float64,
+    "betx": np.float64,
+    "bety": np.float64,
+    "sigx1": np.float64,
+    "sigy1": np.float64,
+}
+
+
+def extract_da_data(jobname: str, basedir: Path) -> TfsDataFrame:
+    """Extract DA data directly from the database.
+
+    Args:
+        jobname (str): Name of the Job
+        basedir (Path): SixDesk Basefolder Location
+    """
+    with _get_database(jobname, basedir) as db:
+        df_da = _read_chunked(
+            db,
+            "SELECT seed, angle, alost1, alost2, Amin, Amax FROM da_post ORDER BY seed, angle",
+            DA_DTYPES,
+        )
+    return TfsDataFrame(df_da)
+
+
+def extract_da_data_for_jobs(
+    jobnames: Iterable[str], basedir: Path, max_workers: int | None = None
+) -> dict[str, TfsDataFrame]:
+    """Extract DA data from the databases of all given jobs concurrently.
+
+    Args:
+        jobnames (Iterable[str]): Names of the Jobs
+        basedir (Path): SixDesk Basefolder Location
+        max_workers (int): Number of databases to read at the same time.
+    """
+    jobnames = list(jobnames)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [submit_in_context(pool, extract_da_data, job, basedir) for job in jobnames]
+        return {jobname: future.result() for jobname, future in zip(jobnames, futures)}
+
+
+def extract_tracking_results(jobname: str, basedir: Path) -> pd.DataFrame:
+    """Extract the tracking results needed for the DA calculation directly from the database,
+    as loaded by ``sixdb load_dir`` (i.e. the ``six_results`` per ``six_input`` case).
+
+    Args:
+        jobname (str): Name of the Job
+        basedir (Path): SixDesk Basefolder Location
+    """
+    with _get_database(jobname, basedir) as db:
+        return _read_chunked(
+            db,
+            "SELECT i.seed, i.angle, r.turn_max, r.sturns1, r.sturns2, r.betx, r.bety, r.sigx1, r.sigy1 "
+            "FROM six_results AS r JOIN six_input AS i ON r.six_input_id = i.id",
+            TRACKING_DTYPES,
+        )
+
+
+def extract_meta_data(jobname: str, basedir: Path) -> TfsDataFrame:
+    """Extract the meta-data directly from the database.
+
+    Args:
+        jobname (str): Name of the Job
+        basedir (Path): SixDesk Basefolder Location
+    """
+    with _get_database(jobname, basedir) as db:
+        df_da = pd.read_sql("SELECT keyname, value FROM env", db)
+    return TfsDataFrame(df_da)
+
+
+@contextmanager
+def _get_database(jobname, basedir):
+    """Context to connect read-only to DataBase and always close the connection afterwards.
+
+    Args:
+        jobname (str): Name of the Job
+        basedir (Path): SixDesk Basefolder Location
+    """
+    db_path = get_database_path(jobname, basedir)
+    db = sql.connect(f"{db_path.absolute().as_uri()}?mode=ro&immutable=1", uri=True)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _read_chunked(db: sql.Connection, query: str, dtypes: dict[str, Any]) -> pd.DataFrame:
+    """Read the result of the query in chunks into typed arrays.
+    The columns are named by the keys of ``dtypes``."""
+    dtype = np.dtype(list(dtypes.items()))
+    cursor = db.execute(query)
+    try:
+        chunks = []
+        while rows := cursor.fetchmany(CHUNK_SIZE):
+            chunks.append(np.array(rows, dtype=dtype))
+    finally:
+        cursor.close()
+    return pd.DataFrame(np.concatenate(chunks) if chunks else np.empty(0, dtype=dtype))
@@ -5,26 +5,37 @@ Post Process DA
 Tools to process data after sixdb has calculated the
 da. Includes functions for extracting data from database
 as well as plotting of DA polar plots.
+
+The plots are rendered with the non-interactive ``Agg`` backend, without ``pyplot``,
+so no figures are kept in memory after saving and the plots of multiple studies can be
+created in parallel processes (see :func:`create_polar_plots_for_jobs`).
+Multiple studies are post-processed at once with :func:`post_process_da_for_jobs`.
 """
 
 from __future__ import annotations
 
 import logging
+import multiprocessing
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
 from typing import TYPE_CHECKING, Any
 
 import numpy as np
-from generic_parser import DotDict
+import pandas as pd
 from matplotlib import lines as mlines
-from matplotlib import pyplot as plt
 from matplotlib import rcParams
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
 from scipy.interpolate import interp1d
-from tfs import TfsDataFrame, write_tfs
+from tfs import TfsDataFrame, read_tfs, write_tfs
 
 from pylhc_submitter.constants.autosix import (
-    ALOST1,
     ALOST2,
     AMP,
     ANGLE,
+    DA_COLUMNS,
     HEADER_HINT,
     HEADER_INFO,
     HEADER_NTOTAL,
@@ -35,22 +46,24 @@ from pylhc_submitter.constants.autosix import (
     STD,
     N,
     get_autosix_results_path,
+    get_da_cache_path,
+    get_database_path,
     get_tfs_da_angle_stats_path,
     get_tfs_da_path,
     get_tfs_da_seed_stats_path,
 )
-from pylhc_submitter.sixdesk_tools.extract_data_from_db import extract_da_data
+from pylhc_submitter.sixdesk_tools.extract_data_from_db import (
+    extract_da_data,
+    extract_da_data_for_jobs,
+)
 
 if TYPE_CHECKING:
     from collections.abc import Iterable
     from pathlib import Path
 
-    import pandas as pd
-
 
 LOG = logging.getLogger(__name__)
 
-DA_COLUMNS = (ALOST1, ALOST2)
 INFO = (
     "Statistics over the N={n:d} {over:s} per {per:s}. "
     "The N-Columns indicate how many non-zero DA values were used."
@@ -67,6 +80,8 @@ ALPHA_SEED = 0.5
 ALPHA_FILL = 0.2
 ALPHA_FILL_STD = 0.2
 
+DA_CACHE_VERSION = 1  # increase, if the cached dataframes change
+
 
 def post_process_da(jobname: str, basedir: Path):
     """Post process the DA results into dataframes and DA plots."""
@@ -76,30 +91,132 @@ def post_process_da(jobname: str, basedir: Path):
     LOG.info("Post-Processing finished.")
 
 
+def post_process_da_for_jobs(
+    jobnames: Iterable[str], basedir: Path, max_workers: int | None = None
+):
+    """Post process the DA results of multiple jobs at once.
+    The databases of the jobs without cached DA data are read concurrently
+    and the polar plots are created in parallel processes.
+
+    Args:
+        jobnames (Iterable[str]): Names of the Jobs
+        basedir (Path): SixDesk Basefolder Location
+        max_workers (int): Number of databases to read and plots to create at the same time.
+    """
+    jobnames = list(jobnames)
+    LOG.info(f"Post-Processing Sixdesk Results of {len(jobnames):d} jobs.")
+    cache_keys = {jobname: _get_da_cache_key(jobname, basedir) for jobname in jobnames}
+    to_extract = [
+        jobname
+        for jobname, cache_key in cache_keys.items()
+        if _get_cached_da_tfs(jobname, basedir, cache_key) is None
+    ]
+    LOG.debug(f"Extracting DA data of {len(to_extract):d} jobs with changed databases.")
+    extracted = extract_da_data_for_jobs(to_extract, basedir, max_workers=max_workers)
+    for jobname, df_da in extracted.items():
+        _write_da_tfs(jobname, basedir, df_da, cache_keys[jobname])
+
+    create_polar_plots_for_jobs(jobnames, basedir, max_workers=max_workers)
+    LOG.info("Post-Processing finished.")
+
+
 # Data Analysis ----------------------------------------------------------------
 
 
 def create_da_tfs(jobname: str, basedir: Path) -> tuple[TfsDataFrame, TfsDataFrame, TfsDataFrame]:
     """Extracts data from db into dataframes, and writes and returns them.
+    The dataframes are cached (in the ``autosix_output``) and
+    only created again, if the database has changed or the cache can not be read.
 
     Args:
         jobname (str): Name of the Job
         basedir (Path): SixDesk Basefolder Location
     """
     LOG.info("Gathering DA data into tfs-files.")
-    df_da = extract_da_data(jobname, basedir)
+    cache_key = _get_da_cache_key(jobname, basedir)
+    cached = _get_cached_da_tfs(jobname, basedir, cache_key)
+    if cached is not None:
+        return cached
+    return _write_da_tfs(jobname, basedir, extract_da_data(jobname, basedir), cache_key)
+
+
+def _get_tfs_paths(jobname: str, basedir: Path) -> tuple[Path, Path, Path]:
+    return (
+        get_tfs_da_path(jobname, basedir),
+        get_tfs_da_angle_stats_path(jobname, basedir),
+        get_tfs_da_seed_stats_path(jobname, basedir),
+    )
+
+
+def _get_cached_da_tfs(
+    jobname: str, basedir: Path, cache_key: tuple[Any, ...]
+) -> tuple[TfsDataFrame, ...] | None:
+    """The cached DA dataframes, if the database is unchanged and the tfs-files are present."""
+    cached = _read_da_cache(jobname, basedir, cache_key)
+    if cached is None or not all(path.is_file() for path in _get_tfs_paths(jobname, basedir)):
+        return None
+    LOG.debug(f"Database of {jobname} unchanged, using cached DA data.")
+    return cached
+
+
+def _write_da_tfs(
+    jobname: str, basedir: Path, df_da: TfsDataFrame, cache_key: tuple[Any, ...]
+) -> tuple[TfsDataFrame, TfsDataFrame, TfsDataFrame]:
+    """Create the statistics of the extracted DA data, write all of them and cache them."""
     df_angle = _create_stats_df(df_da, ANGLE)
     df_seed = _create_stats_df(df_da, SEED, global_index=0)
 
-    write_tfs(get_tfs_da_path(jobname, basedir), df_da)
-    write_tfs(get_tfs_da_angle_stats_path(jobname, basedir), df_angle, save_index=ANGLE)
-    write_tfs(get_tfs_da_seed_stats_path(jobname, basedir), df_seed, save_index=SEED)
+    da_path, angle_path, seed_path = _get_tfs_paths(jobname, basedir)
+    write_tfs(da_path, df_da)
+    write_tfs(angle_path, df_angle, save_index=ANGLE)
+    write_tfs(seed_path, df_seed, save_index=SEED)
+    _write_da_cache(jobname, basedir, cache_key, (df_da, df_angle, df_seed))
     return df_da, df_angle, df_seed
 
 
+def _get_da_cache_key(jobname: str, basedir: Path) -> tuple[Any, ...]:
+    """Key identifying the state of the database."""
+    db_path = get_database_path(jobname, basedir).resolve()
+    stat = db_path.stat()
+    return DA_CACHE_VERSION, str(db_path), stat.st_size, stat.st_mtime_ns
+
+
+def _read_da_cache(
+    jobname: str, basedir: Path, key: tuple[Any, ...]
+) -> tuple[TfsDataFrame, ...] | None:
+    """Read the cached DA dataframes, if they match the key.
+    Caches that can not be read, e.g. written with other versions of ``pandas`` or ``tfs``,
+    are ignored, so that the dataframes are created again."""
+    cache_path = get_da_cache_path(jobname, basedir)
+    try:
+        with cache_path.open("rb") as cache_file:
+            cached_key, dfs = pickle.load(cache_file)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        LOG.debug(f"Could not read DA cache {str(cache_path)}, ignoring it.", exc_info=True)
+        return None
+
+    if cached_key != key:
+        return None
+    return dfs
+
+
+def _write_da_cache(
+    jobname: str, basedir: Path, key: tuple[Any, ...], dfs: tuple[TfsDataFrame, ...]
+):
+    """Cache the DA dataframes on disk."""
+    cache_path = get_da_cache_path(jobname, basedir)
+    tmp_path = cache_path.with_name(f".{cache_path.name}.{os.getpid()}.tmp")
+    with tmp_path.open("wb") as cache_file:
+        pickle.dump((key, tuple(dfs)), cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp_path.replace(cache_path)
+
+
 def _create_stats_df(df: pd.DataFrame, parameter: str, global_index: Any = None) -> TfsDataFrame:
     """Calculates the stats over a given parameter.
-    Note: Could be refactored to use `group_by`.
+    Only the non-zero DA values are used, the amplitude limits are taken from the
+    entries with non-zero values in the last DA-column.
 
     Args:
         df (DataFrame): DataFrame containing the DA information over all seeds.
@@ -109,47 +226,42 @@ def _create_stats_df(df: pd.DataFrame, parameter: str, global_index: Any = None)
                             over all entries are stored here. (e.g. '0' for SEEDs)
 
     """
-    operation_map = DotDict({MEAN: np.mean, STD: np.std, MIN: np.min, MAX: np.max})
-
-    pre_index = [] if global_index is None else [global_index]
     index = sorted(set(df[parameter]))
     n_total = sum(df[parameter] == index[0])
 
-    df_stats = TfsDataFrame(
-        index=pre_index + index,
-        columns=[f"{fun}{al}" for al in DA_COLUMNS for fun in list(operation_map.keys()) + [N]],
-    )
+    df_nonzero = pd.DataFrame({col_da: df[col_da].where(df[col_da] != 0) for col_da in DA_COLUMNS})
+    for name in (MIN, MAX):
+        df_nonzero[f"{name}{AMP}"] = df[f"{name}{AMP}"].where(df[DA_COLUMNS[-1]] != 0)
+
+    grouped = df_nonzero.groupby(df[parameter])
+    stats = {
+        MEAN: grouped.mean(),
+        STD: grouped.std(ddof=0),
+        MIN: grouped.min(),
+        MAX: grouped.max(),
+        N: grouped.count(),
+    }
+    if global_index is not None:
+        # Note: STD can not be calculated from the grouped stats, so all are calculated over df
+        global_stats = {
+            MEAN: df_nonzero.mean(),
+            STD: df_nonzero.std(ddof=0),
+            MIN: df_nonzero.min(),
+            MAX: df_nonzero.max(),
+            N: df_nonzero.count(),
+        }
+        for name, stat in stats.items():
+            stats[name] = pd.concat([global_stats[name].to_frame(global_index).T, stat])
+
+    columns = {f"{name}{col_da}": stats[name][col_da] for col_da in DA_COLUMNS for name in stats}
+    columns.update({f"{name}{AMP}": stats[name][f"{name}{AMP}"] for name in (MIN, MAX)})
+    df_stats = TfsDataFrame(columns)
     df_stats.headers[HEADER_INFO] = INFO.format(
         over=OVER_WHICH[parameter], per=parameter.lower(), n=n_total
     )
     df_stats.headers[HEADER_NTOTAL] = n_total
-
-    for col_da in DA_COLUMNS:
-        for idx in index:
-            mask = (df[parameter] == idx) & (df[col_da] != 0)
-            df_stats.loc[idx, f"{N}{col_da}"] = sum(mask)
-            for name, operation in operation_map.items():
-                df_stats.loc[idx, f"{name}{col_da}"] = operation(df.loc[mask, col_da])
-            for name, operation in operation_map.get_subdict([MIN, MAX]).items():
-                df_stats.loc[idx, f"{name}{AMP}"] = operation(df.loc[mask, f"{name}{AMP}"])
-
-        if global_index is not None:
-            # Note: could be done over df_stats for MEAN, MIN and MAX, but not STD
-            mask = df[col_da] != 0
-            df_stats.loc[global_index, f"{N}{col_da}"] = sum(mask)
-
-            # Global MEAN, MIN, MAX Dynamic Aperture
-            for name, operation in operation_map.get_subdict([MEAN, MIN, MAX, STD]).items():
-                df_stats.loc[global_index, f"{name}{col_da}"] = operation(df.loc[mask, col_da])
-
-            # Global MIN, MAX Amplitudes
-            for name, operation in operation_map.get_subdict([MIN, MAX]).items():
-                df_stats.loc[global_index, f"{name}{AMP}"] = operation(
-                    df.loc[mask, f"{name}{AMP}"]  # min(MINA) and max(MAXA)
-                )
-
-            df_stats.headers[HEADER_HINT] = HINT.format(param=parameter, val=global_index)
-
+    if global_index is not None:
+        df_stats.headers[HEADER_HINT] = HINT.format(param=parameter, val=global_index)
     return df_stats
 
 
@@ -169,10 +281,35 @@ def create_polar_plots(jobname: str, basedir: Path, df_da: TfsDataFrame, df_angl
     outdir_path = get_autosix_results_path(jobname, basedir)
     for da_col in DA_COLUMNS:
         fig = plot_polar(df_angles, da_col, jobname, df_da)
-        fig.tight_layout(), fig.tight_layout()
-        fig.savefig(outdir_path / fig.canvas.get_default_filename())
+        fig.savefig(outdir_path / f"{jobname}_polar_plot_for_{da_col}.png")
+        fig.clear()  # release the artists right away
+
+
+def create_polar_plots_for_jobs(
+    jobnames: Iterable[str], basedir: Path, max_workers: int | None = None
+):
+    """Create the polar plots of multiple jobs in parallel processes,
+    from their (already written) DA tfs-files.
+
+    Args:
+        jobnames (Iterable[str]): Names of the Jobs
+        basedir (Path): SixDesk Basefolder Location
+        max_workers (int): Number of processes to use. Defaults to the number of CPUs.
+    """
+    jobnames = list(jobnames)
+    # spawn, as forking a (possibly) multi-threaded process is unsafe
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+        futures = [pool.submit(_create_polar_plots_from_tfs, job, basedir) for job in jobnames]
+    for future in futures:
+        future.result()  # raises possible errors
+    LOG.info(f"Created Polar Plots for {len(jobnames):d} jobs.")
 
-    # plt.show()
+
+def _create_polar_plots_from_tfs(jobname: str, basedir: Path):
+    df_da = read_tfs(get_tfs_da_path(jobname, basedir))
+    df_angles = read_tfs(get_tfs_da_angle_stats_path(jobname, basedir), index=ANGLE)
+    create_polar_plots(jobname, basedir, df_da, df_angles)
 
 
 def plot_polar(
@@ -181,8 +318,9 @@ def plot_polar(
     jobname: str = "",
     df_da: TfsDataFrame = None,
     **kwargs,
-) -> plt.Figure:
+) -> Figure:
     """Create Polar Plot for DA analysis data.
+    The figure is rendered with the ``Agg`` backend and not registered in ``pyplot``.
 
     Keyword arguments are all optional.
 
@@ -210,8 +348,10 @@ def plot_polar(
 
     if "lines.marker" not in kwargs:
         kwargs["lines.marker"] = "None"
-    fig, ax = plt.subplots(nrows=1, ncols=1, subplot_kw={"projection": "polar"})
-    fig.canvas.manager.set_window_title(f"{jobname} polar plot for {da_col}")
+    fig = Figure(layout="tight")
+    FigureCanvasAgg(fig)
+    fig.set_label(f"{jobname} polar plot for {da_col}")
+    ax = fig.subplots(nrows=1, ncols=1, subplot_kw={"projection": "polar"})
 
     angles = np.deg2rad(df_angles.index)
     da_min, da_mean, da_max, da_std = (
@@ -252,6 +392,9 @@ def plot_polar(
 
 def _plot_seeds(ax, df_da: TfsDataFrame, da_col: str, interpolated: bool) -> tuple[list, list]:
     """Add the Seed lines to the polar plots, if df_da is given.
+    The DA of all seeds is pivoted into a (seed x angle) array, interpolated at once
+    and drawn as a single ``LineCollection``. Of duplicated (seed, angle) entries,
+    only the first one is plotted.
 
     Args:
         ax: Axes to plot in
@@ -262,29 +405,33 @@ def _plot_seeds(ax, df_da: TfsDataFrame, da_col: str, interpolated: bool) -> tup
     Returns:
         Tuple of list of one line handle and a list of a single label
     """
-    if df_da is not None:
-        seed_h = None
-        for seed in sorted(set(df_da[SEED])):
-            seed_mask = df_da[SEED] == seed
-            angles = np.deg2rad(df_da.loc[seed_mask, ANGLE])
-            da_data = df_da.loc[seed_mask, da_col]
-            da_data.loc[da_data == 0] = np.nan
-            if interpolated:
-                seed_h, _, _ = _interpolated_line(
-                    ax,
-                    angles,
-                    da_data,
-                    c=COLOR_SEED,
-                    ls="-",
-                    label=f"Seed {seed:d}",
-                    alpha=ALPHA_SEED,
-                )
-            else:
-                (seed_h,) = ax.plot(
-                    angles, da_data, c=COLOR_SEED, ls="-", label=f"Seed {seed:d}", alpha=ALPHA_SEED
-                )
-        return [seed_h], ["DA per Seed"]
-    return [], []
+    if df_da is None:
+        return [], []
+
+    duplicated = df_da.duplicated([SEED, ANGLE])
+    if duplicated.any():
+        LOG.warning(f"Ignoring {duplicated.sum():d} duplicated seed/angle entries in the plot.")
+        df_da = df_da.loc[~duplicated]
+
+    df_seeds = df_da.pivot(index=SEED, columns=ANGLE, values=da_col)
+    angles = np.deg2rad(df_seeds.columns.to_numpy(dtype=float))
+    da_data = df_seeds.to_numpy(dtype=float)
+    da_data = np.where(da_data == 0, np.nan, da_data)
+
+    if interpolated:
+        angles, da_data = _interpolated_coords(angles, da_data)
+
+    segments = np.stack(np.broadcast_arrays(angles, da_data), axis=-1)
+    ax.add_collection(
+        LineCollection(
+            segments, colors=COLOR_SEED, linestyles="-", alpha=ALPHA_SEED, label="_DA per Seed"
+        )
+    )
+    ax.autoscale_view()
+
+    # fake handle for legend
+    seed_h = mlines.Line2D([], [], color=COLOR_SEED, ls="-", alpha=ALPHA_SEED, label="DA per Seed")
+    return [seed_h], ["DA per Seed"]
 
 
 def _plot_interpolated(ax, angles, da_min, da_mean, da_max, da_std, fill):
@@ -345,7 +492,8 @@ def _interpolated_line(ax, x, y, npoints: int = 100, **kwargs):
 
 
 def _interpolated_coords(x, y, npoints: int = 100):
-    """Do linear interpolation between points."""
-    ip_x = np.linspace(min(x), max(x), npoints)
-    ip_y = interp1d(x, y)(ip_x)
+    """Do linear interpolation between points.
+    ``y`` can be 2D, with one line per row."""
+    ip_x = np.linspace(np.min(x), np.max(x), npoints)
+    ip_y = interp1d(x, y, axis=-1)(ip_x)
     return ip_x, ip_y
@@ -0,0 +1,203 @@
+"""
+Scheduler Queries
+-----------------
+
+Cheap checks of the HTCondor queue, to see whether the jobs submitted by the
+SixDesk scripts of a workspace are still queued or running.
+
+The input-generation and tracking jobs of a workspace are all run from
+directories containing the name of the workspace (i.e. the ``sixtrack_input``
+and ``trackdir`` as defined in the ``sixdeskenv``),
+so a single query of the queue is enough to check all workspaces.
+
+In addition, the materialization limits of the (late materializing) tracking jobs
+of all workspaces can be balanced, so that together they use a given total budget.
+Clusters left without budget get a limit of 0, i.e. are paused until the next balancing.
+New workspaces reserve a provisional share of the budget before their submission.
+All changes of the limits are serialized within the process by ``MATERIALIZE_LOCK``.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import subprocess
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from pylhc_submitter.constants.autosix import get_workspace_path
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+LOG = logging.getLogger(__name__)
+
+QUEUE_COMMAND = ["condor_q", "-autoformat:t", "ClusterId", "Iwd", "Args"]
+FACTORY_COMMAND = [
+    "condor_q",
+    "-factory",
+    "-autoformat:t",
+    "ClusterId",
+    "Iwd",
+    "TotalSubmitProcs",
+    "JobMaterializeNextProcId",
+    "JobMaterializeLimit",
+]
+EDIT_COMMAND = ["condor_qedit"]
+MATERIALIZE_LIMIT_ATTRIBUTE = "JobMaterializeLimit"
+
+# Hold while reserving budget, submitting and balancing, so that workspaces run in
+# parallel do not distribute the same budget.
+MATERIALIZE_LOCK = threading.RLock()
+
+
+def get_queued_jobs(jobnames: Iterable[str], basedir: Path, ssh: str | None = None) -> set[str]:
+    """Returns the names of the jobs, whose workspaces still have jobs in the HTCondor queue.
+
+    Args:
+        jobnames (Iterable[str]): Names of the jobs/workspaces to check.
+        basedir (Path): SixDesk Basefolder Location
+        ssh (str): Run ``condor_q`` on this machine via ssh.
+    """
+    queue = query_queue(ssh=ssh)
+    queued = set()
+    for jobname in jobnames:
+        workspace = re.escape(get_workspace_path(jobname, basedir).name)
+        if re.search(rf"(?:^|/){workspace}(?=/|\s|$)", queue, flags=re.MULTILINE):
+            queued.add(jobname)
+    return queued
+
+
+def reserve_materialize_budget(basedir: Path, total: int, ssh: str | None = None) -> int:
+    """Reserves a provisional share of the ``total`` materialization budget for the
+    tracking jobs of a new workspace, i.e. an equal share among the tracking job-clusters
+    of the study and the new one. The other clusters are balanced to the rest of the budget,
+    so that all limits never sum up to more than the ``total``.
+    Once the new jobs are submitted, the limits should be balanced again
+    (see :func:`balance_materialize_limits`).
+
+    Args:
+        basedir (Path): SixDesk Basefolder Location
+        total (int): Total number of jobs to be materialized for the whole study.
+        ssh (str): Run ``condor_q`` and ``condor_qedit`` on this machine via ssh.
+
+    Returns:
+        int: The materialization limit for the new workspace.
+        0 if there is not enough budget left to share with another cluster.
+    """
+    with MATERIALIZE_LOCK:
+        factories = _get_outstanding_factories(basedir, ssh=ssh)
+        share = total // (len(factories) + 1)
+        if share:
+            _set_materialize_limits(factories, total - share, ssh=ssh)
+    return share
+
+
+def balance_materialize_limits(basedir: Path, total: int, ssh: str | None = None) -> dict[int, int]:
+    """Distributes the ``total`` materialization budget among the tracking job-clusters
+    of the study, weighted by their number of outstanding (i.e. not yet finished) jobs.
+    The remainder of the integer division is given to the clusters with the largest
+    fractional shares, so that the limits never sum up to more than the ``total``.
+
+    Args:
+        basedir (Path): SixDesk Basefolder Location
+        total (int): Total number of jobs to be materialized for the whole study.
+        ssh (str): Run ``condor_q`` and ``condor_qedit`` on this machine via ssh.
+
+    Returns:
+        Dict[int, int]: The new materialization limits per cluster-id.
+    """
+    with MATERIALIZE_LOCK:
+        limits = _set_materialize_limits(_get_outstanding_factories(basedir, ssh=ssh), total, ssh)
+    if limits:
+        LOG.info(f"Distributed materialization budget of {total:d} among {len(limits):d} clusters.")
+    return limits
+
+
+def get_study_factories(basedir: Path, ssh: str | None = None) -> list[dict[str, int | None]]:
+    """Returns the job-factories (i.e. late materializing clusters) run from within the
+    ``basedir``, with their cluster-id, current materialization limit (``None`` if not set)
+    and the number of outstanding jobs (not yet materialized + still in the queue).
+
+    Args:
+        basedir (Path): SixDesk Basefolder Location
+        ssh (str): Run ``condor_q`` on this machine via ssh.
+    """
+    in_queue = Counter(line.split("\t")[0] for line in query_queue(ssh=ssh).splitlines())
+
+    factories = []
+    for line in _run_condor(FACTORY_COMMAND, ssh=ssh).splitlines():
+        cluster, iwd, n_procs, next_proc, limit = line.split("\t")
+        if not Path(iwd).is_relative_to(basedir.absolute()):
+            continue
+
+        n_unmaterialized = max(0, int(n_procs) - int(next_proc))
+        factories.append(
+            {
+                "cluster": int(cluster),
+                "limit": int(limit) if limit.isdigit() else None,
+                "outstanding": n_unmaterialized + in_queue[cluster],
+            }
+        )
+    return factories
+
+
+def query_queue(ssh: str | None = None) -> str:
+    """Returns the cluster-id, working directory and arguments of all jobs in the
+    HTCondor queue, one job per line (tab-separated).
+
+    Args:
+        ssh (str): Run ``condor_q`` on this machine via ssh.
+    """
+    return _run_condor(QUEUE_COMMAND, ssh=ssh)
+
+
+def _get_outstanding_factories(
+    basedir: Path, ssh: str | None = None
+) -> list[dict[str, int | None]]:
+    """The job-factories of the study, which still have outstanding jobs."""
+    return [f for f in get_study_factories(basedir, ssh=ssh) if f["outstanding"]]
+
+
+def _set_materialize_limits(
+    factories: list[dict[str, int | None]], total: int, ssh: str | None = None
+) -> dict[int, int]:
+    """Set the limits of the factories to their share of the ``total``,
+    weighted by their outstanding jobs (see :func:`balance_materialize_limits`)."""
+    if not factories:
+        return {}
+
+    n_outstanding = sum(factory["outstanding"] for factory in factories)
+    shares = {f["cluster"]: divmod(total * f["outstanding"], n_outstanding) for f in factories}
+    limits = {cluster: share for cluster, (share, _) in shares.items()}
+    by_fraction = sorted(shares, key=lambda cluster: shares[cluster][1], reverse=True)
+    for cluster in by_fraction[: total - sum(limits.values())]:
+        limits[cluster] += 1
+
+    for factory in factories:
+        limit = limits[factory["cluster"]]
+        if limit != factory["limit"]:
+            LOG.debug(
+                f"Setting {MATERIALIZE_LIMIT_ATTRIBUTE} of cluster {factory['cluster']} to {limit}"
+            )
+            _run_condor(
+                EDIT_COMMAND + [str(factory["cluster"]), MATERIALIZE_LIMIT_ATTRIBUTE, str(limit)],
+                ssh=ssh,
+            )
+    return limits
+
+
+def _run_condor(command: list[str], ssh: str | None = None) -> str:
+    """Runs the given HTCondor command (on the ``ssh`` machine) and returns its output."""
+    name = command[0]
+    if ssh:
+        command = ["ssh", ssh, " ".join(command)]
+
+    LOG.debug(f"Running '{' '.join(command)}'")
+    try:
+        process = subprocess.run(command, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise OSError(f"HTCondor command '{name}' failed: {e}") from e
+    return process.stdout
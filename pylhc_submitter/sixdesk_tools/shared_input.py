@@ -0,0 +1,121 @@
+"""
+Shared SixTrack Input
+---------------------
+
+Tools to share the sixtrack-input (i.e. the output of ``mad6t.sh``) between workspaces.
+
+Workspaces that differ only in their tracking settings (e.g. ``TURNS``, ``AMP*``,
+``ANGLES`` or ``EMITTANCE``) generate the same sixtrack-input files for each seed.
+Such workspaces are identified by a key, hashed from everything that goes into
+the input generation, i.e. the filled mask, the seeds, the executable and the
+SixDesk installation used. The mask is hashed as run by ``mad6t.sh``, i.e. with the
+``sixdeskenv`` values it substitutes (e.g. the ``EMITTANCE`` for ``%EMIT_BEAM``),
+so that these settings only prevent the sharing, if they are actually used in the mask.
+The first workspace to claim a key generates the input,
+all other workspaces with the same key link to its files, once they are present.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+from typing import TYPE_CHECKING
+
+from pylhc_submitter.constants.autosix import (
+    SEED_KEYS,
+    SixDeskEnvironment,
+    get_masks_path,
+    get_scratch_sixtrack_input_path,
+    get_sixdeskenv_path,
+)
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pylhc_submitter.constants.autosix import AutoSixEnvironment
+
+LOG = logging.getLogger(__name__)
+
+SIXTRACK_INPUT_GLOB = "fort.*"
+
+# Placeholders in the mask, which ``mad6t.sh`` replaces by these sixdeskenv variables.
+# (``%SEEDRAN`` is replaced by the seed, the seeds are part of the key anyway.)
+MAD6T_SUBSTITUTIONS = {"%NPART": "bunch_charge", "%EMIT_BEAM": "emit_beam", "%XING": "xing"}
+EXPORT_REGEX = re.compile(r'^export\s+(\w+)=("[^"]*"|\S*)')
+
+
+def get_sixtrack_input_key(
+    jobname: str, basedir: Path, jobargs: dict, env: AutoSixEnvironment
+) -> str:
+    """Key identifying the sixtrack-input generated by the given job.
+    The mask is hashed with the sixdeskenv values substituted by ``mad6t.sh``,
+    i.e. the sixdeskenv of the workspace needs to be created already.
+
+    Args:
+        jobname (str): Name of the job/study
+        basedir (Path): SixDesk Basefolder Location
+        jobargs(dict): All Key=Values used to fill the mask and the sixdeskenv.
+        env (DotDict): The ensemble of autosix settings as an ``AutoSixEnvironment`` object.
+    """
+    mask_text = (get_masks_path(jobname, basedir) / f"{jobname}.mask").read_text()
+    mask_text = _substitute_like_mad6t(mask_text, jobname, basedir)
+    seeds = [jobargs.get(key, getattr(SixDeskEnvironment, key)) for key in SEED_KEYS]
+    runtype = jobargs.get("RUNTYPE", SixDeskEnvironment.RUNTYPE)
+    items = [
+        mask_text,
+        str(seeds),
+        runtype,
+        str(env.executable),
+        str(env.sixdesk_directory),
+        str(env.apply_mad6t_hacks),
+    ]
+    return hashlib.sha256("\0".join(items).encode()).hexdigest()
+
+
+def _substitute_like_mad6t(mask_text: str, jobname: str, basedir: Path) -> str:
+    """Replace the placeholders in the mask by the values of the sixdeskenv, as ``mad6t.sh`` does."""
+    placeholders = [p for p in MAD6T_SUBSTITUTIONS if p in mask_text]
+    if not placeholders:
+        return mask_text
+
+    variables = _read_sixdeskenv_variables(jobname, basedir)
+    for placeholder in placeholders:
+        mask_text = mask_text.replace(
+            placeholder, variables.get(MAD6T_SUBSTITUTIONS[placeholder], "")
+        )
+    return mask_text
+
+
+def _read_sixdeskenv_variables(jobname: str, basedir: Path) -> dict[str, str]:
+    """The variables exported (unconditionally) in the sixdeskenv of the job,
+    with references to previously exported variables resolved."""
+    variables = {}
+    for line in get_sixdeskenv_path(jobname, basedir).read_text().splitlines():
+        match = EXPORT_REGEX.match(line)
+        if match is None:
+            continue
+        name, value = match.groups()
+        variables[name] = re.sub(
+            r"\$\{?(\w+)\}?", lambda ref: variables.get(ref.group(1), ""), value.strip('"')
+        )
+    return variables
+
+
+def link_sixtrack_input(owner: str, jobname: str, basedir: Path):
+    """Link the sixtrack-input files generated by the owner into the
+    sixtrack-input directory of the given job."""
+    owner_path = get_scratch_sixtrack_input_path(owner, basedir)
+    input_path = get_scratch_sixtrack_input_path(jobname, basedir)
+    input_path.mkdir(parents=True, exist_ok=True)
+
+    files = sorted(owner_path.glob(SIXTRACK_INPUT_GLOB))
+    if not files:
+        raise OSError(f"No sixtrack-input files found in {str(owner_path)}.")
+
+    for file_path in files:
+        link_path = input_path / file_path.name
+        if link_path.is_symlink() or link_path.exists():
+            link_path.unlink()
+        link_path.symlink_to(file_path)
+    LOG.info(f"Linked {len(files):d} sixtrack-input files from {owner}.")
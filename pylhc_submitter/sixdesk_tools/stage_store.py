@@ -0,0 +1,239 @@
+"""
+Stage Store
+-----------
+
+Keeps track of the stages run in all workspaces of a study,
+in a single file in the autosix working directory.
+
+For each job, the store contains the names of the completed stages (in order)
+and the history of all stage-runs, with their start- and end-times and outcome.
+Consecutive runs of the same stage, which did not complete (e.g. waiting for the
+scheduler in every ``watch`` interval), are collapsed into a single entry counting the runs.
+In addition, the store keeps track of which job generates the sixtrack-input,
+that is shared between workspaces.
+
+The store is only read again when it has changed on disk, and every update
+is done under a lock, on a freshly read store, which then replaces the old
+file at once. This way, multiple autosix runs (or threads)
+can safely work in the same working directory at the same time.
+
+The ``stages_completed.txt`` files, in which the completed stages were
+stored per workspace before, are migrated into the store when a job is first found.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any
+
+from pylhc_submitter.constants.autosix import (
+    get_stage_store_path,
+    get_stagefile_path,
+)
+
+try:
+    import fcntl
+except ImportError:  # not on unix, only locking between threads
+    fcntl = None
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Sequence
+    from pathlib import Path
+
+LOG = logging.getLogger(__name__)
+
+# Outcomes of a stage-run
+COMPLETED = "completed"  # stage has run successfully
+STOPPED = "stopped"  # stage has run successfully, jobs have been submitted
+RESUBMITTED = "resubmitted"  # stage has not completed, but resubmitted jobs
+WAITING = "waiting"  # stage has not completed, as it waits for jobs
+SKIPPED = "skipped"  # stage has not completed or was skipped on purpose
+FAILED = "failed"  # stage has raised an error
+COMPLETING_OUTCOMES = (COMPLETED, STOPPED)
+REPEATING_OUTCOMES = (WAITING, SKIPPED)  # collapsed in the history, if consecutive
+
+_LOCK = threading.RLock()
+_CACHE: dict[Path, tuple[tuple[int, int, int], dict[str, Any]]] = {}
+
+
+# Read -------------------------------------------------------------------------
+
+
+def get_completed_stages(jobname: str, basedir: Path) -> list[str]:
+    """Names of the stages completed for the given job, in the order they have been run."""
+    job = read_store(basedir)["jobs"].get(jobname)
+    if job is None:
+        return _read_stagefile(jobname, basedir)
+    return list(job["completed"])
+
+
+def get_stage_history(jobname: str, basedir: Path) -> list[dict[str, Any]]:
+    """All stage-runs of the given job, with their start- and end-times and outcome."""
+    job = read_store(basedir)["jobs"].get(jobname)
+    if job is None:
+        return []
+    return copy.deepcopy(job["history"])
+
+
+def get_sixtrack_input_owner(jobname: str, basedir: Path) -> str | None:
+    """Name of the job generating the sixtrack-input used by the given job,
+    or ``None`` if it has not been claimed (i.e. the input is not shared)."""
+    job = read_store(basedir)["jobs"].get(jobname)
+    if job is None:
+        return None
+    return job.get("sixtrack_input")
+
+
+def get_study_progress(basedir: Path) -> dict[str, list[str]]:
+    """Names of the completed stages of all jobs in the store (from a single read)."""
+    return {jobname: list(job["completed"]) for jobname, job in read_store(basedir)["jobs"].items()}
+
+
+def read_store(basedir: Path) -> dict[str, Any]:
+    """Read the store, if it has changed since the last read.
+    The returned dictionary is shared and should not be modified."""
+    store_path = get_stage_store_path(basedir)
+    with _LOCK:
+        try:
+            stat = store_path.stat()
+        except FileNotFoundError:
+            return _empty_store()
+
+        key = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        cached = _CACHE.get(store_path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        store = json.loads(store_path.read_text())
+        _CACHE[store_path] = (key, store)
+        return store
+
+
+# Write ------------------------------------------------------------------------
+
+
+def record_stage(
+    jobname: str, basedir: Path, stage_name: str, start: datetime, end: datetime, outcome: str
+):
+    """Add a stage-run to the history of the job and mark the stage as completed,
+    if the run was successful. A run repeating the outcome of the previous run of the
+    same stage (if waiting or skipped) only updates its entry, i.e. its end-time,
+    the total duration and the number of runs."""
+    with _update_store(basedir) as store:
+        job = _get_job(store, jobname, basedir)
+        history = job["history"]
+        duration = (end - start).total_seconds()
+        if (
+            outcome in REPEATING_OUTCOMES
+            and history
+            and history[-1]["stage"] == stage_name
+            and history[-1]["outcome"] == outcome
+        ):
+            history[-1]["end"] = end.isoformat()
+            history[-1]["duration"] += duration
+            history[-1]["runs"] = history[-1].get("runs", 1) + 1
+        else:
+            history.append(
+                {
+                    "stage": stage_name,
+                    "start": start.isoformat(),
+                    "end": end.isoformat(),
+                    "duration": duration,
+                    "outcome": outcome,
+                    "runs": 1,
+                }
+            )
+        if outcome in COMPLETING_OUTCOMES and stage_name not in job["completed"]:
+            job["completed"].append(stage_name)
+
+
+def claim_sixtrack_input(jobname: str, basedir: Path, key: str) -> str:
+    """Claim the generation of the sixtrack-input identified by ``key`` for the given job,
+    if no other job has claimed it before.
+
+    Returns:
+        str: The name of the job generating the sixtrack-input.
+    """
+    with _update_store(basedir) as store:
+        owner = store.setdefault("sixtrack_inputs", {}).setdefault(key, jobname)
+        _get_job(store, jobname, basedir)["sixtrack_input"] = owner
+    return owner
+
+
+def set_completed_stages(jobname: str, basedir: Path, stage_names: Sequence[str]):
+    """Overwrite the completed stages of the job (the history is kept)."""
+    with _update_store(basedir) as store:
+        _get_job(store, jobname, basedir)["completed"] = list(stage_names)
+
+
+def clear_stages(jobname: str, basedir: Path):
+    """Remove all completed stages of the job, e.g. after its workspace has been removed."""
+    if not get_completed_stages(jobname, basedir):
+        return
+    LOG.info(f"Clearing the completed stages of {jobname}.")
+    set_completed_stages(jobname, basedir, [])
+
+
+def migrate_stagefiles(basedir: Path, jobnames: Sequence[str]):
+    """Import the stagefiles of the given jobs into the store, if not already present."""
+    with _update_store(basedir) as store:
+        for jobname in jobnames:
+            _get_job(store, jobname, basedir)
+
+
+def now() -> datetime:
+    """Current time, as used in the store."""
+    return datetime.now(timezone.utc)
+
+
+# Helper -----------------------------------------------------------------------
+
+
+@contextmanager
+def _update_store(basedir: Path) -> Iterator[dict[str, Any]]:
+    """Context to modify the store. The store is read freshly under the lock and written
+    into a temporary file, which then replaces the old store at once."""
+    store_path = get_stage_store_path(basedir)
+    store_path.parent.mkdir(parents=True, exist_ok=True)
+    lock_path = store_path.with_name(f"{store_path.name}.lock")
+
+    with _LOCK, lock_path.open("a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            store = copy.deepcopy(read_store(basedir))
+            yield store
+
+            tmp_path = store_path.with_name(f".{store_path.name}.{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(store, indent=1))
+            tmp_path.replace(store_path)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _get_job(store: dict[str, Any], jobname: str, basedir: Path) -> dict[str, Any]:
+    """Get the entry of the job in the store, creating it (from the stagefile) if needed."""
+    if jobname not in store["jobs"]:
+        store["jobs"][jobname] = {"completed": _read_stagefile(jobname, basedir), "history": []}
+    return store["jobs"][jobname]
+
+
+def _read_stagefile(jobname: str, basedir: Path) -> list[str]:
+    """Read the completed stages from the stagefile, as written by previous versions."""
+    stage_file = get_stagefile_path(jobname, basedir)
+    if not stage_file.is_file():
+        return []
+
+    LOG.debug(f"Reading completed stages of {jobname} from {stage_file!s}.")
+    return [line.strip() for line in stage_file.read_text().split("\n") if line.strip()]
+
+
+def _empty_store() -> dict[str, Any]:
+    return {"jobs": {}}
@@ -4,6 +4,10 @@ Stages
 
 In this module the stages are organized.
 
+The modules needed by the analysis stages (``SixdbLoad``, ``SixdbCmd`` and ``PostProcess``)
+depend on ``numpy``, ``pandas``, ``scipy`` and ``matplotlib`` and are therefore only
+imported when these stages are run.
+
 """
 
 from __future__ import annotations
@@ -11,24 +15,42 @@ from __future__ import annotations
 import logging
 import re
 from abc import ABC, ABCMeta, abstractmethod
-from pathlib import Path
+from contextlib import contextmanager
+from functools import partial
+from typing import TYPE_CHECKING
 
 from generic_parser import DotDict
 
 from pylhc_submitter.constants.autosix import (
+    SIXENV_OPTIONAL,
+    SIXENV_REQUIRED,
     AutoSixEnvironment,
+    SixDeskEnvironment,
+    StageResubmitError,
     StageSkipError,
     StageStopError,
-    get_stagefile_path,
+    StageWaitError,
+    get_stage_store_path,
+    get_workspace_path,
 )
+from pylhc_submitter.sixdesk_tools import stage_store
 from pylhc_submitter.sixdesk_tools.create_workspace import (
     create_job,
+    create_sixdesk_overlay,
     fix_pythonfile_call,
     init_workspace,
     remove_twiss_fail_check,
     set_max_materialize,
 )
-from pylhc_submitter.sixdesk_tools.post_process_da import post_process_da
+from pylhc_submitter.sixdesk_tools.scheduler import (
+    MATERIALIZE_LOCK,
+    balance_materialize_limits,
+    reserve_materialize_budget,
+)
+from pylhc_submitter.sixdesk_tools.shared_input import (
+    get_sixtrack_input_key,
+    link_sixtrack_input,
+)
 from pylhc_submitter.sixdesk_tools.submit import (
     check_sixtrack_input,
     check_sixtrack_output,
@@ -37,6 +59,15 @@ from pylhc_submitter.sixdesk_tools.submit import (
     submit_mask,
     submit_sixtrack,
 )
+from pylhc_submitter.sixdesk_tools.track_tree import audit_track_tree
+from pylhc_submitter.utils.tracing import span
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from datetime import datetime
+    from pathlib import Path
+
+    import tfs
 
 LOG = logging.getLogger(__name__)
 
@@ -131,13 +162,32 @@ class Stage(ABC, metaclass=StageMeta):
     The stages themselves only need to implement the _run() method."""
 
     @staticmethod
-    def run_all_stages(jobname, jobargs, env):
-        """Run all stages in order."""
-        LOG.info(f"vv---------------- Job {jobname} -------------------vv")
-        for stage_name, stage_class in STAGE_ORDER.items():
+    def run_all_stages(
+        jobname,
+        jobargs,
+        env,
+        stages: Iterable[StageMeta] | None = None,
+        continued: bool = False,
+    ) -> bool:
+        """Run all stages in order, or only the given ``stages``.
+        If ``continued``, the stages continue a previous call for the job,
+        so the banners and the preparation of the stage-store are skipped.
+
+        Returns:
+            bool: ``True`` if the run stopped because jobs have been (re-)submitted
+            to the scheduler, which need to finish before the next stages can run.
+        """
+        if not continued:
+            LOG.info(f"vv---------------- Job {jobname} -------------------vv")
+            _prepare_stage_store(jobname, env.working_directory)
+        submitted = False
+        for stage_class in STAGE_ORDER.values() if stages is None else stages:
             stage = stage_class(jobname, jobargs, env)
             try:
                 stage.run()
+            except StageWaitError as e:
+                LOG.info(e)
+                submitted = True
             except StageSkipError as e:
                 if str(e):
                     LOG.error(e)
@@ -147,8 +197,11 @@ class Stage(ABC, metaclass=StageMeta):
                     f"Stopping after Stage '{stage!s}' as the submitted jobs will now run. "
                     f"Check `condor_q` for their progress and restart autosix when they are done."
                 )
+                submitted = True
                 break
-        LOG.info(f"^^---------------- Job {jobname} -------------------^^")
+        if not continued:
+            LOG.info(f"^^---------------- Job {jobname} -------------------^^")
+        return submitted
 
     def __init__(self, jobname: str, jobargs: dict, env: AutoSixEnvironment):
         self.jobname = jobname
@@ -158,7 +211,6 @@ class Stage(ABC, metaclass=StageMeta):
         # Helper ---
         self.basedir = env.working_directory
         self.max_stage = env.max_stage
-        self.stage_file = get_stagefile_path(self.jobname, self.basedir)
 
     def __str__(self):
         return self.name
@@ -189,64 +241,81 @@ class Stage(ABC, metaclass=StageMeta):
 
     def should_run_stage(self):
         """Checks if the stage should be run."""
-        if not self.stage_file.exists():
-            if self == 0:
-                return True
-            LOG.info(f"Stage '{self!s}' not run because previous stage(s) missing.")
+        reason = self._get_skip_reason()
+        if reason is not None:
+            LOG.info(reason)
             return False
+        return True
 
-        stage_file_txt = self.stage_file.read_text().split("\n")
-        run_stages = [line.strip() for line in stage_file_txt if line.strip()]
+    def _get_skip_reason(self) -> str | None:
+        """Reason why the stage should not be run, or ``None`` if it should."""
+        run_stages = stage_store.get_completed_stages(self.jobname, self.basedir)
+        if not run_stages:
+            if self == 0:
+                return None
+            return f"Stage '{self!s}' not run because previous stage(s) missing."
 
         if self.name in run_stages:
-            LOG.info(f"Stage '{self!s}' has already been run. Skipping.")
-            return False
+            return f"Stage '{self!s}' has already been run. Skipping."
 
         if self == 0:
-            return True
+            return None
 
         # check if user requested a stop at a certain stage
         if (self.max_stage is not None) and (self > self.max_stage):
-            LOG.info(
+            return (
                 f"Stage '{self!s}' would run after requested "
                 f"maximum stage '{self.max_stage!s}'. Skipping."
             )
-            return False
 
         # check if last run stage is also the stage before current stage in stage order
         if run_stages[-1] == (self - 1).name:
-            return True
+            return None
 
-        LOG.info(f"Stage '{self!s}' not run because previous stage(s) missing.")
-        return False
+        return f"Stage '{self!s}' not run because previous stage(s) missing."
 
-    def stage_done(self):
-        """Append current stage name to stagefile."""
-        with Path(self.stage_file).open("a+") as f:
-            f.write(f"{self!s}\n")
+    def stage_done(self, start: datetime, outcome: str = stage_store.COMPLETED):
+        """Record the run of the current stage in the stage-store."""
+        stage_store.record_stage(
+            self.jobname, self.basedir, self.name, start, stage_store.now(), outcome
+        )
 
     def run(self):
         """Run the Stage."""
         if not self.should_run_stage():
             return
 
+        start = stage_store.now()
         try:
-            self._run()
-        except StageStopError as e:
+            with span(
+                f"stage {self.name}",
+                expected=(StageSkipError, StageStopError),
+                jobname=self.jobname,
+            ):
+                self._run()
+        except StageStopError:
             # Stage indicates that it ran successfully,
             # but that there should be a stop in the loop.
-            self.stage_done()
-            raise e
-        except StageSkipError as e:
+            self.stage_done(start, stage_store.STOPPED)
+            raise
+        except StageResubmitError:
+            self.stage_done(start, stage_store.RESUBMITTED)
+            raise
+        except StageWaitError:
+            self.stage_done(start, stage_store.WAITING)
+            raise
+        except StageSkipError:
             # logged/handled outside
-            raise e
+            self.stage_done(start, stage_store.SKIPPED)
+            raise
         except Exception as e:
             # convert any exception to a StageSkipError,
             # so the other jobs can continue running.
             LOG.exception(str(e))
+            self.stage_done(start, stage_store.FAILED)
             raise StageSkipError(f"Stage {self!s} failed!") from e
 
-        self.stage_done()
+        self.stage_done(start)
 
     @abstractmethod
     def _run(self):
@@ -315,9 +384,19 @@ class SubmitMask(Stage):
     submit for input generation
     > cd $basedir/workspace-$jobname/sixjobs
     > /afs/cern.ch/project/sixtrack/SixDesk_utilities/pro/utilities/bash/mad6t.sh -s
+
+    If the sixtrack-input is shared, only the first workspace with the same
+    input claims and submits the input generation (manual).
     """
 
     def _run(self):
+        if self.env.share_sixtrack_input:
+            key = get_sixtrack_input_key(self.jobname, self.basedir, self.jobargs, self.env)
+            owner = stage_store.claim_sixtrack_input(self.jobname, self.basedir, key)
+            if owner != self.jobname:
+                LOG.info(f"Sixtrack-input is the same as for {owner}. Using its input.")
+                raise StageStopError()
+
         submit_mask(
             self.jobname, self.basedir, sixdesk=self.env.sixdesk_directory, ssh=self.env.ssh
         )
@@ -332,17 +411,43 @@ class CheckInput(Stage):
 
     If not, and resubmit is active
     > /afs/cern.ch/project/sixtrack/SixDesk_utilities/pro/utilities/bash/mad6t.sh -w
+
+    If the sixtrack-input is generated by another workspace, its files are linked
+    once they have been checked there (manual), and resubmission is left to that workspace.
     """
 
     def _run(self):
+        owner = stage_store.get_sixtrack_input_owner(self.jobname, self.basedir)
+        shared = owner not in (None, self.jobname)
+        if shared:
+            self._check_owner_input(owner)
+            link_sixtrack_input(owner, self.jobname, self.basedir)
+
         check_sixtrack_input(
             self.jobname,
             self.basedir,
             sixdesk=self.env.sixdesk_directory,
             ssh=self.env.ssh,
-            resubmit=self.env.resubmit,
+            resubmit=self.env.resubmit and not shared,
         )
 
+    def _check_owner_input(self, owner: str):
+        """Raises an error, if the input of the owner is not (yet) available."""
+        if self.name in stage_store.get_completed_stages(owner, self.basedir):
+            return
+
+        owner_runs = [
+            run
+            for run in stage_store.get_stage_history(owner, self.basedir)
+            if run["stage"] == self.name
+        ]
+        if owner_runs and owner_runs[-1]["outcome"] in (stage_store.SKIPPED, stage_store.FAILED):
+            raise StageSkipError(
+                f"Sixtrack-input generation failed in {owner}, which generates the input "
+                f"for {self.jobname}. Fix it there first."
+            )
+        raise StageWaitError(f"Waiting for the sixtrack-input generated by {owner}.")
+
 
 class SubmitSixtrack(Stage):
     """
@@ -352,19 +457,14 @@ class SubmitSixtrack(Stage):
     """
 
     def _run(self):
-        # adds max_materialize to tracking sub-file template
-        # might run into a race condition, this is why it's done here.
-        # Also I assume we use the same value for all jobs anyway.
-        set_max_materialize(self.env.sixdesk_directory, self.env.max_materialize)
-
-        submit_sixtrack(
-            self.jobname,
-            self.basedir,
-            sixdesk=self.env.sixdesk_directory,
-            ssh=self.env.ssh,
-            python=self.env.python2,
-        )
-
+        with _submission_sixdesk(self.jobname, self.basedir, self.env) as sixdesk:
+            submit_sixtrack(
+                self.jobname,
+                self.basedir,
+                sixdesk=sixdesk,
+                ssh=self.env.ssh,
+                python=self.env.python2,
+            )
         raise StageStopError()
 
 
@@ -379,9 +479,19 @@ class CheckSixtrackOutput(Stage):
     If not, and resubmit is active
     > cd $basedir/workspace-$jobname/sixjobs
     > /afs/cern.ch/project/sixtrack/SixDesk_utilities/pro/utilities/bash/run_six.sh -i
+
+    Without resubmit, the ``track`` directory is audited first (re-checking only
+    the directories changed since the last check, see ``track_tree``)
+    and ``run_status`` is skipped while there are cases without output.
+    Whether the output is complete is always decided by ``run_status``.
+    The SixDesk overlay (and materialization budget) for a resubmission
+    is only prepared, if the resubmission is actually needed.
     """
 
     def _run(self):
+        if not self.env.resubmit:
+            _check_track_tree(self.jobname, self.basedir)
+
         check_sixtrack_output(
             self.jobname,
             self.basedir,
@@ -389,6 +499,7 @@ class CheckSixtrackOutput(Stage):
             ssh=self.env.ssh,
             python=self.env.python2,
             resubmit=self.env.resubmit,
+            resubmit_sixdesk=partial(_submission_sixdesk, self.jobname, self.basedir, self.env),
         )
 
 
@@ -397,9 +508,18 @@ class SixdbLoad(Stage):
     Gather results into database via sixdb.
     > cd $basedir/workspace-$jobname/sixjobs
     > python3 /afs/cern.ch/project/sixtrack/SixDesk_utilities/pro/utilities/externals/SixDeskDB/sixdb . load_dir
+
+    With ``native_sixdb``, the results are instead loaded in parallel
+    into the store in ``autosix_output`` (see ``tracking_results``).
     """
 
     def _run(self):
+        if self.env.native_sixdb:
+            from pylhc_submitter.sixdesk_tools.tracking_results import load_tracking_results
+
+            load_tracking_results(self.jobname, self.basedir)
+            return
+
         sixdb_load(
             self.jobname,
             self.basedir,
@@ -418,9 +538,27 @@ class SixdbCmd(Stage):
     when fixed:
     > python3 /afs/cern.ch/project/sixtrack/SixDesk_utilities/pro/utilities/externals/SixDeskDB/sixdb $jobname da_vs_turns -turnstep 100 -outfile
     > python3 /afs/cern.ch/project/sixtrack/SixDesk_utilities/pro/utilities/externals/SixDeskDB/sixdb $jobname plot_da_vs_turns
+
+    With ``native_sixdb``, the DA and DA-vs-turns are instead calculated
+    from the tracking results directly (see ``dynamic_aperture``).
     """
 
     def _run(self):
+        if self.env.native_sixdb:
+            from pylhc_submitter.sixdesk_tools.dynamic_aperture import calculate_da
+
+            sixenv = SixDeskEnvironment(
+                **{k: v for k, v in self.jobargs.items() if k in SIXENV_REQUIRED + SIXENV_OPTIONAL}
+            )
+            calculate_da(
+                self.jobname,
+                self.basedir,
+                emittance=sixenv.EMITTANCE,
+                gamma=sixenv.GAMMA,
+                turnstep=self.env.da_turnstep,
+            )
+            return
+
         sixdb_cmd(
             self.jobname,
             self.basedir,
@@ -446,19 +584,129 @@ class PostProcess(Stage):
 
     The statistics over the seeds are then plotted in a polar plot.
     All files are outputted to the ``sixjobs/autosix_output`` folder in the job directory.
+
+    With :meth:`run_for_jobs`, all jobs ready for this stage are post-processed at once,
+    reading their databases concurrently and creating their plots in parallel processes.
     """
 
     def _run(self):
+        from pylhc_submitter.sixdesk_tools.post_process_da import post_process_da
+
         post_process_da(self.jobname, self.basedir)
 
+    @classmethod
+    def run_for_jobs(cls, jobdf: tfs.TfsDataFrame, env: AutoSixEnvironment) -> list[str]:
+        """Run the stage for all given jobs that are ready for it, at once.
+        If this fails, nothing is recorded, so that the stage is run per job again
+        (which then records the jobs that actually fail).
+
+        Returns:
+            List[str]: The names of the jobs post-processed.
+        """
+        stages = [cls(jobname, jobargs, env) for jobname, jobargs in jobdf.iterrows()]
+        stages = [stage for stage in stages if stage._get_skip_reason() is None]
+        if len(stages) < 2:  # nothing to gain
+            return []
+
+        from pylhc_submitter.sixdesk_tools.post_process_da import post_process_da_for_jobs
+
+        jobnames = [stage.jobname for stage in stages]
+        start = stage_store.now()
+        try:
+            with span(f"stage {cls.name} (batch)", items=len(jobnames)):
+                post_process_da_for_jobs(
+                    jobnames, env.working_directory, max_workers=env.parallel_workspaces
+                )
+        except Exception:
+            LOG.exception(f"Post-processing of {len(jobnames):d} jobs at once failed.")
+            return []
+
+        for stage in stages:
+            stage.stage_done(start)
+        return jobnames
+
 
 class Final(Stage):
-    """Just info about finishing this script and where to check the stagefile."""
+    """Just info about finishing this script and where to check the stage-store."""
+
+    def stage_done(self, *args, **kwargs):
+        pass  # nothing to record, as nothing is run
 
     def _run(self):
-        stage_file = get_stagefile_path(self.jobname, self.basedir)
+        store_path = get_stage_store_path(self.basedir)
         LOG.info(
-            f"All stages run. Check stagefile {str(stage_file)} "
+            f"All stages run. Check stage-store {str(store_path)} "
             "in case you want to rerun some stages."
         )
         raise StageSkipError()
+
+
+# Helper -----------------------------------------------------------------------
+
+
+@contextmanager
+def _submission_sixdesk(jobname: str, basedir: Path, env: AutoSixEnvironment) -> Iterator[Path]:
+    """Context providing the SixDesk directory to submit the sixtrack jobs with.
+    If ``max_materialize`` is set, this is an overlay of the SixDesk installation for this
+    workspace, in which the ``max_materialize`` is set in the htcondor-template
+    (so the installation itself is not modified).
+    With ``max_materialize_total``, the workspace is submitted with a provisional share
+    of the budget, after which the budget is balanced between all workspaces (see ``scheduler``).
+    This is done under the ``MATERIALIZE_LOCK``, so that workspaces run in parallel
+    do not share out the same budget.
+    """
+    if env.max_materialize_total is None:
+        yield _get_sixdesk_overlay(jobname, basedir, env.sixdesk_directory, env.max_materialize)
+        return
+
+    with MATERIALIZE_LOCK:
+        max_materialize = reserve_materialize_budget(
+            basedir, env.max_materialize_total, ssh=env.ssh
+        )
+        if not max_materialize:
+            raise StageWaitError(
+                f"Materialization budget of {env.max_materialize_total:d} is too small "
+                "to be shared with another workspace."
+            )
+        yield _get_sixdesk_overlay(jobname, basedir, env.sixdesk_directory, max_materialize)
+        balance_materialize_limits(basedir, env.max_materialize_total, ssh=env.ssh)
+
+
+def _get_sixdesk_overlay(
+    jobname: str, basedir: Path, sixdesk: Path, max_materialize: int | None
+) -> Path:
+    """SixDesk overlay of the workspace with the given ``max_materialize``,
+    or the SixDesk installation itself if it is ``None``."""
+    if max_materialize is None:
+        return sixdesk
+
+    overlay = create_sixdesk_overlay(jobname, basedir, sixdesk=sixdesk)
+    set_max_materialize(overlay, max_materialize)
+    return overlay
+
+
+def _check_track_tree(jobname: str, basedir: Path):
+    """Fail fast, if the (incremental) audit of the ``track`` directory finds cases
+    without output, for which ``run_status`` would fail as well.
+    Other problems found by the audit are only logged, the decision is left to ``run_status``."""
+    report = audit_track_tree(jobname, basedir)
+    if report.complete:
+        return
+
+    LOG.debug(report.summary())
+    pending = report.pending_cases()
+    if pending:
+        raise StageSkipError(
+            f"Sixtrack for {jobname} seems to be incomplete"
+            f" ({len(pending):d} of {report.n_cases:d} cases without output)."
+            f" Run possibly not finished. Check (debug-) log or your Scheduler."
+        )
+
+
+def _prepare_stage_store(jobname: str, basedir: Path):
+    """Clears the stages of removed workspaces, so they are created again,
+    and migrates the stagefile of the job into the store, if needed."""
+    if not get_workspace_path(jobname, basedir).exists():
+        stage_store.clear_stages(jobname, basedir)
+    elif jobname not in stage_store.read_store(basedir)["jobs"]:
+        stage_store.migrate_stagefiles(basedir, [jobname])
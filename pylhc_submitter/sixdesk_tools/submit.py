@@ -8,6 +8,7 @@ Individual functions to call SixDesk functionality.
 from __future__ import annotations
 
 import logging
+from contextlib import nullcontext
 from typing import TYPE_CHECKING
 
 from pylhc_submitter.constants.autosix import (
@@ -15,6 +16,7 @@ from pylhc_submitter.constants.autosix import (
     RUNSIX_SH,
     RUNSTATUS_SH,
     SIXDB,
+    StageResubmitError,
     StageSkipError,
     get_sixjobs_path,
 )
@@ -22,6 +24,8 @@ from pylhc_submitter.constants.external_paths import SIXDESK_UTILS
 from pylhc_submitter.sixdesk_tools.utils import start_subprocess
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
+    from contextlib import AbstractContextManager
     from pathlib import Path
 
 LOG = logging.getLogger(__name__)
@@ -57,7 +61,7 @@ def check_sixtrack_input(
         if resubmit:
             LOG.info("Resubmitting mask to run wrong seeds for sixtrack input generation.")
             start_subprocess([sixdesk / MAD_TO_SIXTRACK_SH, "-w"], cwd=sixjobs_path, ssh=ssh)
-            raise StageSkipError(
+            raise StageResubmitError(
                 "Resubmitted input generation jobs "
                 "(Not really an error, but the run is now interrupted)."
             )
@@ -105,16 +109,28 @@ def check_sixtrack_output(
     sixdesk: Path = SIXDESK_UTILS,
     ssh: str = None,
     resubmit: bool = False,
+    resubmit_sixdesk: Callable[[], AbstractContextManager[Path]] | None = None,
 ):
-    """Checks if the sixtrack output is all there."""
+    """Checks if the sixtrack output is all there and resubmits, if requested.
+    The SixDesk directory to resubmit with is provided by the ``resubmit_sixdesk`` context
+    (default: ``sixdesk``), which is only entered if a resubmission is needed."""
     LOG.info("Checking if sixtrack has finished.")
     sixjobs_path = get_sixjobs_path(jobname, basedir)
     try:
         start_subprocess([sixdesk / RUNSTATUS_SH], cwd=sixjobs_path, ssh=ssh)
     except OSError as e:
         if resubmit:
-            submit_sixtrack(jobname, basedir, python=python, ssh=ssh, resubmit=True)
-            raise StageSkipError(
+            submission = nullcontext(sixdesk) if resubmit_sixdesk is None else resubmit_sixdesk()
+            with submission as resubmission_sixdesk:
+                submit_sixtrack(
+                    jobname,
+                    basedir,
+                    python=python,
+                    sixdesk=resubmission_sixdesk,
+                    ssh=ssh,
+                    resubmit=True,
+                )
+            raise StageResubmitError(
                 f"Sixtrack for {jobname} seems to be incomplete."
                 " Resubmitted incomplete sixtrack jobs."
                 " Wait until they have finished and run again."
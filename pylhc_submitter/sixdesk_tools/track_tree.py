@@ -0,0 +1,353 @@
+"""
+Track Tree
+----------
+
+Audit of the SixTrack output in the ``track`` directory of a workspace.
+
+The ``track`` directory contains one directory per seed, tunes, amplitude-range,
+turns and angle (``$seed/simul/$tunes/$amps/e$turns/.$angle``), each of which
+needs to contain the output files of its tracking job.
+The seeds are audited concurrently and all problems found are
+gathered in a :class:`TrackAuditReport`, instead of stopping at the first one.
+The cases (i.e. angle directories) found incomplete can be written into the
+``incomplete_cases`` file of the workspace, which is used for resubmission by SixDesk.
+
+The directory-listings and the results of the case-checks are kept in an index
+in the ``autosix_output`` of the workspace, together with the modification time
+of each directory. On the next audit, only the directories whose modification time
+has changed are listed again and only the cases that have changed or were not
+yet complete are checked again, so that repeated audits of a (nearly) finished
+study only need to ``stat`` the directories.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from pylhc_submitter.constants.autosix import (
+    SIXTRACK_INPUT_CHECK_FILES,
+    SIXTRACK_OUTPUT_FILES,
+    get_incomplete_cases_path,
+    get_track_index_path,
+    get_track_path,
+)
+from pylhc_submitter.utils.logging_tools import submit_in_context
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+LOG = logging.getLogger(__name__)
+
+SIMUL_DIR = "simul"
+ANGLE_DIR_PREFIX = "."
+HTCONDOR_FILE_PREFIX = "htcondor."
+N_HTCONDOR_FILES = 3  # out, err and log; more if the case has been resubmitted
+NO_OUTPUT_PROBLEM = f"none of the output files {SIXTRACK_OUTPUT_FILES} present"
+
+INDEX_VERSION = 1
+MTIME_GRACE_NS = 2 * 10**9  # more recent modifications might be missed by coarse timestamps
+
+
+@dataclass
+class IncompleteCase:
+    """A tracking case (i.e. angle directory) with missing or unexpected files."""
+
+    path: Path
+    problems: list[str]
+
+    def run_name(self, jobname: str) -> str:
+        """Name of the case, as used by SixDesk."""
+        turns_dir, angle_dir = self.path.parts[-2:]
+        seed, _, tunes, amps = self.path.parts[-6:-2]
+        turns, angle = turns_dir[1:], angle_dir[len(ANGLE_DIR_PREFIX) :]
+        return "%".join([jobname, seed, "s", tunes, amps, turns, angle])
+
+    @property
+    def has_output(self) -> bool:
+        return NO_OUTPUT_PROBLEM not in self.problems
+
+
+@dataclass
+class TrackAuditReport:
+    """Result of the audit of the ``track`` directory of a workspace."""
+
+    jobname: str
+    track_path: Path
+    n_cases: int = 0  # number of tracking cases found
+    n_checked: int = 0  # number of tracking cases checked (i.e. not taken from the index)
+    missing: list[str] = field(default_factory=list)  # missing (or empty) directories
+    incomplete: dict[str, dict[str, list[IncompleteCase]]] = field(
+        default_factory=lambda: defaultdict(lambda: defaultdict(list))
+    )  # incomplete cases, grouped per seed and amplitude-range
+
+    @property
+    def complete(self) -> bool:
+        return not (self.missing or self.incomplete)
+
+    def incomplete_cases(self) -> Iterator[IncompleteCase]:
+        for amps in self.incomplete.values():
+            for cases in amps.values():
+                yield from cases
+
+    def pending_cases(self) -> list[IncompleteCase]:
+        """Incomplete cases without any output, i.e. whose tracking has not (yet) finished."""
+        return [case for case in self.incomplete_cases() if not case.has_output]
+
+    def summary(self, details: bool = True) -> str:
+        """Summary of all problems found, grouped per seed and amplitude-range."""
+        n_incomplete = sum(1 for _ in self.incomplete_cases())
+        lines = [
+            (
+                f"Track audit of {self.jobname}: {n_incomplete:d} of {self.n_cases:d} cases incomplete, "
+                f"{len(self.missing):d} directories missing or empty."
+            )
+        ]
+        if not details:
+            return lines[0]
+
+        lines += [f"  Missing: {missing}" for missing in self.missing]
+        for seed, amps in sorted(self.incomplete.items(), key=lambda item: int(item[0])):
+            for amp, cases in sorted(amps.items()):
+                lines.append(f"  Seed {seed}, amplitudes {amp}: {len(cases):d} incomplete cases")
+                lines += [f"    {case.path}: {'; '.join(case.problems)}" for case in cases]
+        return "\n".join(lines)
+
+
+def audit_track_tree(
+    jobname: str, basedir: Path, max_workers: int = 8, use_index: bool = True
+) -> TrackAuditReport:
+    """Checks all tracking cases in the ``track`` directory of the workspace for their
+    output files. The seeds are checked concurrently.
+
+    Args:
+        jobname (str): Name of the job/study
+        basedir (Path): SixDesk Basefolder Location
+        max_workers (int): Number of seeds to check at the same time.
+        use_index (bool): Skip unchanged directories, as recorded in the index
+                          of the previous audit. Otherwise, the whole tree is checked.
+                          In both cases, the index is updated.
+
+    Returns:
+        TrackAuditReport: All problems found.
+    """
+    track_path = get_track_path(jobname, basedir)
+    report = TrackAuditReport(jobname=jobname, track_path=track_path)
+    old_index = read_track_index(jobname, basedir) if use_index else _empty_index()
+    new_index = _empty_index()
+    scanner = _IndexedScanner(track_path, old_index, new_index)
+
+    seed_dirs = [d for d in scanner.list_dirs(track_path) if d.name.isdigit()]
+    if not seed_dirs:
+        report.missing.append(str(track_path))
+        return report
+
+    log_every = max(1, len(seed_dirs) // 10)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            submit_in_context(pool, _audit_seed, seed_dir, scanner) for seed_dir in seed_dirs
+        ]
+        for idx, future in enumerate(as_completed(futures), start=1):
+            n_cases, n_checked, missing, incomplete = future.result()
+            report.n_cases += n_cases
+            report.n_checked += n_checked
+            report.missing += missing
+            for case in incomplete:
+                seed, amps = case.path.parts[-6], case.path.parts[-3]
+                report.incomplete[seed][amps].append(case)
+            if not idx % log_every or idx == len(seed_dirs):
+                LOG.info(f"Audited {idx:d}/{len(seed_dirs):d} seeds of {jobname}.")
+
+    LOG.debug(f"Checked {report.n_checked:d} of {report.n_cases:d} cases of {jobname}.")
+    _write_track_index(jobname, basedir, new_index)
+    return report
+
+
+def read_track_index(jobname: str, basedir: Path) -> dict[str, Any]:
+    """Read the index of the last audit of the job, or an empty index if there is none."""
+    index_path = get_track_index_path(jobname, basedir)
+    try:
+        index = json.loads(index_path.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return _empty_index()
+
+    if index.get("version") != INDEX_VERSION:
+        return _empty_index()
+    return index
+
+
+def write_incomplete_cases(report: TrackAuditReport, basedir: Path) -> Path:
+    """Write the names of the incomplete cases into the ``incomplete_cases`` file
+    of the workspace, from which SixDesk resubmits (``run_six.sh -i``).
+
+    Returns:
+        Path: The path to the written file.
+    """
+    cases_path = get_incomplete_cases_path(report.jobname, basedir)
+    cases = [case.run_name(report.jobname) for case in report.incomplete_cases()]
+    cases_path.parent.mkdir(parents=True, exist_ok=True)
+    cases_path.write_text("".join(f"{case}\n" for case in sorted(cases)))
+    LOG.info(f"Written {len(cases):d} incomplete cases to {str(cases_path)}.")
+    return cases_path
+
+
+def get_case_dirs(seed_dir: Path) -> list[Path]:
+    """All tracking cases (i.e. angle directories) of a seed."""
+    dirs = [seed_dir / SIMUL_DIR]
+    for _ in range(3):  # tunes, amps, turns
+        dirs = [subdir for directory in dirs for subdir in _scan_dirs(directory)]
+    return [case for directory in dirs for case in _scan_dirs(directory, ANGLE_DIR_PREFIX)]
+
+
+def get_seed_dirs(jobname: str, basedir: Path) -> list[Path]:
+    """All seed directories in the ``track`` directory of the workspace."""
+    return [d for d in _scan_dirs(get_track_path(jobname, basedir)) if d.name.isdigit()]
+
+
+# Helper -----------------------------------------------------------------------
+
+
+class _IndexedScanner:
+    """Lists directories and checks cases, re-using the results of the old index
+    for unchanged directories. All results are stored in the new index.
+    Results for directories modified only shortly before their scan are not stored,
+    as later modifications might not change their (coarse) modification time."""
+
+    def __init__(self, track_path: Path, old_index: dict[str, Any], new_index: dict[str, Any]):
+        self.track_path = track_path
+        self.old_index = old_index
+        self.new_index = new_index
+
+    def list_dirs(self, path: Path, prefix: str = "") -> list[Path]:
+        mtime = self._get_mtime(path)
+        if mtime is None:
+            return []
+
+        key = self._get_key(path)
+        cached = self.old_index["dirs"].get(key)
+        if cached is not None and cached["mtime"] == mtime:
+            names = cached["children"]
+        else:
+            names = [d.name for d in _scan_dirs(path, prefix)]
+
+        if self._is_settled(mtime):
+            self.new_index["dirs"][key] = {"mtime": mtime, "children": names}
+        return [path / name for name in names]
+
+    def check_case(self, angle_dir: Path) -> tuple[list[str], bool]:
+        """Returns the problems of the case and whether it has actually been checked."""
+        mtime = self._get_mtime(angle_dir)
+        if mtime is None:
+            return ["directory vanished during the audit"], True
+
+        key = self._get_key(angle_dir)
+        cached = self.old_index["cases"].get(key)
+        checked = cached is None or cached["mtime"] != mtime or bool(cached["problems"])
+        problems = _check_case(angle_dir) if checked else []
+
+        if self._is_settled(mtime):
+            self.new_index["cases"][key] = {"mtime": mtime, "problems": problems}
+        return problems, checked
+
+    def _get_key(self, path: Path) -> str:
+        return path.relative_to(self.track_path).as_posix()
+
+    @staticmethod
+    def _get_mtime(path: Path) -> int | None:
+        try:
+            return path.stat().st_mtime_ns
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+    @staticmethod
+    def _is_settled(mtime: int) -> bool:
+        return time.time_ns() - mtime > MTIME_GRACE_NS
+
+
+def _audit_seed(
+    seed_dir: Path, scanner: _IndexedScanner
+) -> tuple[int, int, list[str], list[IncompleteCase]]:
+    """Audit all cases of a single seed.
+
+    Returns:
+        Tuple of the number of cases found and checked,
+        the missing directories and the incomplete cases.
+    """
+    n_cases, n_checked, missing, incomplete = 0, 0, [], []
+
+    # seed/simul/tunes/amps/turns/angle
+    levels = [[seed_dir / SIMUL_DIR]]
+    for _ in range(3):
+        next_level = []
+        for directory in levels[-1]:
+            subdirs = scanner.list_dirs(directory)
+            if not subdirs:
+                missing.append(str(directory))
+            next_level += subdirs
+        levels.append(next_level)
+
+    for turns_dir in levels[-1]:
+        angle_dirs = scanner.list_dirs(turns_dir, prefix=ANGLE_DIR_PREFIX)
+        if not angle_dirs:
+            missing.append(str(turns_dir))
+
+        for angle_dir in angle_dirs:
+            n_cases += 1
+            problems, checked = scanner.check_case(angle_dir)
+            n_checked += checked
+            if problems:
+                incomplete.append(IncompleteCase(path=angle_dir, problems=problems))
+    return n_cases, n_checked, missing, incomplete
+
+
+def _check_case(angle_dir: Path) -> list[str]:
+    """Check the files of a single tracking case and return the problems found."""
+    with os.scandir(angle_dir) as entries:
+        file_names = [entry.name for entry in entries]
+
+    problems = []
+    n_htcondor = sum(name.startswith(HTCONDOR_FILE_PREFIX) for name in file_names)
+    if n_htcondor < N_HTCONDOR_FILES:
+        problems.append(f"{n_htcondor:d} of {N_HTCONDOR_FILES:d} htcondor files present")
+
+    input_files_present = [f for f in SIXTRACK_INPUT_CHECK_FILES if f in file_names]
+    if input_files_present:
+        problems.append(f"{input_files_present} not deleted after tracking")
+
+    if not any(f in file_names for f in SIXTRACK_OUTPUT_FILES):
+        problems.append(NO_OUTPUT_PROBLEM)
+    return problems
+
+
+def _scan_dirs(path: Path, prefix: str = "") -> list[Path]:
+    """Returns all (linked) directories in ``path`` starting with ``prefix``,
+    or an empty list if ``path`` does not exist."""
+    try:
+        with os.scandir(path) as entries:
+            return sorted(
+                Path(entry.path)
+                for entry in entries
+                if entry.name.startswith(prefix) and entry.is_dir()
+            )
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def _write_track_index(jobname: str, basedir: Path, index: dict[str, Any]):
+    """Write the index into a temporary file, which then replaces the old index at once."""
+    index_path = get_track_index_path(jobname, basedir)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = index_path.with_name(f".{index_path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(index))
+    tmp_path.replace(index_path)
+
+
+def _empty_index() -> dict[str, Any]:
+    return {"version": INDEX_VERSION, "dirs": {}, "cases": {}}
@@ -0,0 +1,213 @@
+"""
+Tracking Results
+----------------
+
+Native loader of the SixTrack tracking results, as an alternative to ``sixdb load_dir``.
+
+The ``fort.10`` files (from ``fort.10.gz`` or ``Sixout.zip``) of all tracking cases
+are parsed with ``numpy`` and stored per seed in ``.npz`` files in the
+``autosix_output/tracking_results`` directory of the workspace.
+The seeds are loaded in parallel processes and seeds already in the store are skipped,
+so that loading can be repeated cheaply, e.g. after resubmitting some of the seeds.
+
+Each row of a ``fort.10`` file contains the results of one particle pair, with the
+columns named as in the ``six_results`` table of ``sixdb``.
+"""
+
+from __future__ import annotations
+
+import gzip
+import logging
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+
+from pylhc_submitter.constants.autosix import SIXTRACK_OUTPUT_FILES, get_tracking_results_path
+from pylhc_submitter.sixdesk_tools.track_tree import get_case_dirs, get_seed_dirs
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+LOG = logging.getLogger(__name__)
+
+FORT10 = "fort.10"
+FORT10_COLUMNS = (
+    "turn_max", "sflag", "qx", "qy", "betx", "bety", "sigx1", "sigy1", "deltap", "dist",
+    "distp", "qx_det", "qx_spread", "qy_det", "qy_spread", "resxfact", "resyfact", "resorder",
+    "smearx", "smeary", "smeart", "sturns1", "sturns2", "sseed", "qs", "sigx2", "sigy2",
+    "sigxmin", "sigxavg", "sigxmax", "sigymin", "sigyavg", "sigymax",
+    "sigxminld", "sigxavgld", "sigxmaxld", "sigyminld", "sigyavgld", "sigymaxld",
+    "sigxminnld", "sigxavgnld", "sigxmaxnld", "sigyminnld", "sigyavgnld", "sigymaxnld",
+    "emitx", "emity", "betx2", "bety2", "qpx", "qpy", "version", "cx", "cy", "csigma",
+    "xp", "yp", "delta", "dnms", "trttime",
+)  # fmt: skip
+CASE_COLUMNS = ("tunex", "tuney", "amp1", "amp2", "turns", "angle", "row")
+SEED_COLUMN = "seed"
+RESULTS_KEY = "results"
+
+
+def load_tracking_results(
+    jobname: str, basedir: Path, max_workers: int | None = None, reload: bool = False
+) -> list[int]:
+    """Load the ``fort.10`` results of all seeds, not yet in the store, in parallel.
+    Seeds with missing output are not stored, so they will be loaded again next time.
+
+    Args:
+        jobname (str): Name of the job/study
+        basedir (Path): SixDesk Basefolder Location
+        max_workers (int): Number of processes to use. Defaults to the number of CPUs.
+        reload (bool): Load also the seeds already in the store.
+
+    Returns:
+        List[int]: The seeds loaded.
+    """
+    store_path = get_tracking_results_path(jobname, basedir)
+    store_path.mkdir(parents=True, exist_ok=True)
+    seed_dirs = [
+        seed_dir
+        for seed_dir in get_seed_dirs(jobname, basedir)
+        if reload or not _get_seed_path(store_path, int(seed_dir.name)).exists()
+    ]
+    if not seed_dirs:
+        LOG.info(f"Tracking results of all seeds of {jobname} already loaded.")
+        return []
+
+    LOG.info(f"Loading tracking results of {len(seed_dirs):d} seeds of {jobname}.")
+    loaded, incomplete = [], {}
+    max_workers = min(max_workers or os.cpu_count(), len(seed_dirs))
+    # spawn, as forking a (possibly) multi-threaded process is unsafe
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+        futures = {
+            pool.submit(_load_seed, seed_dir, store_path): seed_dir for seed_dir in seed_dirs
+        }
+        for future in as_completed(futures):
+            seed = int(futures[future].name)
+            n_rows, missing = future.result()
+            if missing:
+                incomplete[seed] = missing
+                continue
+            loaded.append(seed)
+            LOG.debug(f"Loaded {n_rows:d} results of seed {seed:d}.")
+
+    LOG.info(f"Loaded tracking results of {len(loaded):d} seeds of {jobname}.")
+    if incomplete:
+        missing_str = "\n".join(
+            f"  {seed}: {missing}" for seed, missing in sorted(incomplete.items())
+        )
+        raise OSError(
+            f"No output found for some cases of {jobname}, seeds not loaded:\n{missing_str}"
+        )
+    return sorted(loaded)
+
+
+def read_tracking_results(jobname: str, basedir: Path) -> pd.DataFrame:
+    """Read the tracking results of all loaded seeds into a single frame,
+    with the seed, the case-parameters and the ``fort.10`` columns."""
+    store_path = get_tracking_results_path(jobname, basedir)
+    seed_paths = sorted(store_path.glob("seed_*.npz"), key=lambda p: int(p.stem.split("_")[1]))
+    if not seed_paths:
+        raise FileNotFoundError(f"No tracking results loaded for {jobname} in {str(store_path)}.")
+
+    dfs = []
+    for seed_path in seed_paths:
+        with np.load(seed_path) as data:
+            df = pd.DataFrame(data[RESULTS_KEY], columns=FORT10_COLUMNS)
+            for column in reversed(CASE_COLUMNS):
+                df.insert(0, column, data[column])
+        df.insert(0, SEED_COLUMN, int(seed_path.stem.split("_")[1]))
+        dfs.append(df)
+    return pd.concat(dfs, ignore_index=True)
+
+
+def read_fort10(case_dir: Path) -> np.ndarray:
+    """Read the ``fort.10`` results of a tracking case from its output file.
+
+    Returns:
+        np.ndarray: The results, one row per particle pair.
+    """
+    for output_file in SIXTRACK_OUTPUT_FILES:
+        output_path = case_dir / output_file
+        if output_path.is_file():
+            break
+    else:
+        raise FileNotFoundError(f"No output file {SIXTRACK_OUTPUT_FILES} in {str(case_dir)}.")
+
+    if zipfile.is_zipfile(output_path):
+        with zipfile.ZipFile(output_path) as archive:
+            names = [n for n in archive.namelist() if n.split("/")[-1].startswith(FORT10)]
+            if not names:
+                raise FileNotFoundError(f"No {FORT10} in {str(output_path)}.")
+            name = names[0]
+            content = archive.read(name)
+        if name.endswith(".gz"):
+            content = gzip.decompress(content)
+    else:
+        content = gzip.decompress(output_path.read_bytes())
+    return parse_fort10(content.decode(), source=output_path)
+
+
+def parse_fort10(text: str, source: Path | str = FORT10) -> np.ndarray:
+    """Parse the content of a ``fort.10`` file into an array with one row per particle pair."""
+    values = np.array(text.replace("D", "E").split(), dtype=np.float64)
+    if values.size % len(FORT10_COLUMNS):
+        raise ValueError(f"Wrong number of values in {str(source)}.")
+    return values.reshape(-1, len(FORT10_COLUMNS))
+
+
+# Helper -----------------------------------------------------------------------
+
+
+def _load_seed(seed_dir: Path, store_path: Path) -> tuple[int, list[str]]:
+    """Load all cases of the seed and write them into the store (run in a worker process).
+
+    Returns:
+        Tuple of the number of rows loaded and the cases without output.
+    """
+    results, cases, missing = [], [], []
+    for case_dir in get_case_dirs(seed_dir):
+        try:
+            case_results = read_fort10(case_dir)
+        except FileNotFoundError:
+            missing.append(str(case_dir.relative_to(seed_dir)))
+            continue
+        results.append(case_results)
+        cases.append(np.repeat([_get_case_parameters(case_dir)], len(case_results), axis=0))
+        cases[-1][:, -1] = np.arange(1, len(case_results) + 1)  # row number
+
+    if missing:
+        return 0, missing
+
+    results = np.concatenate(results) if results else np.empty((0, len(FORT10_COLUMNS)))
+    cases = np.concatenate(cases) if cases else np.empty((0, len(CASE_COLUMNS)))
+    seed_path = _get_seed_path(store_path, int(seed_dir.name))
+    tmp_path = seed_path.with_name(f".{seed_path.stem}.{os.getpid()}.tmp.npz")
+    np.savez(tmp_path, **{RESULTS_KEY: results}, **dict(zip(CASE_COLUMNS, cases.T)))
+    tmp_path.replace(seed_path)
+    return len(results), missing
+
+
+def _get_case_parameters(case_dir: Path) -> list[float]:
+    """Case-parameters from the path ``simul/$tunex_$tuney/$amp1_$amp2/e$turns/.$angle``.
+    The last entry is a placeholder for the row number."""
+    tunes, amps, turns, angle = case_dir.parts[-4:]
+    tunex, tuney = tunes.split("_")
+    amp1, amp2 = amps.split("_")
+    return [
+        float(tunex),
+        float(tuney),
+        float(amp1),
+        float(amp2),
+        float(turns[1:]),
+        float(angle[1:]),
+        0,
+    ]
+
+
+def _get_seed_path(store_path: Path, seed: int) -> Path:
+    return store_path / f"seed_{seed:d}.npz"
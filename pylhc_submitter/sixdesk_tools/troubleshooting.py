@@ -12,14 +12,14 @@ from typing import TYPE_CHECKING
 
 from pylhc_submitter.autosix import get_jobs_and_values
 from pylhc_submitter.constants.autosix import (
-    SIXTRACK_INPUT_CHECK_FILES,
     SIXTRACK_OUTPUT_FILES,
     get_database_path,
-    get_stagefile_path,
     get_track_path,
     get_workspace_path,
 )
+from pylhc_submitter.sixdesk_tools import stage_store
 from pylhc_submitter.sixdesk_tools.stages import STAGE_ORDER
+from pylhc_submitter.sixdesk_tools.track_tree import audit_track_tree, write_incomplete_cases
 
 if TYPE_CHECKING:
     from pathlib import Path
@@ -32,9 +32,10 @@ LOG = logging.getLogger(__name__)
 
 def get_last_stage(jobname, basedir):
     """Get the last run stage of job `jobname`."""
-    stage_file = get_stagefile_path(jobname, basedir)
-    last_stage = stage_file.read_text().strip("\n").split("\n")[-1]
-    return STAGE_ORDER[last_stage]
+    completed_stages = stage_store.get_completed_stages(jobname, basedir)
+    if not completed_stages:
+        raise KeyError(f"No stages have been run for '{jobname}'.")
+    return STAGE_ORDER[completed_stages[-1]]
 
 
 # Set Stages ---
@@ -60,8 +61,7 @@ def set_stages(jobname: str, basedir: Path, stage_name: str):
         if stage == new_stage:
             break
 
-    stage_file = get_stagefile_path(jobname, basedir)
-    stage_file.write_text("\n".join(stages))  # overwrites old file
+    stage_store.set_completed_stages(jobname, basedir, stages)  # overwrites old stages
 
 
 def skip_stages(jobname: str, basedir: Path, stage_name: str):
@@ -100,6 +100,7 @@ def reset_stages(jobname: str, basedir: Path, stage_name: str):
 def check_stages_for_setup(basedir: Path, stage_name: str, jobid_mask: str, replace_dict: dict):
     """Check the last run stage for all jobs from given job-setups."""
     jobs, _ = get_jobs_and_values(jobid_mask, **replace_dict)
+    stage_store.migrate_stagefiles(basedir, jobs)  # afterwards, only the store is read
     for job in jobs:
         check_last_stage(job, basedir)
 
@@ -139,74 +140,25 @@ def find_obviously_failed_sixtrack_submissions(basedir: Path):
     return jobs
 
 
-def check_sixtrack_output_data(jobname: str, basedir: Path):
+def check_sixtrack_output_data(
+    jobname: str, basedir: Path, write_incomplete: bool = False, use_index: bool = True
+):
     """Presence checks for SixDesk tracking output data.
 
-    This checks recursively all directories in `track`.
-    Will be busy for a while.
+    This checks all directories in `track` (seeds in parallel) and raises an
+    error listing all incomplete cases found.
+    If `write_incomplete` is set, these cases are also written into the
+    ``incomplete_cases`` file, from which SixDesk can resubmit them (``run_six.sh -i``).
+    With `use_index`, only directories changed since the last check are checked again.
     """
-    track_path = get_track_path(jobname, basedir)
-    seed_dirs = list(track_path.glob("[0-9]")) + list(track_path.glob("[0-9][0-9]"))
-    if not len(seed_dirs):
-        raise OSError(f"No seed-dirs present in {str(track_path)}.")
-
-    for seed_dir in seed_dirs:
-        if not seed_dir.is_dir():
-            continue
-
-        simul_path = seed_dir / "simul"
-        tunes_dirs = list(simul_path.glob("*"))
-        if not len(tunes_dirs):
-            raise OSError(f"No tunes-dirs present in {str(seed_dir)}.")
-
-        for tunes_dir in tunes_dirs:
-            if not tunes_dir.is_dir():
-                continue
-
-            amp_dirs = list(tunes_dir.glob("*_*"))
-            if not len(amp_dirs):
-                raise OSError(f"No amplitude-dirs present in {str(tunes_dir)}.")
-
-            for amp_dir in amp_dirs:
-                if not amp_dir.is_dir():
-                    continue
-
-                turns_dirs = list(amp_dir.glob("*"))
-                if not len(turns_dirs):
-                    raise OSError(f"No turns-dirs present in {str(amp_dir)}.")
-
-                for turn_dir in turns_dirs:
-                    if not turn_dir.is_dir():
-                        continue
-
-                    angle_dirs = list(turn_dir.glob(".*"))
-                    if not len(angle_dirs):
-                        raise OSError(f"No angle-dirs present in {str(turn_dir)}.")
-
-                    for angle_dir in angle_dirs:
-                        if not angle_dir.is_dir():
-                            continue
-
-                        htcondor_files = list(angle_dir.glob("htcondor.*"))
-                        if len(htcondor_files) != 3:
-                            raise OSError(f"Not all htcondor files present in {str(angle_dir)}.")
-
-                        file_names = [f.name for f in angle_dir.glob("*")]
-                        in_files_present = [
-                            f for f in SIXTRACK_INPUT_CHECK_FILES if f in file_names
-                        ]
-                        if len(in_files_present):
-                            raise OSError(
-                                f"The files '{in_files_present}' are found in {str(angle_dir)},"
-                                "yet they should have been deleted after tracking."
-                            )
-
-                        out_files_present = [f for f in SIXTRACK_OUTPUT_FILES if f in file_names]
-                        if not len(out_files_present):
-                            raise OSError(
-                                f"None of the expected output files '{SIXTRACK_OUTPUT_FILES}' "
-                                f"are present in {str(angle_dir)}"
-                            )
+    report = audit_track_tree(jobname, basedir, use_index=use_index)
+    if report.complete:
+        LOG.info(f"All {report.n_cases:d} cases of {jobname} have output data.")
+        return
+
+    if write_incomplete:
+        write_incomplete_cases(report, basedir)
+    raise OSError(report.summary())
 
 
 # Long Database Names Hack -----------------------------------------------------
@@ -8,15 +8,24 @@ Helper Utilities for Autosix.
 from __future__ import annotations
 
 import logging
+import os
 import subprocess
 from pathlib import Path
 
-from pylhc_submitter.constants.autosix import SIXDESKLOCKFILE, get_workspace_path
+from pylhc_submitter.constants.autosix import (
+    SIXDESKLOCKFILE,
+    get_scratch_sixtrack_input_path,
+    get_sixjobs_path,
+    get_workspace_path,
+)
 from pylhc_submitter.constants.external_paths import SIXDESK_UTILS
 from pylhc_submitter.submitter.mask import find_named_variables_in_mask
+from pylhc_submitter.utils.tracing import span
 
 LOG = logging.getLogger(__name__)
 
+LOCK_SCAN_EXCLUDE = ("track",)  # sixjobs-subdirectories not to scan for locks
+
 
 # Checks  ----------------------------------------------------------------------
 
@@ -37,10 +46,9 @@ def check_mask(mask_text: str, replace_args: dict):
 # Locks ------------------------------------------------------------------------
 
 
-def is_locked(jobname: str, basedir: Path, unlock: bool = False):
-    """Checks for sixdesklock-files"""
-    workspace_path = get_workspace_path(jobname, basedir)
-    locks = list(workspace_path.glob(f"**/{SIXDESKLOCKFILE}"))  # list() for repeated usage
+def is_locked(jobname: str, basedir: Path, unlock: bool = False, full_scan: bool = False):
+    """Checks for sixdesklock-files. See :func:`find_locks`."""
+    locks = find_locks(jobname, basedir, full_scan=full_scan)
 
     if locks:
         LOG.info("The following folders are locked:")
@@ -61,6 +69,38 @@ def is_locked(jobname: str, basedir: Path, unlock: bool = False):
     return False
 
 
+def find_locks(jobname: str, basedir: Path, full_scan: bool = False) -> list[Path]:
+    """Returns the sixdesklock-files in the workspace.
+
+    SixDesk only locks the workspace, ``sixjobs`` and the directories up to two levels below
+    (e.g. ``studies/$jobname``, ``sixtrack_input`` or ``work``), so only these are checked.
+    The ``track`` tree, with its directory per seed, tune, amplitude, turn and angle,
+    is only checked with ``full_scan``, as this can take a long time.
+    """
+    workspace_path = get_workspace_path(jobname, basedir)
+    if full_scan:
+        return list(workspace_path.glob(f"**/{SIXDESKLOCKFILE}"))
+
+    sixjobs_path = get_sixjobs_path(jobname, basedir)
+    lock_dirs = [workspace_path, sixjobs_path, get_scratch_sixtrack_input_path(jobname, basedir)]
+    for child_dir in _get_subdirectories(sixjobs_path):
+        lock_dirs.append(child_dir)
+        if child_dir.name not in LOCK_SCAN_EXCLUDE:
+            lock_dirs.extend(_get_subdirectories(child_dir))
+
+    locks = [lock_dir / SIXDESKLOCKFILE for lock_dir in lock_dirs]
+    return [lock for lock in locks if lock.is_file()]
+
+
+def _get_subdirectories(path: Path) -> list[Path]:
+    """Returns the (linked) directories in path, or an empty list if it does not exist."""
+    try:
+        with os.scandir(path) as entries:
+            return [Path(entry.path) for entry in entries if entry.is_dir()]
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
 # Commandline ------------------------------------------------------------------
 
 
@@ -71,6 +111,14 @@ def start_subprocess(command, cwd=None, ssh: str = None, check_log: str = None):
     # convert Paths
     command = [str(c) if isinstance(c, Path) else c for c in command]
 
+    with span(f"subprocess {Path(command[0]).name}", ssh=ssh):
+        _run_subprocess(command, cwd=cwd, ssh=ssh, check_log=check_log)
+
+
+def _run_subprocess(
+    command: list[str], cwd=None, ssh: str | None = None, check_log: str | None = None
+):
+
     if ssh:
         # Send command to remote machine
         command = " ".join(command)
@@ -11,12 +11,17 @@ A shell script is created in each job directory in the dataframe.
 ``make_subfile`` takes the job dataframe and creates the **.sub** files required for submissions to
 ``HTCondor``. The **.sub** file will be put in the working directory. The maximum runtime of one
 job can be specified, standard is 8h.
+
+The ``htcondor`` python bindings are only imported on first use (see :func:`get_htcondor`),
+so that importing this module (and ``job_submitter``) stays fast, e.g. for local runs.
 """
 
 from __future__ import annotations
 
+import functools
 import logging
 import subprocess
+import sys
 from pathlib import Path
 from typing import TYPE_CHECKING, Any
 
@@ -41,30 +46,51 @@ from pylhc_submitter.submitter import iotools
 from pylhc_submitter.submitter.mask import is_mask_file
 from pylhc_submitter.utils.environment import on_windows
 
+if TYPE_CHECKING:
+    from types import ModuleType
+
+    import htcondor
+    from pandas import DataFrame
+
+LOG = logging.getLogger(__name__)
+
+
 # ------------------------------------------------------------------ #
 # Importing htcondor is tricky because they broke the API in v25 LTS #
 # ------------------------------------------------------------------ #
 
-try:
-    # First, try HTCondor 25.x API
-    import htcondor2 as htcondor  # noqa: N801
-except ImportError:
-    try:
-        # Fallback to previous LTS HTCondor API
-        import htcondor  # noqa: N801
-    except ImportError:  # will be handled by job_submitter
-        # Neither API is available – define dummy stubs for typing
-
-        class htcondor:  # noqa: N801
-            """Dummy HTCondor module to satisfy typing."""
 
-            Submit: Any = None
+@functools.cache
+def get_htcondor() -> ModuleType | None:
+    """Import the htcondor python bindings, on first use only.
 
+    Returns:
+        The ``htcondor2`` (HTCondor 25.x+) or ``htcondor`` (HTCondor <25) module,
+        or ``None`` if neither is available.
+    """
+    try:
+        # First, try HTCondor 25.x API
+        import htcondor2
+    except ImportError:
+        pass
+    else:
+        LOG.debug("Using htcondor2 bindings (HTCondor 25.x+).")
+        return htcondor2
 
-if TYPE_CHECKING:
-    from pandas import DataFrame
+    try:
+        # Fallback to previous LTS HTCondor API
+        import htcondor
+    except ImportError:
+        # Neither available: must be macOS or Windows
+        platform = "macOS" if sys.platform == "darwin" else "windows"
+        LOG.warning(
+            f"htcondor python bindings are linux-only. You can still use job_submitter on {platform}, "
+            "but only for local runs."
+        )
+        return None
 
-LOG = logging.getLogger(__name__)
+    LOG.debug("Using htcondor bindings (HTCondor <25).")
+    return htcondor
 
 
 # Subprocess Methods ###########################################################
@@ -161,7 +187,7 @@ def create_multijob_for_bashfiles(job_df: DataFrame, **kwargs) -> str:
     submit_dict.update(map_kwargs(kwargs))
 
     # Let the htcondor create the submit-file
-    submission = htcondor.Submit(submit_dict)
+    submission = get_htcondor().Submit(submit_dict)
 
     # add the multiple bash files
     scripts = [
@@ -203,6 +229,7 @@ def write_bash(
     executable: str = "madx",
     cmdline_arguments: dict = None,
     mask: str | Path = None,
+    lazy_destination: bool = False,
 ) -> DataFrame:
     """
     Write the bash-files to be called by ``HTCondor``, which in turn call the executable.
@@ -215,6 +242,8 @@ def write_bash(
         executable (str): name of the executable. Defaults to ``madx``.
         cmdline_arguments (dict): additional commandline arguments for the executable
         mask (Union[str, Path]): string or path to the mask-file. Defaults to ``None``.
+        lazy_destination (bool): If ``True``, the destination directory of the job
+            is created by the job itself before copying the output. Defaults to ``False``.
 
     Returns:
         DataFrame: The provided ``job_df`` but with added path to the scripts.
@@ -263,6 +292,9 @@ def write_bash(
             # Manually copy output (if needed) ---
             dest_dir = job.get(COLUMN_DEST_DIRECTORY)
             if output_dir and dest_dir and output_dir != dest_dir:
+                if lazy_destination:
+                    f.write(f"{_mkdir_command(dest_dir)}\n")
+
                 if iotools.is_eos_uri(dest_dir):
                     # Note: eos-cp needs `/` at the end of both, source and target, dirs...
                     cp_command = f"eos cp -r {_str_ending_with_slash(output_dir)} {_str_ending_with_slash(dest_dir)}"
@@ -329,6 +361,15 @@ def _maybe_put_in_quotes(key: str, value: Any) -> Any:
     return value
 
 
+def _mkdir_command(dir_path: Path | str) -> str:
+    """Command to create the given directory (including parents) from within the job."""
+    if iotools.is_eos_uri(dir_path):
+        # eos needs the server as mgm-url and the plain path for `mkdir`
+        server = iotools.get_server_from_uri(dir_path).rstrip("/")
+        return f"eos {server} mkdir -p {iotools.uri_to_path(dir_path)}"
+    return f"mkdir -p {dir_path}"
+
+
 def _str_ending_with_slash(s: Path | str) -> str:
     """Add a slash at the end of a path if not present."""
     s = str(s)
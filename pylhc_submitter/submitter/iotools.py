@@ -3,6 +3,9 @@ Job Submitter IO-Tools
 ----------------------
 
 Tools for input and output for the job-submitter.
+
+``numpy`` and ``tfs`` (and with it ``pandas``) are imported only when jobs are created,
+so that the job-submitter starts (e.g. to show its help) without loading them.
 """
 
 from __future__ import annotations
@@ -14,9 +17,6 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import TYPE_CHECKING, Any
 
-import numpy as np
-import tfs
-
 from pylhc_submitter.constants.htcondor import HTCONDOR_JOBLIMIT
 from pylhc_submitter.constants.job_submitter import (
     COLUMN_DEST_DIRECTORY,
@@ -32,9 +32,12 @@ from pylhc_submitter.submitter.mask import (
     generate_jobdf_index,
     is_mask_file,
 )
+from pylhc_submitter.utils.tracing import span
 
 if TYPE_CHECKING:
+    import numpy as np
     import pandas as pd
+    import tfs
 
 LOG = logging.getLogger(__name__)
 
@@ -52,6 +55,7 @@ class CreationOpts:
     replace_dict: dict[str, Any]  # Replace-dict
     output_dir: Path  # Path to local output directory
     output_destination: Path | str  # Path or URI to remote output directory (e.g. eos)
+    lazy_destination: bool  # Let the jobs create their own output destination directories
     append_jobs: bool  # Append jobs to existing jobs
     resume_jobs: bool  # Resume jobs that have already run/failed/got interrupted
     executable: str  # Name of executable to call the script (from mask)
@@ -79,14 +83,18 @@ def create_jobs(opt: CreationOpts) -> tfs.TfsDataFrame:
     Returns:
         tfs.TfsDataFrame: The job-dataframe containing information for all jobs.
     """
+    import tfs
+
     LOG.debug("Creating Jobs.")
 
     # Generate product of replace-dict and compare to existing jobs  ---
-    parameters, values_grid, prev_job_df = _generate_parameter_space(
-        replace_dict=opt.replace_dict,
-        append_jobs=opt.append_jobs,
-        cwd=opt.working_directory,
-    )
+    with span("generate_parameter_space", append=opt.append_jobs) as grid_span:
+        parameters, values_grid, prev_job_df = _generate_parameter_space(
+            replace_dict=opt.replace_dict,
+            append_jobs=opt.append_jobs,
+            cwd=opt.working_directory,
+        )
+        grid_span.items = len(values_grid)
 
     # Check new jobs ---
     njobs = len(values_grid)
@@ -110,34 +118,42 @@ def create_jobs(opt: CreationOpts) -> tfs.TfsDataFrame:
     job_df = tfs.concat([prev_job_df, job_df], sort=False, how_headers="left")
 
     # Setup folders ---
-    job_df = create_folders(job_df, opt.working_directory, opt.output_destination)
+    with span("create_folders", items=len(job_df)):
+        job_df = create_folders(
+            job_df, opt.working_directory, opt.output_destination, opt.lazy_destination
+        )
 
     # Create scripts ---
     if is_mask_file(opt.mask):
         LOG.debug("Creating all jobs from mask.")
         script_extension = _get_script_extension(opt.script_extension, opt.executable, opt.mask)
-        job_df = create_job_scripts_from_mask(job_df, opt.mask, parameters, script_extension)
+        with span("write_job_scripts", items=len(job_df)):
+            job_df = create_job_scripts_from_mask(job_df, opt.mask, parameters, script_extension)
 
     LOG.debug("Creating shell scripts.")
-    job_df = htc_utils.write_bash(
-        job_df,
-        output_dir=opt.output_dir,
-        executable=opt.executable,
-        cmdline_arguments=opt.script_arguments,
-        mask=opt.mask,
-    )
+    with span("write_bash", items=len(job_df)):
+        job_df = htc_utils.write_bash(
+            job_df,
+            output_dir=opt.output_dir,
+            executable=opt.executable,
+            cmdline_arguments=opt.script_arguments,
+            mask=opt.mask,
+            lazy_destination=opt.lazy_destination,
+        )
 
     # Convert paths to strings and write df to file ---
     job_df[COLUMN_JOB_DIRECTORY] = job_df[COLUMN_JOB_DIRECTORY].apply(str)
     if COLUMN_DEST_DIRECTORY in job_df.columns:
         job_df[COLUMN_DEST_DIRECTORY] = job_df[COLUMN_DEST_DIRECTORY].apply(str)
 
-    tfs.write(str(opt.working_directory / JOBSUMMARY_FILE), job_df, save_index=COLUMN_JOBID)
+    with span("write_job_summary", items=len(job_df)):
+        tfs.write(str(opt.working_directory / JOBSUMMARY_FILE), job_df, save_index=COLUMN_JOBID)
 
     # Drop already run jobs ---
     dropped_jobs = []
     if opt.should_drop_jobs():
-        job_df, dropped_jobs = _drop_already_run_jobs(job_df, opt.output_dir, opt.check_files)
+        with span("drop_already_run_jobs", items=len(job_df)):
+            job_df, dropped_jobs = _drop_already_run_jobs(job_df, opt.output_dir, opt.check_files)
     return job_df, dropped_jobs
 
 
@@ -145,6 +161,7 @@ def create_folders(
     job_df: tfs.TfsDataFrame,
     working_directory: Path,
     destination_directory: Path | str = None,
+    lazy_destination: bool = False,
 ) -> tfs.TfsDataFrame:
     """Create the folder-structure in the given working directory and the
     destination directory if given.
@@ -156,6 +173,9 @@ def create_folders(
         working_directory (Path): Path to the working directory
         destination_directory (Path, optional): Path to the destination directory,
         i.e. the directory to copy the outputs to manually. Defaults to None.
+        lazy_destination (bool): Only create the top-level destination directory.
+        The per-job destination directories are then only stored in the job_df
+        and are created by the jobs themselves at run time. Defaults to False.
 
     Returns:
         tfs.TfsDataFrame: The job-dataframe again, but with the added paths to the job-dirs.
@@ -190,6 +210,10 @@ def create_folders(
         sym_destination.symlink_to(dest_path.resolve(), target_is_directory=True)
 
         # Create output dirs per job ---
+        if lazy_destination:
+            LOG.debug("   per-job destination directories will be created by the jobs.")
+            return job_df
+
         for job_dest_dir in job_df[COLUMN_DEST_DIRECTORY]:
             uri_to_path(job_dest_dir).mkdir(exist_ok=True)
             LOG.debug(f"   created '{job_dest_dir}'.")
@@ -263,6 +287,8 @@ def _generate_parameter_space(
     replace_dict: dict[str, Any], append_jobs: bool, cwd: Path
 ) -> tuple[list[str], np.ndarray, tfs.TfsDataFrame]:
     """Generate parameter space from replace-dict, check for existing jobs."""
+    import tfs
+
     LOG.debug("Generating parameter space from replace-dict.")
     parameters = list(replace_dict.keys())
     values_grid = _generate_values_grid(replace_dict)
@@ -284,6 +310,8 @@ def _generate_parameter_space(
 
 def _generate_values_grid(replace_dict: dict[str, Any]) -> np.ndarray:
     """Creates an array of the inner-product of the replace-dict."""
+    import numpy as np
+
     return np.array(list(itertools.product(*replace_dict.values())), dtype=object)
 
 
@@ -0,0 +1,347 @@
+"""
+Job Results
+-----------
+
+Tools to collect the output-files of finished jobs into a single columnar
+store, i.e. a ``parquet``-dataset in the working directory,
+together with a manifest of the already collected jobs.
+
+Each collection run writes one new part-file into the dataset, containing
+only the jobs that have finished since the last collection.
+Within the part-file, every job is written as its own row-group.
+
+The collected results can be queried via :class:`StudyResults`, which reads only
+the row-groups of the jobs matching the requested parameters and only the requested
+columns, from the memory-mapped part-files.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import multiprocessing
+import shutil
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import tfs
+
+from pylhc_submitter.constants.job_submitter import (
+    COLUMN_DEST_DIRECTORY,
+    COLUMN_JOB_DIRECTORY,
+    COLUMN_JOBID,
+    COLUMN_OUTPUT_FILE,
+    JOBSUMMARY_FILE,
+    NON_PARAMETER_COLUMNS,
+    RESULTS_MANIFEST_SUFFIX,
+    RESULTS_NAME,
+    RESULTS_PART_MASK,
+    RESULTS_SUFFIX,
+)
+from pylhc_submitter.submitter.iotools import uri_to_path
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # will be handled by job_collector and StudyResults
+    pa = None
+    pc = None
+    pq = None
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    import pandas as pd
+
+LOG = logging.getLogger(__name__)
+
+
+@dataclass
+class CollectionOpts:
+    """Options for collecting the job results."""
+
+    working_directory: Path  # Path to working directory, containing the Jobs.tfs
+    output_dir: str  # Name of the output directory of the jobs
+    file_pattern: str  # Glob-pattern of the files to collect from the output directory
+    output_name: str  # Name of the results-store in the working directory (without suffix)
+    num_processes: int  # Number of processes to read the files with
+    recollect: bool  # Ignore previous collections and start from scratch
+
+
+def collect_results(opt: CollectionOpts) -> list[str]:
+    """Collects the output-files of all finished jobs, that have not yet been collected,
+    joins them with the job-parameters from the Jobs.tfs and appends them as a new part
+    to the results-store.
+
+    Args:
+        opt (CollectionOpts): Options for collecting the results.
+
+    Returns:
+        List[str]: The ids of the newly collected jobs.
+    """
+    job_df = tfs.read(opt.working_directory / JOBSUMMARY_FILE, index=COLUMN_JOBID)
+    store_path = get_results_path(opt.working_directory, opt.output_name)
+    manifest_path = get_manifest_path(opt.working_directory, opt.output_name)
+
+    if opt.recollect:
+        LOG.info("Removing previous collection.")
+        shutil.rmtree(store_path, ignore_errors=True)
+        manifest_path.unlink(missing_ok=True)
+
+    parameters = get_parameter_columns(job_df)
+    manifest = read_manifest(manifest_path)
+    _check_manifest_compatibility(
+        manifest, output_dir=opt.output_dir, file_pattern=opt.file_pattern, parameters=parameters
+    )
+
+    tasks = [
+        (
+            str(jobid),
+            job[parameters].to_dict(),
+            _get_output_path(job, opt.output_dir),
+            opt.file_pattern,
+        )
+        for jobid, job in job_df.iterrows()
+        if str(jobid) not in manifest["jobs"]
+    ]
+    LOG.info(
+        f"{len(job_df.index) - len(tasks):d} of {len(job_df.index):d} jobs already collected. "
+        f"Checking the remaining {len(tasks):d} jobs for output."
+    )
+    if not tasks:
+        return []
+
+    store_path.mkdir(parents=True, exist_ok=True)
+    part_name = RESULTS_PART_MASK.format(len(manifest["parts"]))
+    tmp_part_path = store_path / f".{part_name}"  # hidden from readers until complete
+    writer = None
+    collected = {}
+    try:
+        with multiprocessing.Pool(processes=opt.num_processes) as pool:
+            chunksize = max(1, len(tasks) // (4 * opt.num_processes))
+            for jobid, files, df in pool.imap(_read_job_output, tasks, chunksize=chunksize):
+                if df is None:
+                    continue
+
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_part_path, table.schema)
+                writer.write_table(table.cast(writer.schema))  # one row-group per job
+                collected[jobid] = {"part": part_name, "files": files, "rows": len(df.index)}
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        LOG.info("No newly finished jobs found.")
+        return []
+
+    tmp_part_path.replace(store_path / part_name)
+
+    manifest["parts"].append(part_name)
+    manifest["jobs"].update(collected)
+    write_manifest(manifest_path, manifest)
+    LOG.info(f"Collected {len(collected):d} jobs into '{store_path / part_name}'.")
+    return list(collected.keys())
+
+
+def get_parameter_columns(job_df: pd.DataFrame) -> list[str]:
+    """Returns the names of the columns of the job-dataframe containing the parameters."""
+    return [column for column in job_df.columns if column not in NON_PARAMETER_COLUMNS]
+
+
+def get_results_path(working_directory: Path, output_name: str) -> Path:
+    """Path to the results-store (parquet-dataset directory)."""
+    return working_directory / f"{output_name}{RESULTS_SUFFIX}"
+
+
+def get_manifest_path(working_directory: Path, output_name: str) -> Path:
+    """Path to the manifest of the results-store."""
+    return working_directory / f"{output_name}{RESULTS_MANIFEST_SUFFIX}"
+
+
+def read_manifest(manifest_path: Path) -> dict[str, Any]:
+    """Read the manifest of the collected jobs, or return an empty one if not present."""
+    if not manifest_path.is_file():
+        return {
+            "output_dir": None,
+            "file_pattern": None,
+            "parameters": None,
+            "parts": [],
+            "jobs": {},
+        }
+    return json.loads(manifest_path.read_text())
+
+
+def write_manifest(manifest_path: Path, manifest: dict[str, Any]) -> None:
+    """Write the manifest, replacing the old one only once the new one is complete."""
+    tmp_path = manifest_path.with_name(f"{manifest_path.name}.tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=1))
+    tmp_path.replace(manifest_path)
+
+
+# Query ########################################################################
+
+
+class StudyResults:
+    """Read-access to the collected results of a study.
+
+    The results are collected on first access, if no collection exists yet
+    (see :func:`collect_results`). Queries filter on the job-parameters
+    (i.e. the parameter columns of the Jobs.tfs) and only read the row-groups
+    of the matching jobs and the requested columns from the memory-mapped files.
+
+    Example:
+        .. code-block:: python
+
+            study = StudyResults("/path/to/working_directory")
+            df = study.query(columns=["NAME", "BETX"], QX=0.31, SEED=range(1, 11))
+
+    Args:
+        working_directory (Path): Path to the working directory of the study.
+        output_dir (str): Name of the output directory of the jobs.
+        file_pattern (str): Glob-pattern of the files to collect from the output directory.
+        output_name (str): Name of the results-store in the working directory.
+        num_processes (int): Number of processes used when collecting the results.
+    """
+
+    def __init__(
+        self,
+        working_directory: Path | str,
+        output_dir: str = "Outputdata",
+        file_pattern: str = "*.tfs",
+        output_name: str = RESULTS_NAME,
+        num_processes: int = 4,
+    ):
+        if pa is None:
+            raise ImportError("pyarrow is necessary to read the collected results.")
+
+        self.opt = CollectionOpts(
+            working_directory=Path(working_directory),
+            output_dir=output_dir,
+            file_pattern=file_pattern,
+            output_name=output_name,
+            num_processes=num_processes,
+            recollect=False,
+        )
+        self.path = get_results_path(self.opt.working_directory, output_name)
+        self.manifest_path = get_manifest_path(self.opt.working_directory, output_name)
+
+        if not self.manifest_path.is_file():
+            LOG.info("No collected results found. Collecting now.")
+            self.update()
+
+    @property
+    def manifest(self) -> dict[str, Any]:
+        return read_manifest(self.manifest_path)
+
+    @property
+    def parameters(self) -> list[str]:
+        """Names of the parameter columns that can be used in the queries."""
+        return self.manifest["parameters"] or []
+
+    def update(self) -> list[str]:
+        """Collect the jobs that have finished since the last collection.
+
+        Returns:
+            List[str]: The ids of the newly collected jobs.
+        """
+        return collect_results(self.opt)
+
+    def query(self, columns: Sequence[str] | None = None, **parameters) -> pd.DataFrame:
+        """Read the results of the jobs matching the given parameters.
+
+        Args:
+            columns (Sequence[str]): Columns to read. Defaults to all columns.
+
+        Keyword Args:
+            Parameter names and the values to select. Single values select by equality,
+            iterables (e.g. lists or ``range``) select all jobs with one of the given values.
+
+        Returns:
+            DataFrame: The selected results.
+        """
+        unknown = set(parameters) - set(self.parameters)
+        if unknown:
+            raise KeyError(
+                f"Can only filter on the job-parameters {self.parameters}, "
+                f"but got {str(unknown).strip('{}')}."
+            )
+
+        if not self.manifest["parts"]:
+            raise FileNotFoundError(f"No results have been collected into '{self.path}' yet.")
+
+        table = pq.read_table(
+            self.path,
+            columns=None if columns is None else list(columns),
+            filters=_build_filter(parameters),
+            memory_map=True,
+        )
+        return table.to_pandas()
+
+
+# Helper #######################################################################
+
+
+def _check_manifest_compatibility(manifest: dict[str, Any], **settings) -> None:
+    """Sets the collection settings in a new manifest or checks they are the same as before."""
+    for key, current in settings.items():
+        previous = manifest.get(key)
+        if previous is None:
+            manifest[key] = current
+        elif previous != current:
+            raise ValueError(
+                f"The '{key}' ('{current}') differs from the one of the previous "
+                f"collection ('{previous}'). Use 'recollect' to start from scratch."
+            )
+
+
+def _build_filter(parameters: dict[str, Any]) -> pc.Expression | None:
+    """Build the filter expression on the parameter columns to be applied to the row-groups."""
+    expression = None
+    for name, value in parameters.items():
+        if isinstance(value, str) or not isinstance(value, Iterable):
+            condition = pc.field(name) == value
+        else:
+            condition = pc.field(name).isin(list(value))
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def _get_output_path(job: pd.Series, output_dir: str) -> Path:
+    """Returns the path to the output directory of the job,
+    preferring the output destination over the job directory."""
+    job_dir = job.get(COLUMN_DEST_DIRECTORY) or job[COLUMN_JOB_DIRECTORY]
+    return uri_to_path(job_dir) / output_dir
+
+
+def _read_job_output(
+    task: tuple[str, dict[str, Any], Path, str],
+) -> tuple[str, list[str], pd.DataFrame | None]:
+    """Read all files matching the pattern in the output-directory of a job
+    and attach the job-id and job-parameters as columns.
+
+    Args:
+        task (Tuple): job-id, job-parameters, output-directory and file-pattern.
+
+    Returns:
+        Tuple of the job-id, the names of the files read and the combined DataFrame
+        (or ``None`` if no matching files were found).
+    """
+    jobid, parameters, output_path, file_pattern = task
+    files = sorted(output_path.glob(file_pattern))
+    if not files:
+        return jobid, [], None
+
+    frames = []
+    for file_path in files:
+        df = tfs.read(file_path).reset_index(drop=True)
+        df.insert(0, COLUMN_OUTPUT_FILE, file_path.name)
+        for idx, (name, value) in enumerate(parameters.items()):
+            df.insert(idx, name, value)
+        df.insert(0, COLUMN_JOBID, jobid)
+        frames.append(df)
+    return jobid, [f.name for f in files], tfs.concat(frames, ignore_index=True)
@@ -20,6 +20,7 @@ from pylhc_submitter.constants.job_submitter import (
 )
 from pylhc_submitter.submitter import htc_utils
 from pylhc_submitter.utils.environment import on_windows
+from pylhc_submitter.utils.tracing import span
 
 if TYPE_CHECKING:
     import pandas as pd
@@ -70,8 +71,9 @@ def run_local(job_df: tfs.TfsDataFrame, opt: RunnerOpts) -> None:
 
     LOG.info(f"Running {len(job_df.index)} jobs locally in {opt.num_processes:d} processes.")
 
-    pool = multiprocessing.Pool(processes=opt.num_processes)
-    res = pool.map(_execute_shell, job_df.iterrows())
+    with span("run_local", items=len(job_df), processes=opt.num_processes):
+        pool = multiprocessing.Pool(processes=opt.num_processes)
+        res = pool.map(_execute_shell, job_df.iterrows())
     if any(res):
         jobs_failed = [j for r, j in zip(res, job_df.index) if r]
         LOG.error(f"{len(jobs_failed)} of {len(job_df)} jobs have failed:\n {jobs_failed}")
@@ -88,20 +90,22 @@ def run_htc(job_df: tfs.TfsDataFrame, opt: RunnerOpts) -> None:
     LOG.info(f"Submitting {len(job_df.index)} jobs on htcondor, flavour '{opt.jobflavour}'.")
     LOG.debug("Creating htcondor subfile.")
 
-    subfile = htc_utils.make_subfile(
-        opt.working_directory,
-        job_df,
-        output_dir=opt.output_dir,
-        jobflavour=opt.jobflavour,
-        **opt.htc_arguments,
-    )
+    with span("make_subfile", items=len(job_df)):
+        subfile = htc_utils.make_subfile(
+            opt.working_directory,
+            job_df,
+            output_dir=opt.output_dir,
+            jobflavour=opt.jobflavour,
+            **opt.htc_arguments,
+        )
 
     if opt.dryrun:
         LOG.info("Dry run: submission file created, but not submitting jobs to htcondor.")
         return
 
     LOG.debug("Submitting jobs to htcondor.")
-    htc_utils.submit_jobfile(subfile, opt.ssh)
+    with span("condor_submit", items=len(job_df), ssh=opt.ssh):
+        htc_utils.submit_jobfile(subfile, opt.ssh)
 
 
 # Helper #######################################################################
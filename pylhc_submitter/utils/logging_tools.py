@@ -7,12 +7,53 @@ Tools that make the logging life easier.
 
 from __future__ import annotations
 
+import contextvars
 import logging
 import sys
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+    from concurrent.futures import Executor, Future
+    from pathlib import Path
+
+FORMAT = "%(levelname)7s | %(message)s | %(name)s"
+FILE_FORMAT = "%(asctime)s | %(levelname)7s | %(message)s | %(name)s"
+
+# The handlers of the thread_log_file contexts the current code runs in.
+_LOG_FILE_HANDLERS: contextvars.ContextVar[tuple[logging.Handler, ...]] = contextvars.ContextVar(
+    "log_file_handlers", default=()
+)
 
 
 def log_setup():
     """Set up a basic logger."""
-    logging.basicConfig(
-        stream=sys.stdout, level=logging.INFO, format="%(levelname)7s | %(message)s | %(name)s"
-    )
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO, format=FORMAT)
+
+
+@contextmanager
+def thread_log_file(log_path: Path) -> Iterator[None]:
+    """Context to additionally write all log-messages emitted by the
+    current thread into the given file (appending).
+    Messages of other threads are only included, if their tasks have been
+    submitted from within this context via :func:`submit_in_context`."""
+    handler = logging.FileHandler(log_path)
+    handler.setFormatter(logging.Formatter(FILE_FORMAT))
+    handler.addFilter(lambda record: handler in _LOG_FILE_HANDLERS.get())
+
+    token = _LOG_FILE_HANDLERS.set((*_LOG_FILE_HANDLERS.get(), handler))
+    root_logger = logging.getLogger()
+    root_logger.addHandler(handler)
+    try:
+        yield
+    finally:
+        root_logger.removeHandler(handler)
+        _LOG_FILE_HANDLERS.reset(token)
+        handler.close()
+
+
+def submit_in_context(pool: Executor, fn: Callable, /, *args, **kwargs) -> Future:
+    """Submit the function to the (thread-) pool, to be run in a copy of the current context,
+    so that its log-messages are also written into the :func:`thread_log_file` of the caller."""
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
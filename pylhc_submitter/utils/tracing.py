@@ -0,0 +1,204 @@
+"""
+Tracing
+-------
+
+Lightweight instrumentation of the phases of a run.
+
+The phases are wrapped in :func:`span`, which records their wall time,
+the number of items processed (e.g. jobs) and by how much the peak memory of the process
+has grown during the phase (from ``resource``, i.e. not available on Windows).
+As the peak memory is that of the whole process, the growth of phases running in parallel
+threads can not be told apart.
+Spans are only recorded within :func:`trace_run`, which writes all spans
+into a ``json`` trace-file at the end of the run and logs a summary per phase.
+Spans can be nested and used from multiple threads.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+LOG = logging.getLogger(__name__)
+
+OK = "ok"
+
+_ACTIVE_TRACE: Trace | None = None
+_THREAD_STACK = threading.local()
+
+
+@dataclass
+class Span:
+    """Timing and metrics of a single phase."""
+
+    name: str
+    start: float = field(default_factory=time.time)
+    seconds: float | None = None
+    items: int | None = None
+    peak_memory_growth_mb: float | None = None  # growth of the process' peak memory
+    process_peak_memory_mb: float | None = None  # peak memory of the process at the end
+    status: str = OK
+    failed: bool = False
+    parent: str | None = None
+    thread: str = field(default_factory=lambda: threading.current_thread().name)
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+
+class Trace:
+    """Thread-safe collection of the spans of a run."""
+
+    def __init__(self):
+        self.created = datetime.now(timezone.utc)
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span_: Span):
+        with self._lock:
+            self.spans.append(span_)
+
+    def summary(self) -> list[dict[str, Any]]:
+        """Spans aggregated by name, in order of their first start."""
+        grouped = defaultdict(list)
+        for span_ in sorted(self.spans, key=lambda s: s.start):
+            grouped[span_.name].append(span_)
+
+        summary = []
+        for name, spans in grouped.items():
+            items = [s.items for s in spans if s.items is not None]
+            memory = [s.peak_memory_growth_mb for s in spans if s.peak_memory_growth_mb is not None]
+            summary.append(
+                {
+                    "name": name,
+                    "count": len(spans),
+                    "total_seconds": sum(s.seconds for s in spans),
+                    "max_seconds": max(s.seconds for s in spans),
+                    "items": sum(items) if items else None,
+                    "peak_memory_growth_mb": max(memory) if memory else None,
+                    "failed": sum(s.failed for s in spans),
+                }
+            )
+        return summary
+
+    def summary_text(self) -> str:
+        lines = [
+            (
+                f"{'Phase':35s} {'Count':>6s} {'Failed':>6s} {'Total [s]':>10s} {'Max [s]':>10s} "
+                f"{'Items':>8s} {'Peak growth [MB]':>16s}"
+            )
+        ]
+        for entry in self.summary():
+            items = "-" if entry["items"] is None else f"{entry['items']:d}"
+            memory = entry["peak_memory_growth_mb"]
+            memory = "-" if memory is None else f"{memory:.1f}"
+            lines.append(
+                f"{entry['name']:35s} {entry['count']:6d} {entry['failed']:6d} "
+                f"{entry['total_seconds']:10.3f} {entry['max_seconds']:10.3f} "
+                f"{items:>8s} {memory:>16s}"
+            )
+
+        peak_memory = _get_peak_memory_mb()
+        if peak_memory is not None:
+            lines.append(f"Peak memory of the process: {peak_memory:.1f} MB")
+        return "\n".join(lines)
+
+    def write(self, path: Path):
+        """Write the spans and their summary into a json-file."""
+        with self._lock:
+            spans = [asdict(s) for s in sorted(self.spans, key=lambda s: s.start)]
+        data = {
+            "created": self.created.isoformat(timespec="seconds"),
+            "process_peak_memory_mb": _get_peak_memory_mb(),
+            "summary": self.summary(),
+            "spans": spans,
+        }
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(data, indent=2, default=str))
+        tmp_path.replace(path)
+
+
+@contextmanager
+def trace_run(path: Path) -> Iterator[Trace]:
+    """Context to record the spans of a run, which are written into
+    the given json-file at the end (also if the run failed)."""
+    global _ACTIVE_TRACE
+    previous, trace = _ACTIVE_TRACE, Trace()
+    _ACTIVE_TRACE = trace
+    try:
+        yield trace
+    finally:
+        _ACTIVE_TRACE = previous
+        if trace.spans:
+            trace.write(path)
+            LOG.info(f"Timing summary (trace in '{path!s}'):\n{trace.summary_text()}")
+
+
+@contextmanager
+def span(
+    name: str,
+    items: int | None = None,
+    expected: tuple[type[BaseException], ...] = (),
+    **attributes,
+) -> Iterator[Span]:
+    """Context to record the wall time, items and peak memory growth of a phase.
+    The items can also be set on the returned span, within the context.
+    Exceptions leaving the context are recorded as status of the span,
+    which counts as failed unless the exception is one of the ``expected`` ones
+    (i.e. used for control flow).
+    Outside of :func:`trace_run` nothing is recorded."""
+    stack = _get_thread_stack()
+    span_ = Span(name=name, items=items, parent=stack[-1] if stack else None, attributes=attributes)
+    trace = _ACTIVE_TRACE
+    start_memory = _get_peak_memory_mb() if trace is not None else None
+    stack.append(name)
+    start = time.perf_counter()
+    try:
+        yield span_
+    except BaseException as e:
+        span_.status = e.__class__.__name__
+        span_.failed = not isinstance(e, expected)
+        raise
+    finally:
+        span_.seconds = time.perf_counter() - start
+        stack.pop()
+        if trace is not None:
+            span_.process_peak_memory_mb = _get_peak_memory_mb()
+            if start_memory is not None:
+                span_.peak_memory_growth_mb = span_.process_peak_memory_mb - start_memory
+            trace.add(span_)
+
+
+# Helper -----------------------------------------------------------------------
+
+
+def _get_thread_stack() -> list[str]:
+    if not hasattr(_THREAD_STACK, "names"):
+        _THREAD_STACK.names = []
+    return _THREAD_STACK.names
+
+
+def _get_peak_memory_mb() -> float | None:
+    """Peak resident memory of the process so far."""
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return maxrss / 2**20  # bytes
+    return maxrss / 2**10  # kilobytes
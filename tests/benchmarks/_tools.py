@@ -0,0 +1,266 @@
+"""
+Benchmark Tools
+---------------
+
+Helpers shared by the benchmark scripts (``bench_*.py``) in this directory:
+
+- :class:`BenchmarkRun` times the benchmarks and writes their results as ``json``,
+  together with the versions and the machine they were run on,
+  so that the results of different versions can be compared (see :func:`compare_results`).
+- :func:`benchmark_directory` provides a temporary directory on ``tmpfs`` (if available).
+- :func:`simulated_latency` delays the filesystem operations done via :mod:`pathlib`,
+  to mimic network filesystems like ``afs`` or the ``eos`` FUSE mount.
+
+The benchmarks are not collected by ``pytest``, run them as modules from the repository root,
+e.g. ``python -m tests.benchmarks.bench_job_creation --help``.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+LOG = logging.getLogger(__name__)
+
+TMPFS = Path("/dev/shm")
+PACKAGES = ("pylhc_submitter", "numpy", "pandas", "tfs-pandas", "matplotlib", "scipy")
+
+# pathlib methods delayed by `simulated_latency`, i.e. all that touch the filesystem
+LATENCY_METHODS = ("stat", "lstat", "mkdir", "open", "iterdir", "glob", "symlink_to", "unlink")
+
+OK = "ok"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+
+@dataclass
+class BenchmarkResult:
+    """Timing of a single benchmark at a given size."""
+
+    name: str
+    size: int
+    filesystem: str = "tmpfs"
+    status: str = OK
+    seconds: float | None = None
+    peak_memory_mb: float | None = None
+    info: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class BenchmarkRun:
+    """Collection of the benchmark results of one run.
+
+    Args:
+        suite (str): Name of the benchmark suite, i.e. the script.
+        max_seconds (float): If a benchmark takes longer than this at one size,
+                             it is skipped for all larger sizes.
+        memory (bool): Also trace the peak memory (slows down the benchmarks).
+        config (dict): Configuration of the benchmarks, stored with the results.
+    """
+
+    suite: str
+    max_seconds: float = 60.0
+    memory: bool = False
+    config: dict[str, Any] = field(default_factory=dict)
+    results: list[BenchmarkResult] = field(default_factory=list)
+
+    def run(
+        self, name: str, size: int, function: Callable[[], Any], filesystem: str = "tmpfs"
+    ) -> BenchmarkResult:
+        """Time a single call of ``function``. If it returns a dictionary,
+        it is stored as additional information of the result."""
+        result = BenchmarkResult(name=name, size=size, filesystem=filesystem)
+        self.results.append(result)
+
+        slow = self._too_slow(name, size, filesystem)
+        if slow is not None:
+            result.status = SKIPPED
+            result.info["reason"] = (
+                f"took {slow.seconds:.1f}s at size {slow.size:d} (max_seconds {self.max_seconds})"
+            )
+            LOG.info(f"{name} [{filesystem}, {size:d}]: skipped.")
+            return result
+
+        if self.memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            info = function()
+        except Exception as e:  # noqa: BLE001 (record the error and carry on)
+            result.status = FAILED
+            result.info["error"] = f"{e.__class__.__name__}: {e}"
+            LOG.error(f"{name} [{filesystem}, {size:d}]: {result.info['error']}")
+        else:
+            result.seconds = time.perf_counter() - start
+            if isinstance(info, dict):
+                result.info.update(info)
+            LOG.info(f"{name} [{filesystem}, {size:d}]: {result.seconds:.3f}s")
+        finally:
+            if self.memory:
+                result.peak_memory_mb = tracemalloc.get_traced_memory()[1] / 2**20
+                tracemalloc.stop()
+        return result
+
+    def skip(self, name: str, size: int, reason: str, filesystem: str = "tmpfs"):
+        """Record a benchmark as skipped, e.g. because of missing dependencies."""
+        self.results.append(
+            BenchmarkResult(
+                name=name, size=size, filesystem=filesystem, status=SKIPPED, info={"reason": reason}
+            )
+        )
+        LOG.info(f"{name} [{filesystem}, {size:d}]: skipped ({reason}).")
+
+    def write(self, path: Path):
+        """Write the results and the environment they were created in as json."""
+        meta = get_metadata(self.suite)
+        meta["config"] = self.config
+        data = {"meta": meta, "results": [asdict(r) for r in self.results]}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data, indent=2, default=str))
+        LOG.info(f"Benchmark results written to {str(path)}.")
+
+    def _too_slow(self, name: str, size: int, filesystem: str) -> BenchmarkResult | None:
+        for previous in self.results:
+            if (
+                previous.name == name
+                and previous.filesystem == filesystem
+                and previous.size < size
+                and previous.seconds is not None
+                and previous.seconds > self.max_seconds
+            ):
+                return previous
+        return None
+
+
+def get_metadata(suite: str) -> dict[str, Any]:
+    """Information about the run, to make the results of different versions comparable."""
+    versions = {}
+    for package in PACKAGES:
+        try:
+            versions[package] = version(package)
+        except PackageNotFoundError:
+            versions[package] = None
+
+    return {
+        "suite": suite,
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": _get_git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": versions,
+    }
+
+
+def compare_results(old_path: Path, new_path: Path) -> list[dict[str, Any]]:
+    """Compare the timings of two result files, e.g. from two versions.
+
+    Returns:
+        List of dicts with the benchmark, size, filesystem, both timings and their ratio (new/old).
+    """
+    old, new = (
+        {
+            (r["name"], r["size"], r["filesystem"]): r["seconds"]
+            for r in json.loads(path.read_text())["results"]
+        }
+        for path in (old_path, new_path)
+    )
+    comparison = []
+    for key in sorted(old.keys() & new.keys()):
+        if old[key] is None or new[key] is None:
+            continue
+        name, size, filesystem = key
+        comparison.append(
+            {
+                "name": name,
+                "size": size,
+                "filesystem": filesystem,
+                "old": old[key],
+                "new": new[key],
+                "ratio": new[key] / old[key] if old[key] else None,
+            }
+        )
+    return comparison
+
+
+def log_comparison(comparison: list[dict[str, Any]]):
+    """Log the comparison of two result files as table."""
+    lines = [
+        f"{'benchmark':40s} {'filesystem':10s} {'size':>9s} {'old':>9s} {'new':>9s} {'new/old':>7s}"
+    ]
+    for c in comparison:
+        ratio = "-" if c["ratio"] is None else f"{c['ratio']:7.2f}"
+        lines.append(
+            f"{c['name']:40s} {c['filesystem']:10s} {c['size']:9d} "
+            f"{c['old']:9.3f} {c['new']:9.3f} {ratio:>7s}"
+        )
+    LOG.info("\n".join(lines))
+
+
+@contextmanager
+def benchmark_directory(prefix: str = "pylhc_submitter_bench_") -> Iterator[Path]:
+    """Temporary directory on ``tmpfs`` (``/dev/shm``) if available,
+    so that the benchmarks do not measure the disk. Removed afterwards."""
+    base = TMPFS if TMPFS.is_dir() and os.access(TMPFS, os.W_OK) else None
+    path = Path(tempfile.mkdtemp(prefix=prefix, dir=base))
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+@contextmanager
+def simulated_latency(seconds: float) -> Iterator[None]:
+    """Delay every filesystem operation done via :class:`pathlib.Path`
+    (see ``LATENCY_METHODS``) by the given time, e.g. to mimic a network filesystem.
+    Only affects the current process."""
+    originals = {name: getattr(Path, name) for name in LATENCY_METHODS}
+
+    def delayed(method):
+        def wrapper(*args, **kwargs):
+            time.sleep(seconds)
+            return method(*args, **kwargs)
+
+        return wrapper
+
+    for name, method in originals.items():
+        setattr(Path, name, delayed(method))
+    try:
+        yield
+    finally:
+        for name, method in originals.items():
+            setattr(Path, name, method)
+
+
+def setup_logging():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)-7s %(message)s")
+
+
+# Helper -----------------------------------------------------------------------
+
+
+def _get_git_revision() -> str | None:
+    head = Path(__file__).parents[2] / ".git" / "HEAD"
+    try:
+        ref = head.read_text().strip()
+        if ref.startswith("ref:"):
+            return (head.parent / ref.split()[1]).read_text().strip()
+        return ref
+    except OSError:
+        return None
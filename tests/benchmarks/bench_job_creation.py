@@ -0,0 +1,252 @@
+"""
+Benchmark: Job Creation
+-----------------------
+
+Times the steps of the job-creation pipeline of the ``job_submitter``
+for synthetic ``replace_dict`` parameter spaces of increasing size:
+
+- ``generate_parameter_space``: the value grid of the ``replace_dict``.
+- ``generate_parameter_space_append``: the same, but appending to a previous ``Jobs.tfs``
+  containing half of the grid (checks every new job against the previous ones).
+- ``create_jobs``: job-dataframe, folders, job-scripts from a mask-file and bash-scripts.
+- ``create_multijob_for_bashfiles``: the ``HTCondor`` submission (needs the ``htcondor`` bindings).
+- ``drop_already_run_jobs``: check of the output of the jobs, half of which have already run.
+
+The filesystem benchmarks run on ``tmpfs`` and on a simulated network filesystem,
+which delays every filesystem operation by ``--latency`` seconds.
+Benchmarks that take longer than ``--max-seconds`` are skipped for the larger sizes.
+
+Run from the repository root, e.g.::
+
+    python -m tests.benchmarks.bench_job_creation --sizes 1000 10000 --output new.json --compare old.json
+"""
+
+from __future__ import annotations
+
+import argparse
+from contextlib import nullcontext
+from pathlib import Path
+
+import tfs
+
+from pylhc_submitter.constants.htcondor import HTCONDOR_JOBLIMIT
+from pylhc_submitter.constants.job_submitter import (
+    COLUMN_JOB_DIRECTORY,
+    COLUMN_JOBID,
+    JOBSUMMARY_FILE,
+)
+from pylhc_submitter.submitter import htc_utils, iotools
+from pylhc_submitter.submitter.mask import generate_jobdf_index
+from tests.benchmarks._tools import (
+    BenchmarkRun,
+    benchmark_directory,
+    compare_results,
+    log_comparison,
+    setup_logging,
+    simulated_latency,
+)
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+DEFAULT_LATENCY = 0.5e-3  # seconds per filesystem operation
+FILESYSTEMS = ("tmpfs", "latency")
+
+JOBID_MASK = "%(PARAM_A)s.%(PARAM_B)s.%(PARAM_C)d"
+OUTPUT_DIR = "Outputdir"
+CHECK_FILE = "out.txt"
+MASK = f'echo "{JOBID_MASK}" > "{OUTPUT_DIR}/{CHECK_FILE}"\n'
+
+
+def get_replace_dict(size: int) -> dict[str, list]:
+    """Synthetic replace-dict with a string, a float and an integer parameter,
+    spanning a grid of ``size`` points."""
+    if size % 100:
+        raise ValueError(f"Size needs to be a multiple of 100, got {size}.")
+    return {
+        "PARAM_A": [f"a{i:d}" for i in range(10)],
+        "PARAM_B": [0.25 * i for i in range(10)],
+        "PARAM_C": list(range(size // 100)),
+    }
+
+
+def benchmark_size(run: BenchmarkRun, size: int, filesystems: tuple[str], latency: float):
+    """Run all benchmarks for a grid of the given size."""
+    replace_dict = get_replace_dict(size)
+
+    with benchmark_directory() as cwd:
+        run.run(
+            "generate_parameter_space",
+            size,
+            lambda: _n_jobs(
+                iotools._generate_parameter_space(replace_dict, append_jobs=False, cwd=cwd)
+            ),
+        )
+
+        _write_previous_jobs(cwd, replace_dict)
+        run.run(
+            "generate_parameter_space_append",
+            size,
+            lambda: _n_jobs(
+                iotools._generate_parameter_space(replace_dict, append_jobs=True, cwd=cwd)
+            ),
+        )
+
+    for filesystem in filesystems:
+        if size > HTCONDOR_JOBLIMIT:
+            for name in ("create_jobs", "create_multijob_for_bashfiles", "drop_already_run_jobs"):
+                run.skip(
+                    name,
+                    size,
+                    f"more jobs than HTCONDOR_JOBLIMIT ({HTCONDOR_JOBLIMIT})",
+                    filesystem,
+                )
+            continue
+        delay = latency if filesystem == "latency" else None
+        with benchmark_directory() as cwd:
+            _benchmark_filesystem(run, size, replace_dict, cwd, filesystem, delay)
+
+
+def main(args: list[str] | None = None):
+    opt = _get_parser().parse_args(args)
+    setup_logging()
+
+    run = BenchmarkRun(
+        suite="job_creation",
+        max_seconds=opt.max_seconds,
+        memory=opt.memory,
+        config={"latency": opt.latency},
+    )
+    for size in sorted(opt.sizes):
+        benchmark_size(run, size, tuple(opt.filesystems), opt.latency)
+    run.write(opt.output)
+
+    if opt.compare is not None:
+        log_comparison(compare_results(opt.compare, opt.output))
+
+
+# Helper -----------------------------------------------------------------------
+
+
+def _benchmark_filesystem(
+    run: BenchmarkRun,
+    size: int,
+    replace_dict: dict,
+    cwd: Path,
+    filesystem: str,
+    delay: float | None,
+):
+    mask_path = cwd / "job.mask"
+    mask_path.write_text(MASK)
+    opt = iotools.CreationOpts(
+        working_directory=cwd,
+        mask=mask_path,
+        jobid_mask=JOBID_MASK,
+        replace_dict=replace_dict,
+        output_dir=OUTPUT_DIR,
+        output_destination=None,
+        lazy_destination=False,
+        append_jobs=False,
+        resume_jobs=False,
+        executable="bash",
+        check_files=[CHECK_FILE],
+        script_arguments={},
+        script_extension=".sh",
+    )
+
+    created = {}
+
+    def create_jobs():
+        with _latency(delay):
+            created["job_df"], _ = iotools.create_jobs(opt)
+        return {"n_jobs": len(created["job_df"])}
+
+    result = run.run("create_jobs", size, create_jobs, filesystem)
+    if "job_df" not in created:
+        for name in ("create_multijob_for_bashfiles", "drop_already_run_jobs"):
+            run.skip(name, size, f"create_jobs {result.status}", filesystem)
+        return
+    job_df = created["job_df"]
+
+    if htc_utils.get_htcondor() is None:
+        run.skip("create_multijob_for_bashfiles", size, "no htcondor bindings", filesystem)
+    else:
+        run.run(
+            "create_multijob_for_bashfiles",
+            size,
+            lambda: {"n_chars": len(htc_utils.create_multijob_for_bashfiles(job_df))},
+            filesystem,
+        )
+
+    for job_dir in job_df[COLUMN_JOB_DIRECTORY].iloc[::2]:  # half of the jobs have run
+        output_dir = Path(job_dir) / OUTPUT_DIR
+        output_dir.mkdir()
+        (output_dir / CHECK_FILE).write_text("done")
+
+    def drop_jobs():
+        with _latency(delay):
+            _, finished = iotools._drop_already_run_jobs(job_df, OUTPUT_DIR, [CHECK_FILE])
+        return {"n_finished": len(finished)}
+
+    run.run("drop_already_run_jobs", size, drop_jobs, filesystem)
+
+
+def _write_previous_jobs(cwd: Path, replace_dict: dict):
+    """Write a ``Jobs.tfs`` with the first half of the grid, as if created by a previous run."""
+    previous_dict = dict(replace_dict)
+    previous_dict["PARAM_C"] = replace_dict["PARAM_C"][: len(replace_dict["PARAM_C"]) // 2]
+    parameters = list(previous_dict.keys())
+    values_grid = iotools._generate_values_grid(previous_dict)
+    job_df = tfs.TfsDataFrame(
+        index=generate_jobdf_index(None, JOBID_MASK, parameters, values_grid),
+        columns=parameters,
+        data=values_grid,
+    )
+    tfs.write(cwd / JOBSUMMARY_FILE, job_df, save_index=COLUMN_JOBID)
+
+
+def _n_jobs(parameter_space: tuple) -> dict[str, int]:
+    return {"n_jobs": len(parameter_space[1])}
+
+
+def _latency(delay: float | None):
+    return nullcontext() if delay is None else simulated_latency(delay)
+
+
+def _get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip("\n- "))
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Number of jobs in the grid."
+    )
+    parser.add_argument(
+        "--filesystems",
+        nargs="+",
+        choices=FILESYSTEMS,
+        default=list(FILESYSTEMS),
+        help="Filesystems to run the filesystem benchmarks on.",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=DEFAULT_LATENCY,
+        help="Delay of each filesystem operation on the simulated network filesystem, in seconds.",
+    )
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        default=60.0,
+        help="Skip benchmarks at larger sizes, once they took longer than this.",
+    )
+    parser.add_argument("--memory", action="store_true", help="Also trace the peak memory.")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=Path("bench_job_creation.json"),
+        help="Output json-file for the results.",
+    )
+    parser.add_argument(
+        "--compare", type=Path, default=None, help="Results of a previous run to compare to."
+    )
+    return parser
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Benchmark: Autosix Post-Processing
+----------------------------------
+
+Times the post-tracking paths of ``autosix`` on synthetic SixDesk workspaces
+(see ``sixdesk_workspace``) with increasing numbers of seeds:
+
+- ``find_locks`` and ``find_locks_full_scan``: lock detection in the workspace.
+- ``audit_track_tree`` and ``audit_track_tree_indexed``: output audit of the ``track`` tree,
+  without and with the index of the previous audit.
+- ``extract_da_data``: reading the ``da_post`` table from the database.
+- ``create_stats_df``: statistics per angle and per seed.
+- ``create_da_tfs`` and ``create_da_tfs_cached``: extraction, statistics and writing of
+  the tfs-files, and the same with the cache of the unchanged database.
+- ``create_polar_plots``: the polar plots of both DA columns.
+- ``calculate_da_from_db``: native DA from the ``six_results`` table of the database.
+- ``load_tracking_results`` and ``calculate_da``: native loading of the ``fort.10`` files
+  and the DA from the loaded results.
+
+Run from the repository root, e.g.::
+
+    python -m tests.benchmarks.bench_post_processing --seeds 10 60 --angles 11 --output new.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from dataclasses import asdict, replace
+from pathlib import Path
+
+from pylhc_submitter.constants.autosix import ANGLE, SEED, get_da_cache_path, get_track_path
+from pylhc_submitter.sixdesk_tools import post_process_da
+from pylhc_submitter.sixdesk_tools.dynamic_aperture import calculate_da
+from pylhc_submitter.sixdesk_tools.extract_data_from_db import extract_da_data
+from pylhc_submitter.sixdesk_tools.track_tree import audit_track_tree
+from pylhc_submitter.sixdesk_tools.tracking_results import load_tracking_results
+from pylhc_submitter.sixdesk_tools.utils import find_locks
+from tests.benchmarks._tools import (
+    BenchmarkRun,
+    benchmark_directory,
+    compare_results,
+    log_comparison,
+    setup_logging,
+)
+from tests.benchmarks.sixdesk_workspace import WorkspaceSpec, create_workspace
+
+JOBNAME = "bench_job"
+DEFAULT_SEEDS = (10, 60, 240)
+OLD_MTIME = 1e9  # so that the directories can be stored in the index of the audit
+
+
+def benchmark_workspace(run: BenchmarkRun, spec: WorkspaceSpec, max_workers: int | None):
+    """Create a workspace and run all benchmarks on it."""
+    size = spec.seeds
+    with benchmark_directory() as basedir:
+        generated = run.run(
+            "create_workspace", size, lambda: create_workspace(JOBNAME, basedir, spec)
+        )
+        if generated.seconds is None:
+            return
+        _set_old_mtimes(get_track_path(JOBNAME, basedir))
+
+        run.run("find_locks", size, lambda: {"locks": len(find_locks(JOBNAME, basedir))})
+        run.run(
+            "find_locks_full_scan",
+            size,
+            lambda: {"locks": len(find_locks(JOBNAME, basedir, full_scan=True))},
+        )
+
+        run.run(
+            "audit_track_tree",
+            size,
+            lambda: _audit(basedir, use_index=False, max_workers=max_workers),
+        )
+        _audit(basedir, use_index=True, max_workers=max_workers)  # creates the index
+        run.run(
+            "audit_track_tree_indexed",
+            size,
+            lambda: _audit(basedir, use_index=True, max_workers=max_workers),
+        )
+
+        df_da = extract_da_data(JOBNAME, basedir)
+        run.run("extract_da_data", size, lambda: {"rows": len(extract_da_data(JOBNAME, basedir))})
+        run.run("create_stats_df", size, lambda: _create_stats(df_da))
+
+        get_da_cache_path(JOBNAME, basedir).unlink(missing_ok=True)
+        run.run("create_da_tfs", size, lambda: _create_da_tfs(basedir))
+        run.run("create_da_tfs_cached", size, lambda: _create_da_tfs(basedir))
+
+        df_da, df_angle, _ = post_process_da.create_da_tfs(JOBNAME, basedir)
+        run.run(
+            "create_polar_plots",
+            size,
+            lambda: post_process_da.create_polar_plots(JOBNAME, basedir, df_da, df_angle),
+        )
+
+        da_kwargs = {"emittance": spec.emittance, "gamma": spec.gamma, "turnstep": spec.turns // 10}
+        run.run("calculate_da_from_db", size, lambda: _calculate_da(basedir, da_kwargs))
+        if spec.incomplete:
+            run.skip("load_tracking_results", size, "incomplete cases")
+            run.skip("calculate_da", size, "incomplete cases")
+            return
+        run.run(
+            "load_tracking_results",
+            size,
+            lambda: {
+                "seeds": len(load_tracking_results(JOBNAME, basedir, max_workers=max_workers))
+            },
+        )
+        run.run("calculate_da", size, lambda: _calculate_da(basedir, da_kwargs))
+
+
+def main(args: list[str] | None = None):
+    opt = _get_parser().parse_args(args)
+    setup_logging()
+
+    spec = WorkspaceSpec(
+        angles=opt.angles,
+        amp_start=opt.amplitudes[0],
+        amp_stop=opt.amplitudes[1],
+        amp_step=opt.amplitudes[2],
+        pairs=opt.pairs,
+        locks=opt.locks,
+        incomplete=opt.incomplete,
+    )
+    config = asdict(spec)
+    config.pop("seeds")
+    run = BenchmarkRun(
+        suite="post_processing", max_seconds=opt.max_seconds, memory=opt.memory, config=config
+    )
+    for seeds in sorted(opt.seeds):
+        benchmark_workspace(run, replace(spec, seeds=seeds), opt.max_workers)
+    run.write(opt.output)
+
+    if opt.compare is not None:
+        log_comparison(compare_results(opt.compare, opt.output))
+
+
+# Helper -----------------------------------------------------------------------
+
+
+def _audit(basedir: Path, use_index: bool, max_workers: int | None) -> dict[str, int]:
+    report = audit_track_tree(
+        JOBNAME, basedir, max_workers=max_workers or os.cpu_count(), use_index=use_index
+    )
+    return {"cases": report.n_cases, "checked": report.n_checked}
+
+
+def _create_stats(df_da) -> dict[str, int]:
+    df_angle = post_process_da._create_stats_df(df_da, ANGLE)
+    df_seed = post_process_da._create_stats_df(df_da, SEED, global_index=0)
+    return {"angles": len(df_angle), "seeds": len(df_seed) - 1}
+
+
+def _create_da_tfs(basedir: Path) -> dict[str, int]:
+    df_da, _, _ = post_process_da.create_da_tfs(JOBNAME, basedir)
+    return {"rows": len(df_da)}
+
+
+def _calculate_da(basedir: Path, da_kwargs: dict) -> dict[str, int]:
+    df_da, df_da_vs_turns = calculate_da(JOBNAME, basedir, **da_kwargs)
+    return {"rows": len(df_da), "rows_vs_turns": len(df_da_vs_turns)}
+
+
+def _set_old_mtimes(path: Path):
+    """Directories modified just before the audit are not stored in its index."""
+    for dirpath, _, _ in os.walk(path):
+        os.utime(dirpath, (OLD_MTIME, OLD_MTIME))
+
+
+def _get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip("\n- "))
+    parser.add_argument(
+        "--seeds", type=int, nargs="+", default=DEFAULT_SEEDS, help="Number of seeds per workspace."
+    )
+    parser.add_argument("--angles", type=int, default=11, help="Number of angles.")
+    parser.add_argument(
+        "--amplitudes",
+        type=float,
+        nargs=3,
+        default=(2.0, 20.0, 2.0),
+        metavar=("START", "STOP", "STEP"),
+        help="Amplitude ranges of the cases (in sigma).",
+    )
+    parser.add_argument("--pairs", type=int, default=30, help="Particle pairs per case.")
+    parser.add_argument("--locks", action="store_true", help="Lock the workspaces.")
+    parser.add_argument(
+        "--incomplete", type=float, default=0.0, help="Fraction of cases without output."
+    )
+    parser.add_argument(
+        "--max-workers", type=int, default=None, help="Threads/processes for audit and loading."
+    )
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        default=120.0,
+        help="Skip benchmarks at larger sizes, once they took longer than this.",
+    )
+    parser.add_argument("--memory", action="store_true", help="Also trace the peak memory.")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=Path("bench_post_processing.json"),
+        help="Output json-file for the results.",
+    )
+    parser.add_argument(
+        "--compare", type=Path, default=None, help="Results of a previous run to compare to."
+    )
+    return parser
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Synthetic SixDesk Workspaces
+----------------------------
+
+Generator of SixDesk workspaces as left behind by the tracking, without the need for
+SixDesk, ``HTCondor`` or ``afs``, to benchmark the post-tracking paths of ``autosix``:
+
+- the ``track`` tree, with a directory per seed, tunes, amplitude-range, turns and angle,
+  containing the ``HTCondor`` files and the ``fort.10.gz`` with the results per particle pair,
+- the database ``<jobname>.db`` with the ``da_post`` table (as after ``sixdb <jobname> da``)
+  and the ``six_input``/``six_results`` tables (as after ``sixdb load_dir``),
+- optionally ``sixdesklock`` files and incomplete cases.
+
+The particles are lost above a DA drawn randomly per seed and angle,
+so that all DA calculations (``sixdb``-like or native) result in the same values.
+"""
+
+from __future__ import annotations
+
+import gzip
+import io
+import itertools
+import sqlite3
+from contextlib import closing
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from pylhc_submitter.constants.autosix import (
+    SIXDESKLOCKFILE,
+    get_autosix_results_path,
+    get_database_path,
+    get_scratch_sixtrack_input_path,
+    get_sixjobs_path,
+    get_track_path,
+    get_workspace_path,
+)
+from pylhc_submitter.sixdesk_tools.tracking_results import FORT10_COLUMNS
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+HTCONDOR_FILES = ("htcondor.err", "htcondor.log", "htcondor.out")
+SIXJOBS_DIRS = ("sixtrack_input", "work", "plot", "control_files")
+
+
+@dataclass
+class WorkspaceSpec:
+    """Parameters of a synthetic workspace.
+
+    Args:
+        seeds (int): Number of seeds (numbered from 1).
+        angles (int): Number of angles (numbered from 1, spread over 0-90 degree).
+        amp_start (float): Smallest amplitude (in sigma).
+        amp_stop (float): Largest amplitude (in sigma).
+        amp_step (float): Size of the amplitude-range of each case.
+        pairs (int): Particle pairs per case, i.e. rows in the ``fort.10``.
+        turns (int): Number of turns tracked.
+        da_mean (float): Mean of the DA (in sigma) over seeds and angles.
+        da_spread (float): Standard deviation of the DA over seeds and angles.
+        emittance (float): Normalized emittance (in um).
+        gamma (float): Relativistic gamma.
+        tunes (str): Tune-directory name.
+        locks (bool): Lock the workspace (and the seed-directories of the ``track`` tree).
+        incomplete (float): Fraction of cases without output.
+        random_seed (int): Seed for the random numbers.
+    """
+
+    seeds: int = 60
+    angles: int = 11
+    amp_start: float = 2.0
+    amp_stop: float = 20.0
+    amp_step: float = 2.0
+    pairs: int = 30
+    turns: int = 100_000
+    da_mean: float = 12.0
+    da_spread: float = 1.5
+    emittance: float = 3.75
+    gamma: float = 7460.52
+    tunes: str = "62.28_60.31"
+    locks: bool = False
+    incomplete: float = 0.0
+    random_seed: int = 42
+
+    @property
+    def amp_ranges(self) -> list[tuple[float, float]]:
+        edges = np.arange(self.amp_start, self.amp_stop + self.amp_step / 2, self.amp_step)
+        return list(itertools.pairwise(edges))
+
+    @property
+    def n_cases(self) -> int:
+        return self.seeds * self.angles * len(self.amp_ranges)
+
+    @property
+    def angles_deg(self) -> np.ndarray:
+        """Angles in degree, as calculated by SixDesk."""
+        return 90 * np.arange(1, self.angles + 1) / (self.angles + 1)
+
+
+def create_workspace(jobname: str, basedir: Path, spec: WorkspaceSpec) -> dict[str, int]:
+    """Create the synthetic workspace.
+
+    Returns:
+        Dict with the number of cases, particle pairs and incomplete cases written.
+    """
+    rng = np.random.default_rng(spec.random_seed)
+    sixjobs = get_sixjobs_path(jobname, basedir)
+    for directory in (*SIXJOBS_DIRS, f"studies/{jobname}"):
+        (sixjobs / directory).mkdir(parents=True, exist_ok=True)
+    get_scratch_sixtrack_input_path(jobname, basedir).mkdir(parents=True, exist_ok=True)
+    get_autosix_results_path(jobname, basedir).mkdir(exist_ok=True)
+
+    da = rng.normal(spec.da_mean, spec.da_spread, size=(spec.seeds, spec.angles))
+    cases, results = _create_results(spec, da, rng)
+    n_incomplete = _write_track_tree(jobname, basedir, spec, cases, results, rng)
+    _write_database(jobname, basedir, spec, cases, results, da)
+
+    if spec.locks:
+        lock_dirs = [get_workspace_path(jobname, basedir), sixjobs, sixjobs / "studies" / jobname]
+        lock_dirs += [get_track_path(jobname, basedir) / str(s) for s in range(1, spec.seeds + 1)]
+        for lock_dir in lock_dirs:
+            (lock_dir / SIXDESKLOCKFILE).write_text("synthetic lock\n")
+
+    return {"cases": spec.n_cases, "pairs": len(results), "incomplete": n_incomplete}
+
+
+# Helper -----------------------------------------------------------------------
+
+
+def _create_results(
+    spec: WorkspaceSpec, da: np.ndarray, rng: np.random.Generator
+) -> tuple[np.ndarray, np.ndarray]:
+    """Results of all particle pairs, as in the ``fort.10`` files.
+
+    Returns:
+        Cases (seed, angle-number, amp1, amp2) per particle pair and the ``fort.10`` results.
+    """
+    amp_ranges = np.array(spec.amp_ranges)
+    seeds, angles, ranges, pairs = np.meshgrid(
+        np.arange(1, spec.seeds + 1),
+        np.arange(1, spec.angles + 1),
+        np.arange(len(amp_ranges)),
+        np.arange(spec.pairs),
+        indexing="ij",
+    )
+    seeds, angles, ranges, pairs = (a.ravel() for a in (seeds, angles, ranges, pairs))
+    amp1, amp2 = amp_ranges[ranges].T
+    amp = amp1 + (amp2 - amp1) * (pairs + 1) / spec.pairs
+
+    theta = np.deg2rad(spec.angles_deg[angles - 1])
+    sigma = np.sqrt(spec.emittance / spec.gamma)  # with beta = 1m, see `dynamic_aperture`
+    lost = amp > da[seeds - 1, angles - 1]
+    loss_turn = rng.integers(1, spec.turns, size=len(amp))
+
+    results = np.zeros((len(amp), len(FORT10_COLUMNS)))
+    columns = {name: idx for idx, name in enumerate(FORT10_COLUMNS)}
+    results[:, columns["turn_max"]] = spec.turns
+    results[:, columns["betx"]] = 1.0
+    results[:, columns["bety"]] = 1.0
+    results[:, columns["sigx1"]] = amp * np.cos(theta) * sigma
+    results[:, columns["sigy1"]] = amp * np.sin(theta) * sigma
+    results[:, columns["sturns1"]] = np.where(lost, loss_turn, spec.turns)
+    results[:, columns["sturns2"]] = np.where(lost, loss_turn, spec.turns)
+    results[:, columns["qx"]] = float(spec.tunes.split("_")[0]) % 1
+    results[:, columns["qy"]] = float(spec.tunes.split("_")[1]) % 1
+    results[:, columns["sseed"]] = seeds
+
+    cases = np.column_stack([seeds, angles, amp1, amp2])
+    return cases, results
+
+
+def _write_track_tree(
+    jobname: str,
+    basedir: Path,
+    spec: WorkspaceSpec,
+    cases: np.ndarray,
+    results: np.ndarray,
+    rng: np.random.Generator,
+) -> int:
+    """Write the ``track`` tree, returns the number of incomplete cases."""
+    track = get_track_path(jobname, basedir)
+    turns_dir = f"e{int(np.log10(spec.turns)):d}"
+    n_incomplete = 0
+    for start in range(0, len(cases), spec.pairs):
+        seed, angle, amp1, amp2 = cases[start]
+        case_dir = (
+            track / f"{int(seed):d}" / "simul" / spec.tunes
+            / f"{amp1:g}_{amp2:g}" / turns_dir / f".{int(angle):d}"
+        )  # fmt: skip
+        case_dir.mkdir(parents=True)
+        for name in HTCONDOR_FILES:
+            (case_dir / name).write_text("")
+
+        if rng.random() < spec.incomplete:
+            n_incomplete += 1
+            continue
+
+        buffer = io.BytesIO()
+        np.savetxt(buffer, results[start : start + spec.pairs], fmt="%.17E")
+        (case_dir / "fort.10.gz").write_bytes(gzip.compress(buffer.getvalue(), compresslevel=1))
+    return n_incomplete
+
+
+def _write_database(
+    jobname: str,
+    basedir: Path,
+    spec: WorkspaceSpec,
+    cases: np.ndarray,
+    results: np.ndarray,
+    da: np.ndarray,
+):
+    """Write the ``da_post``, ``six_input`` and ``six_results`` tables into the database."""
+    columns = {name: idx for idx, name in enumerate(FORT10_COLUMNS)}
+    amp = np.hypot(results[:, columns["sigx1"]], results[:, columns["sigy1"]]) / np.sqrt(
+        spec.emittance / spec.gamma
+    )
+    amps = amp.reshape(spec.seeds, spec.angles, -1)
+    lost = amps > da[:, :, np.newaxis]
+    alost = np.where(lost, amps, np.inf).min(axis=2)
+    alost[np.isinf(alost)] = 0  # no particles lost
+    seeds, angles = np.meshgrid(np.arange(1, spec.seeds + 1), spec.angles_deg, indexing="ij")
+    da_post = np.column_stack(
+        [seeds.ravel(), angles.ravel(), alost.ravel(), alost.ravel(),
+         amps.min(axis=2).ravel(), amps.max(axis=2).ravel()]
+    )  # fmt: skip
+
+    case_ids = np.repeat(np.arange(1, len(cases) // spec.pairs + 1), spec.pairs)
+    six_input = cases[:: spec.pairs, :2]
+    result_columns = ["turn_max", "sturns1", "sturns2", "betx", "bety", "sigx1", "sigy1"]
+    six_results = np.column_stack(
+        [case_ids, results[:, [columns[name] for name in result_columns]]]
+    )
+
+    with closing(sqlite3.connect(get_database_path(jobname, basedir))) as db, db:
+        db.execute(
+            "CREATE TABLE da_post (seed INT, angle REAL, alost1 REAL, alost2 REAL, Amin REAL, Amax REAL)"
+        )
+        db.executemany("INSERT INTO da_post VALUES (?, ?, ?, ?, ?, ?)", da_post.tolist())
+        db.execute("CREATE TABLE six_input (id INTEGER PRIMARY KEY, seed INT, angle INT)")
+        db.executemany(
+            "INSERT INTO six_input VALUES (?, ?, ?)",
+            [(idx, int(s), int(a)) for idx, (s, a) in enumerate(six_input.tolist(), start=1)],
+        )
+        db.execute(
+            f"CREATE TABLE six_results (six_input_id INT, {', '.join(f'{c} REAL' for c in result_columns)})"
+        )
+        db.executemany(
+            f"INSERT INTO six_results VALUES ({', '.join('?' * (len(result_columns) + 1))})",
+            six_results.tolist(),
+        )
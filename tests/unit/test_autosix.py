@@ -1,28 +1,117 @@
+import gzip
+import json
 import logging
+import os
 import shutil
+import sqlite3
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from unittest.mock import patch
 
+import numpy as np
+import pandas as pd
+import pytest
 import tfs
+from matplotlib.collections import LineCollection
 
-from pylhc_submitter.autosix import _generate_jobs, run_job
+from pylhc_submitter.autosix import (
+    MAX_QUEUE_FAILURES,
+    _generate_jobs,
+    run_job,
+    run_jobs,
+    update_da_cube,
+    watch_jobs,
+)
 from pylhc_submitter.constants.autosix import (
+    ALOST1,
+    ALOST2,
+    AMP,
     ANGLE,
+    DA_COLUMNS,
+    HTCONDOR_RUNSIX_SUB,
+    MEAN,
+    MIN,
+    SEED,
+    STD,
     AutoSixEnvironment,
+    N,
+    StageSkipError,
+    StageStopError,
     get_autosix_results_path,
+    get_da_cache_path,
+    get_da_cube_path,
+    get_database_path,
+    get_log_path,
     get_mad6t1_mask_path,
     get_mad6t_mask_path,
     get_masks_path,
+    get_scratch_sixtrack_input_path,
     get_sixdeskenv_path,
+    get_sixjobs_path,
     get_stagefile_path,
     get_sysenv_path,
+    get_template_path,
+    get_tfs_da_angle_stats_path,
+    get_tfs_da_path,
+    get_track_path,
+    get_workspace_path,
 )
+from pylhc_submitter.sixdesk_tools import extract_data_from_db
 from pylhc_submitter.sixdesk_tools.create_workspace import (
+    create_sixdesk_overlay,
     remove_twiss_fail_check,
     set_max_materialize,
 )
-from pylhc_submitter.sixdesk_tools.post_process_da import plot_polar
-from pylhc_submitter.sixdesk_tools.stages import STAGE_ORDER, CreateJob, InitializeWorkspace
+from pylhc_submitter.sixdesk_tools.da_cube import create_da_cube, load_da_cube
+from pylhc_submitter.sixdesk_tools.dynamic_aperture import (
+    compute_da,
+    compute_da_vs_turns,
+    prepare_results,
+)
+from pylhc_submitter.sixdesk_tools.extract_data_from_db import extract_da_data_for_jobs
+from pylhc_submitter.sixdesk_tools.post_process_da import (
+    _create_stats_df,
+    create_da_tfs,
+    create_polar_plots_for_jobs,
+    plot_polar,
+    post_process_da_for_jobs,
+)
+from pylhc_submitter.sixdesk_tools.scheduler import (
+    balance_materialize_limits,
+    get_queued_jobs,
+    reserve_materialize_budget,
+)
+from pylhc_submitter.sixdesk_tools.shared_input import get_sixtrack_input_key
+from pylhc_submitter.sixdesk_tools.stage_store import (
+    COMPLETED,
+    SKIPPED,
+    WAITING,
+    get_completed_stages,
+    get_stage_history,
+    get_study_progress,
+    record_stage,
+    set_completed_stages,
+)
+from pylhc_submitter.sixdesk_tools.stages import (
+    STAGE_ORDER,
+    CheckSixtrackOutput,
+    CreateJob,
+    InitializeWorkspace,
+    PostProcess,
+    SubmitSixtrack,
+)
+from pylhc_submitter.sixdesk_tools.track_tree import audit_track_tree, write_incomplete_cases
+from pylhc_submitter.sixdesk_tools.tracking_results import (
+    FORT10_COLUMNS,
+    load_tracking_results,
+    read_tracking_results,
+)
+from pylhc_submitter.sixdesk_tools.utils import find_locks, is_locked
+from pylhc_submitter.utils.logging_tools import submit_in_context, thread_log_file
+from pylhc_submitter.utils.tracing import trace_run
 
 STAGE_NAMES = list(STAGE_ORDER.keys())
 
@@ -95,11 +184,545 @@ def test_create_workspace(tmp_path):
         autosix_result = get_autosix_results_path(jobname, tmp_path)
         assert autosix_result.exists()
 
-        stagefile = get_stagefile_path(jobname, tmp_path)
-        assert stagefile.exists()
+        completed_stages = get_completed_stages(jobname, tmp_path)
+        assert completed_stages == STAGE_NAMES[:3]
+
+
+def test_run_jobs_in_parallel(tmp_path, caplog):
+    """Tests that the workspaces are created in parallel and each gets its own log."""
+    caplog.set_level(logging.INFO)
+    jobdf = _generate_jobs(
+        tmp_path,
+        jobid_mask="job_%(PARAM1)s",
+        PARAM1=[1, 2, 3, 4],
+        TURNS=[10101],
+        AMPMIN=[2],
+        AMPMAX=[20],
+        AMPSTEP=[2],
+        ANGLES=[5],
+        SEED=["%SEEDRAN"],
+    )
+
+    mock_create, mock_submit = _create_subprocess_mocks(None, tmp_path)
+    with mock_create as create, mock_submit:
+        run_jobs(
+            jobdf,
+            env=AutoSixEnvironment(
+                working_directory=tmp_path,
+                mask_text="Just a mask %(PARAM1)s %(SEED)s",
+                executable=Path("somethingcomplicated/pathomatic"),
+                parallel_workspaces=3,
+            ),
+        )
+
+    # workspaces are copied from the template, which is created only once
+    create_calls = [call.args[0] for call in create.call_args_list]
+    assert sum("-N" in command for command in create_calls) == 1
+    assert (get_template_path(tmp_path) / "workspace-template").is_dir()
+
+    for jobname in jobdf.index:
+        assert get_completed_stages(jobname, tmp_path) == STAGE_NAMES[:3]
+        assert get_masks_path(jobname, tmp_path).is_dir()
+
+        log_text = get_log_path(jobname, tmp_path).read_text()
+        assert f"Job {jobname} " in log_text
+        assert all(f"Job {other} " not in log_text for other in jobdf.index if other != jobname)
+
+
+def test_thread_log_file_nested_pool(tmp_path):
+    """Tests that the messages of tasks submitted to a nested pool from within
+    the workspace log context are written into its file, but not those of other threads."""
+    log_path = tmp_path / "job.log"
+    log = logging.getLogger("test_nested_pool")
+    with thread_log_file(log_path), ThreadPoolExecutor(max_workers=2) as pool:
+        log.warning("outer message")
+        submit_in_context(pool, log.warning, "nested message").result()
+        pool.submit(log.warning, "unrelated message").result()
+
+    log_text = log_path.read_text()
+    assert "outer message" in log_text
+    assert "nested message" in log_text
+    assert "unrelated message" not in log_text
+
+
+def test_watch_jobs(tmp_path):
+    """Tests that the stages are continued, once the scheduler has no jobs queued anymore."""
+    jobdf = _generate_jobs(
+        tmp_path,
+        jobid_mask="job_%(PARAM1)s",
+        PARAM1=[1],
+        TURNS=[10101],
+        AMPMIN=[2],
+        AMPMAX=[20],
+        AMPSTEP=[2],
+        ANGLES=[5],
+        SEED=["%SEEDRAN"],
+    )
+    jobname = jobdf.index[0]
+
+    # not created yet, mask jobs running, mask jobs done, tracking jobs done
+    queue_states = iter([set(), {jobname}, set(), set()])
+    mock_queue = patch(
+        "pylhc_submitter.autosix.get_queued_jobs",
+        side_effect=lambda *args, **kwargs: next(queue_states),
+    )
+    mock_sleep = patch("pylhc_submitter.autosix.time.sleep")
+    mock_create, mock_submit = _create_subprocess_mocks(jobname, tmp_path)
+    with mock_create, mock_submit, mock_queue, mock_sleep as sleep:
+        watch_jobs(
+            jobdf,
+            env=AutoSixEnvironment(
+                working_directory=tmp_path,
+                mask_text="Just a mask %(PARAM1)s %(SEED)s",
+                executable=Path("somethingcomplicated/pathomatic"),
+                max_stage=STAGE_ORDER["check_sixtrack_output"],
+                watch_interval=1,
+            ),
+        )
+
+    assert sleep.call_count == 3
+    assert get_completed_stages(jobname, tmp_path) == STAGE_NAMES[:6]
+
+
+def test_watch_jobs_queue_failures(tmp_path):
+    """Tests that the watch stops with the error, once the scheduler queue
+    could not be queried several times in a row."""
+    jobdf = _generate_jobs(tmp_path, jobid_mask="job_%(PARAM1)s", PARAM1=[1])
+    mock_queue = patch(
+        "pylhc_submitter.autosix.get_queued_jobs", side_effect=OSError("condor_q failed")
+    )
+    mock_sleep = patch("pylhc_submitter.autosix.time.sleep")
+    env = AutoSixEnvironment(
+        working_directory=tmp_path, mask_text="Just a mask", executable=Path("exe")
+    )
+    with mock_queue as queue, mock_sleep, pytest.raises(OSError, match="condor_q failed"):
+        watch_jobs(jobdf, env=env)
+    assert queue.call_count == MAX_QUEUE_FAILURES
+
+
+def test_get_queued_jobs(tmp_path):
+    queue = (
+        f"{tmp_path}/scratch-0/sixtrack_input/workspace-job_1/job_1 -s\n"
+        f"{tmp_path}/scratch-0/workspace-job_10/track/1/simul 12 7\n"
+    )
+    with patch("pylhc_submitter.sixdesk_tools.scheduler.query_queue", return_value=queue):
+        queued = get_queued_jobs(["job_1", "job_10", "job_2", "job"], tmp_path)
+    assert queued == {"job_1", "job_10"}
+
+
+def test_share_sixtrack_input(tmp_path):
+    """Tests that workspaces differing only in their tracking settings
+    generate their sixtrack-input only once."""
+    jobdf = _generate_jobs(
+        tmp_path,
+        jobid_mask="job_%(TURNS)s",
+        TURNS=[1000, 10000],
+        AMPMIN=[2],
+        AMPMAX=[20],
+        AMPSTEP=[2],
+        ANGLES=[5],
+        SEED=["%SEEDRAN"],
+    )
+    owner, follower = jobdf.index
+    env = AutoSixEnvironment(
+        working_directory=tmp_path,
+        mask_text="Just a mask %(SEED)s",
+        executable=Path("somethingcomplicated/pathomatic"),
+        max_stage=STAGE_ORDER["check_input"],
+        share_sixtrack_input=True,
+    )
+
+    mock_create, mock_submit = _create_subprocess_mocks(None, tmp_path)
+    with mock_create, mock_submit as submit:
+        assert run_jobs(jobdf, env=env) == [owner, follower]  # both wait for the input
+
+        # input generated in owner
+        owner_input = get_scratch_sixtrack_input_path(owner, tmp_path)
+        owner_input.mkdir(parents=True)
+        for name in ("fort.2_1.gz", "fort.8_1.gz", "fort.16_1.gz"):
+            (owner_input / name).write_text(name)
+
+        assert run_jobs(jobdf, env=env) == []
+
+    submit_calls = [call.args[0] for call in submit.call_args_list]
+    assert sum("-s" in command for command in submit_calls) == 1  # mad6t.sh -s only once
+
+    follower_input = get_scratch_sixtrack_input_path(follower, tmp_path)
+    assert sorted(f.name for f in follower_input.glob("fort.*")) == sorted(
+        f.name for f in owner_input.glob("fort.*")
+    )
+    assert all(f.is_symlink() for f in follower_input.glob("fort.*"))
+    assert get_completed_stages(follower, tmp_path) == STAGE_NAMES[:4]
+
+
+def test_sixtrack_input_key_mad6t_substitutions(tmp_path):
+    """Tests that the sixdeskenv values substituted by mad6t.sh
+    change the key, if they are used in the mask."""
+    env = AutoSixEnvironment(working_directory=tmp_path, mask_text="", executable=Path("exe"))
+
+    def get_key(jobname: str, mask: str, emittance: float) -> str:
+        mask_path = get_masks_path(jobname, tmp_path) / f"{jobname}.mask"
+        mask_path.parent.mkdir(parents=True, exist_ok=True)
+        mask_path.write_text(mask)
+        get_sixdeskenv_path(jobname, tmp_path).write_text(
+            f"export bunch_charge=1.1500e+11\nexport emit={emittance:f}\nexport emit_beam=$emit\n"
+        )
+        return get_sixtrack_input_key(jobname, tmp_path, {"SEED": 1}, env)
+
+    mask = "beam, npart=%NPART, ex=%EMIT_BEAM;"
+    assert get_key("job_1", mask, 3.75) != get_key("job_2", mask, 2.5)
+    assert get_key("job_1", mask, 3.75) == get_key("job_2", mask, 3.75)
+    assert get_key("job_1", "beam;", 3.75) == get_key("job_2", "beam;", 2.5)
+
+
+def test_balance_materialize_limits(tmp_path):
+    """Tests that the budget is split by the outstanding jobs of the study's clusters."""
+    track = tmp_path / "scratch-0"
+    factories = (
+        f"11\t{track}/workspace-job_1/track\t300\t100\t50\n"  # 200 + 100 outstanding
+        f"12\t{track}/workspace-job_2/track\t100\t100\t50\n"  # 0 + 100 outstanding
+        f"13\t{track}/workspace-job_3/track\t100\t100\t50\n"  # finished
+        f"14\t/some/other/study/track\t100\t0\t50\n"  # not part of the study
+    )
+    queue = "".join(f"{cluster}\t{track}\tArgs\n" for cluster in [11] * 100 + [12] * 100)
+    edits = []
+
+    def condor_mock(command, ssh=None):
+        if command[0] == "condor_qedit":
+            edits.append(command[1:])
+            return ""
+        return factories if "-factory" in command else queue
+
+    with patch("pylhc_submitter.sixdesk_tools.scheduler._run_condor", side_effect=condor_mock):
+        limits = balance_materialize_limits(tmp_path, 400)
+
+    assert limits == {11: 300, 12: 100}
+    assert edits == [["11", "JobMaterializeLimit", "300"], ["12", "JobMaterializeLimit", "100"]]
+
+
+def test_balance_materialize_limits_small_budget(tmp_path):
+    """Tests that the limits never sum up to more than the budget, also if it is small,
+    and that a new workspace gets a share of the budget used by the others."""
+    track = tmp_path / "scratch-0"
+    factories = "".join(
+        f"{cluster}\t{track}/workspace-job_{cluster}/track\t{outstanding}\t0\tundefined\n"
+        for cluster, outstanding in ((11, 50), (12, 30), (13, 20))
+    )
+
+    def condor_mock(command, ssh=None):
+        if command[0] == "condor_qedit":
+            return ""
+        return factories if "-factory" in command else ""
+
+    with patch("pylhc_submitter.sixdesk_tools.scheduler._run_condor", side_effect=condor_mock):
+        assert reserve_materialize_budget(tmp_path, 100) == 25  # 75 left for the others
+        assert reserve_materialize_budget(tmp_path, 3) == 0  # nothing to share
+        assert balance_materialize_limits(tmp_path, 2) == {11: 1, 12: 1, 13: 0}
+        assert balance_materialize_limits(tmp_path, 10) == {11: 5, 12: 3, 13: 2}
+        assert balance_materialize_limits(tmp_path, 7) == {11: 4, 12: 2, 13: 1}
+
+
+def test_submit_sixtrack_materialize_budget(tmp_path):
+    """Tests that a new workspace is submitted with a provisional share of the budget,
+    taken from the other clusters, after which the budget is balanced among all clusters."""
+    jobname = "job_2"
+    env = AutoSixEnvironment(
+        working_directory=tmp_path,
+        mask_text="Just a mask",
+        executable=Path("exe"),
+        sixdesk_directory=_create_sixdesk_installation(tmp_path / "SixDesk"),
+        max_materialize_total=100,
+    )
+    track = tmp_path / "scratch-0"
+    factories = [f"11\t{track}/workspace-job_1/track\t300\t200\t100\n"]  # using the budget
+    queue = "".join(f"11\t{track}\tArgs\n" for _ in range(100))  # 200 outstanding
+    edits, subfiles = [], []
+
+    def condor_mock(command, ssh=None):
+        if command[0] == "condor_qedit":
+            edits.append(command[1:])
+            return ""
+        return "".join(factories) if "-factory" in command else queue
+
+    def run_six_mock(command, *args, **kwargs):
+        subfiles.append(Path(command[0]).parents[2] / HTCONDOR_RUNSIX_SUB)
+        factories.append(f"12\t{track}/workspace-{jobname}/track\t100\t0\t50\n")
+
+    set_completed_stages(jobname, tmp_path, STAGE_NAMES[: STAGE_NAMES.index("submit_sixtrack")])
+    with (
+        patch("pylhc_submitter.sixdesk_tools.scheduler._run_condor", side_effect=condor_mock),
+        patch("pylhc_submitter.sixdesk_tools.submit.start_subprocess", side_effect=run_six_mock),
+        pytest.raises(StageStopError),
+    ):
+        SubmitSixtrack(jobname, {}, env).run()
+
+    (subfile,) = subfiles
+    assert "\nmax_materialize = 50\n" in subfile.read_text()
+    assert edits == [
+        ["11", "JobMaterializeLimit", "50"],  # provisional share
+        ["11", "JobMaterializeLimit", "67"],  # balanced by outstanding jobs
+        ["12", "JobMaterializeLimit", "33"],
+    ]
+
+
+def test_check_sixtrack_output_budget_used(tmp_path):
+    """Tests that a finished workspace is checked with resubmit, without needing
+    materialization budget, even if it is fully used by another cluster."""
+    jobname = "job_1"
+    env = AutoSixEnvironment(
+        working_directory=tmp_path,
+        mask_text="Just a mask",
+        executable=Path("exe"),
+        resubmit=True,
+        max_materialize_total=100,
+    )
+    factories = f"12\t{tmp_path}/scratch-0/workspace-job_2/track\t300\t200\t100\n"
+    condor_mock = patch(
+        "pylhc_submitter.sixdesk_tools.scheduler._run_condor", return_value=factories
+    )
+
+    stage = CheckSixtrackOutput(jobname, {}, env)
+    set_completed_stages(jobname, tmp_path, STAGE_NAMES[: STAGE_NAMES.index(stage.name)])
+    with condor_mock as condor, patch("pylhc_submitter.sixdesk_tools.submit.start_subprocess"):
+        stage.run()
+    condor.assert_not_called()
+    assert get_completed_stages(jobname, tmp_path)[-1] == stage.name
+
+
+def test_find_locks(tmp_path):
+    """Tests that only the directories locked by SixDesk are checked,
+    unless a full scan is requested."""
+    jobname = "test_job"
+    sixjobs = get_sixjobs_path(jobname, tmp_path)
+    lock_dirs = [sixjobs, sixjobs / "studies" / jobname]
+    deep_lock_dir = get_track_path(jobname, tmp_path) / "1" / "simul" / "62.28_60.31"
+    for lock_dir in [*lock_dirs, deep_lock_dir]:
+        lock_dir.mkdir(parents=True, exist_ok=True)
+        (lock_dir / "sixdesklock").write_text("")
+
+    assert sorted(lock.parent for lock in find_locks(jobname, tmp_path)) == sorted(lock_dirs)
+    assert len(find_locks(jobname, tmp_path, full_scan=True)) == 3
+
+    assert is_locked(jobname, tmp_path, unlock=True) is False
+    assert find_locks(jobname, tmp_path) == []
+
+
+def test_audit_track_tree(tmp_path):
+    """Tests that all incomplete cases are found and grouped per seed and amplitude."""
+    jobname = "test_job"
+    track = get_track_path(jobname, tmp_path)
+    complete_files = ["htcondor.err", "htcondor.log", "htcondor.out", "fort.10.gz"]
+    cases = {
+        ("1", "2_4", ".30"): complete_files,
+        ("1", "2_4", ".60"): complete_files[:-1],  # no output
+        ("1", "4_6", ".30"): complete_files + ["JOB_NOT_YET_COMPLETED"],
+        ("2", "2_4", ".30"): complete_files[1:],  # missing htcondor file
+        ("2", "4_6", ".30"): complete_files,
+    }
+    for (seed, amps, angle), files in cases.items():
+        angle_dir = track / seed / "simul" / "62.28_60.31" / amps / "e5" / angle
+        angle_dir.mkdir(parents=True)
+        for name in files:
+            (angle_dir / name).write_text("")
+    (track / "3" / "simul").mkdir(parents=True)  # no tunes
+
+    report = audit_track_tree(jobname, tmp_path, max_workers=2)
+    assert not report.complete
+    assert report.n_cases == len(cases)
+    assert report.missing == [str(track / "3" / "simul")]
+    assert {seed: sorted(amps) for seed, amps in report.incomplete.items()} == {
+        "1": ["2_4", "4_6"],
+        "2": ["2_4"],
+    }
+    assert all(len(case.problems) == 1 for case in report.incomplete_cases())
+    assert "3 of 5 cases incomplete" in report.summary()
+
+    cases_path = write_incomplete_cases(report, tmp_path)
+    assert cases_path.read_text().split() == [
+        f"{jobname}%1%s%62.28_60.31%2_4%5%60",
+        f"{jobname}%1%s%62.28_60.31%4_6%5%30",
+        f"{jobname}%2%s%62.28_60.31%2_4%5%30",
+    ]
+
+
+def test_audit_track_tree_resubmitted(tmp_path):
+    """Tests that resubmitted cases, with the htcondor files of each submission, are complete."""
+    jobname = "test_job"
+    angle_dir = (
+        get_track_path(jobname, tmp_path) / "1" / "simul" / "62.28_60.31" / "2_4" / "e5" / ".30"
+    )
+    angle_dir.mkdir(parents=True)
+    for cluster_id in (1234, 5678):
+        for ext in ("out", "err", "log"):
+            (angle_dir / f"htcondor.{cluster_id:d}.0.{ext}").write_text("")
+    (angle_dir / "fort.10.gz").write_text("")
+
+    report = audit_track_tree(jobname, tmp_path)
+    assert report.n_cases == 1
+    assert report.complete
+
+
+def test_check_sixtrack_output_audit(tmp_path):
+    """Tests that run_status is only skipped while the audit finds cases without output,
+    and that other problems found by the audit are left to run_status.
+    The skipped stage is traced, but not as failed."""
+    jobname = "test_job"
+    env = AutoSixEnvironment(
+        working_directory=tmp_path,
+        mask_text="Just a mask",
+        executable=Path("somethingcomplicated/pathomatic"),
+    )
+    stage = CheckSixtrackOutput(jobname, {}, env)
+    angle_dir = (
+        get_track_path(jobname, tmp_path) / "1" / "simul" / "62.28_60.31" / "2_4" / "e5" / ".30"
+    )
+    angle_dir.mkdir(parents=True)
+    (angle_dir / "htcondor.1234.0.out").write_text("")  # htcondor files missing
+
+    set_completed_stages(jobname, tmp_path, STAGE_NAMES[: STAGE_NAMES.index(stage.name)])
+    trace_path = tmp_path / "trace.json"
 
-        stagefile_text = stagefile.read_text()
-        assert all(s in stagefile_text for s in STAGE_NAMES[:3])
+    with patch("pylhc_submitter.sixdesk_tools.submit.start_subprocess") as run_status:
+        with (
+            trace_run(trace_path),
+            pytest.raises(StageSkipError, match="1 of 1 cases without output"),
+        ):
+            stage.run()
+        run_status.assert_not_called()
+
+        (stage_span,) = json.loads(trace_path.read_text())["spans"]
+        assert stage_span["name"] == f"stage {stage.name}"
+        assert stage_span["status"] == "StageSkipError"
+        assert not stage_span["failed"]
+
+        (angle_dir / "fort.10.gz").write_text("")
+        stage._run()
+        run_status.assert_called_once()
+
+
+def test_audit_track_tree_index(tmp_path):
+    """Tests that unchanged directories are taken from the index and changed ones re-checked."""
+    jobname = "test_job"
+    track = get_track_path(jobname, tmp_path)
+    files = ["htcondor.err", "htcondor.log", "htcondor.out", "fort.10.gz"]
+    angle_dirs = []
+    for angle in range(1, 5):
+        angle_dir = track / "1" / "simul" / "62.28_60.31" / "2_4" / "e5" / f".{angle}"
+        angle_dir.mkdir(parents=True)
+        for name in files[: -1 if angle == 1 else None]:
+            (angle_dir / name).write_text("")
+        angle_dirs.append(angle_dir)
+
+    def set_old_mtimes(offset=0):
+        # directories modified just before the audit are not stored in the index
+        for path in [track, *track.rglob("*")]:
+            if path.is_dir():
+                os.utime(path, (1e9 + offset, 1e9 + offset))
+
+    set_old_mtimes()
+    report = audit_track_tree(jobname, tmp_path)
+    assert (report.n_cases, report.n_checked) == (4, 4)
+
+    report = audit_track_tree(jobname, tmp_path)
+    assert (report.n_cases, report.n_checked) == (4, 1)  # only the incomplete case
+
+    (angle_dirs[0] / "fort.10.gz").write_text("")
+    (angle_dirs[1] / "fort.10.gz").unlink()
+    set_old_mtimes(offset=1)
+    report = audit_track_tree(jobname, tmp_path)
+    assert [case.path for case in report.incomplete_cases()] == [angle_dirs[1]]
+    assert report.n_checked == 4  # all directories changed
+
+    report = audit_track_tree(jobname, tmp_path, use_index=False)
+    assert report.n_checked == 4
+
+
+def test_load_tracking_results(tmp_path):
+    """Tests loading fort.10 results from both output formats and skipping loaded seeds."""
+    jobname = "test_job"
+    track = get_track_path(jobname, tmp_path)
+    n_columns = len(FORT10_COLUMNS)
+    rng = np.random.default_rng(42)
+    expected = {}
+    for seed in (1, 2):
+        for angle in (1, 2):
+            angle_dir = track / str(seed) / "simul" / "62.28_60.31" / "2_4" / "e5" / f".{angle}"
+            angle_dir.mkdir(parents=True)
+            values = rng.random((3, n_columns))
+            content = "\n".join(" ".join(f"{v:.17E}" for v in row) for row in values).encode()
+            if angle == 1:
+                (angle_dir / "fort.10.gz").write_bytes(gzip.compress(content))
+            else:
+                with zipfile.ZipFile(angle_dir / "Sixout.zip", "w") as archive:
+                    archive.writestr("fort.10", content)
+            expected[(seed, angle)] = values
+
+    assert load_tracking_results(jobname, tmp_path, max_workers=2) == [1, 2]
+    assert load_tracking_results(jobname, tmp_path, max_workers=2) == []  # already loaded
+
+    df = read_tracking_results(jobname, tmp_path)
+    assert len(df) == 12
+    assert list(df.columns[:8]) == [
+        "seed",
+        "tunex",
+        "tuney",
+        "amp1",
+        "amp2",
+        "turns",
+        "angle",
+        "row",
+    ]
+    for (seed, angle), values in expected.items():
+        df_case = df[(df["seed"] == seed) & (df["angle"] == angle)]
+        assert (df_case["row"] == [1, 2, 3]).all()
+        assert (df_case[["tunex", "amp2", "turns"]] == [62.28, 4, 5]).all(axis=None)
+        assert np.allclose(df_case[list(FORT10_COLUMNS)], values)
+
+
+def test_compute_da():
+    """Tests the DA reduction and DA-vs-turns on a handcrafted set of particle pairs."""
+    turns = 1000
+    # (seed, angle, amplitude in sigma, turn of loss)
+    pairs = [
+        (1, 1, 2, turns),
+        (1, 1, 4, 500),  # lost island
+        (1, 1, 6, turns),
+        (1, 1, 8, 300),
+        (1, 1, 10, 100),
+        (1, 2, 2, turns),
+        (1, 2, 4, turns),  # nothing lost
+        (2, 1, 3, turns),
+        (2, 1, 5, 700),
+    ]
+    seed, angle, amp, lost = (np.array(column, dtype=float) for column in zip(*pairs))
+    emittance, gamma = 3.75, 7000.0
+    df_results = pd.DataFrame(
+        {
+            "seed": seed,
+            "angle": angle,
+            "turn_max": turns,
+            "sturns1": turns,
+            "sturns2": lost,
+            "betx": 100.0,
+            "bety": 100.0,
+            "sigx1": amp * np.sqrt(100 * emittance / gamma),  # only horizontal amplitude
+            "sigy1": 0.0,
+        }
+    )
+    df = prepare_results(df_results, emittance, gamma)
+    assert (df["angle"].unique() == [30, 60]).all()
+
+    df_da = compute_da(df).set_index(["seed", "angle"])
+    assert np.allclose(df_da["alost2"], [4, 0, 5])
+    assert np.allclose(df_da["alost1"], [8, 0, 5])
+    assert np.allclose(df_da["Amin"], [2, 2, 3])
+    assert np.allclose(df_da["Amax"], [10, 4, 5])
+
+    df_turns = compute_da_vs_turns(df, turnstep=250).set_index(["SEED", "ANGLE", "TURNS"])
+    assert np.allclose(df_turns.loc[(1, 30), "DA"], [10, 8, 4, 4])  # turns 250, 500, 750, 1000
+    assert np.allclose(df_turns.loc[(1, 60), "DA"], 4)
+    assert np.allclose(df_turns.loc[(2, 30), "DA"], [5, 5, 5, 5])
+    assert np.allclose(df_turns.loc[(2, 30)].index, [250, 500, 750, 1000])
 
 
 def test_create_workspace_stop_init(tmp_path):
@@ -129,16 +752,41 @@ def test_create_workspace_stop_init(tmp_path):
             },
         )
 
-        stagefile = get_stagefile_path(jobname, tmp_path)
-        assert stagefile.exists()
+        completed_stages = get_completed_stages(jobname, tmp_path)
+        assert CreateJob.name in completed_stages
+        assert InitializeWorkspace.name not in completed_stages
+
+        history = get_stage_history(jobname, tmp_path)
+        assert [run["stage"] for run in history] == [CreateJob.name, InitializeWorkspace.name]
+        assert [run["outcome"] for run in history] == [COMPLETED, SKIPPED]
+        assert all(run["start"] <= run["end"] for run in history)
+
+
+def test_record_repeated_stage_runs(tmp_path):
+    """Tests that consecutive waiting runs of a stage are collapsed into one history entry."""
+    jobname = "test_job"
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for minutes in range(3):
+        run_start = start + timedelta(minutes=minutes)
+        record_stage(
+            jobname, tmp_path, "check_input", run_start, run_start + timedelta(seconds=1), WAITING
+        )
+    end = start + timedelta(minutes=3)
+    record_stage(jobname, tmp_path, "check_input", start, end, COMPLETED)
 
-        stagefile_text = stagefile.read_text()
-        assert CreateJob.name in stagefile_text
-        assert InitializeWorkspace.name not in stagefile_text
+    waiting, completed = get_stage_history(jobname, tmp_path)
+    assert waiting["outcome"] == WAITING
+    assert waiting["runs"] == 3
+    assert waiting["start"] == start.isoformat()
+    assert waiting["end"] == (start + timedelta(minutes=2, seconds=1)).isoformat()
+    assert waiting["duration"] == 3
+    assert completed["outcome"] == COMPLETED
+    assert completed["runs"] == 1
 
 
 def test_skip_all_stages(tmp_path, caplog):
-    """Skips all stages but the last one, which prints "All stages run"."""
+    """Skips all stages but the last one, which prints "All stages run".
+    The stages are read from the stagefile of previous versions."""
     jobname = "test_job"
 
     stagefile = get_stagefile_path(jobname, tmp_path)
@@ -156,6 +804,7 @@ def test_skip_all_stages(tmp_path, caplog):
 
     assert all(ALREADY_RUN_LOG.format(s) in caplog.text for s in STAGE_NAMES[:-1])
     assert "All stages run." in caplog.text
+    assert get_study_progress(tmp_path) == {jobname: STAGE_NAMES[:-1]}  # migrated
 
 
 def test_max_stage(tmp_path, caplog):
@@ -167,9 +816,8 @@ def test_max_stage(tmp_path, caplog):
     max_stage = stages[-3]
     after_max_stages = stages[-2:]
 
-    stagefile = get_stagefile_path(jobname, tmp_path)
-    stagefile.parent.mkdir(parents=True)
-    stagefile.write_text("\n".join([str(s) for s in run_stages]))
+    get_workspace_path(jobname, tmp_path).mkdir(parents=True)
+    set_completed_stages(jobname, tmp_path, [str(s) for s in run_stages])
     with caplog.at_level(logging.INFO):
         run_job(
             jobname=jobname,
@@ -186,12 +834,135 @@ def test_max_stage(tmp_path, caplog):
     assert not any(PREVIOUS_MISSING_LOG.format(s) in caplog.text for s in STAGE_NAMES)
 
 
+def test_create_stats_df():
+    """Tests the statistics against the ones created by previous versions."""
+    df_da = tfs.read(DA_RESULTS_DIR / "da.tfs")
+    df_angles = tfs.read(DA_RESULTS_DIR / "da_per_angle.tfs", index=ANGLE)
+    df_stats = _create_stats_df(df_da, ANGLE)
+    assert df_stats.headers == df_angles.headers
+    pd.testing.assert_frame_equal(df_stats, df_angles, check_names=False, rtol=1e-10)
+
+    df_da.loc[df_da[SEED] == 2, ALOST2] = 0
+    df_seeds = _create_stats_df(df_da, SEED, global_index=0)
+    assert list(df_seeds.index) == list(range(61))
+    assert df_seeds.loc[0, f"{N}{ALOST2}"] == len(df_da) - 11
+    assert df_seeds.loc[2, f"{N}{ALOST2}"] == 0
+    assert df_seeds.loc[2, [f"{MEAN}{ALOST2}", f"{MIN}{AMP}"]].isna().all()
+    assert df_seeds.loc[0, f"{STD}{ALOST1}"] == df_da[ALOST1].std(ddof=0)
+
+
+def test_da_cube(tmp_path):
+    """Tests that the DA results of all workspaces end up at the right place in the cube."""
+    jobdf = _generate_jobs(
+        tmp_path, "job_%(PARAM1)s_%(PARAM2)s", PARAM1=[1, 2, 3], PARAM2=["a", "b"]
+    )
+    df_da = tfs.read(DA_RESULTS_DIR / "da.tfs")
+    for idx, jobname in enumerate(jobdf.index[:-1]):  # last job without results
+        da_path = get_tfs_da_path(jobname, tmp_path)
+        da_path.parent.mkdir(parents=True)
+        tfs.write(da_path, df_da.assign(**{ALOST1: df_da[ALOST1] + idx}))
+
+    create_da_cube(jobdf, tmp_path)
+    cube = load_da_cube(tmp_path)
+    assert cube.dims == ["PARAM1", "PARAM2", SEED, ANGLE, "DA_COLUMN"]
+    assert cube.data.shape == (3, 2, 60, 11, 2)
+    assert cube.coords["PARAM2"] == ["a", "b"]
+
+    df_da = df_da.sort_values([SEED, ANGLE])
+    seed_cube = cube.sel(PARAM1=2, PARAM2="b", DA_COLUMN=ALOST1)  # 4th job
+    assert seed_cube.dims == [SEED, ANGLE]
+    assert np.allclose(seed_cube.data.ravel(), df_da[ALOST1] + 3)
+    assert np.isnan(cube.sel(PARAM1=3, PARAM2="b").data).all()
+    assert cube.sel(PARAM1=[1, 3], SEED=1).data.shape == (2, 2, 11, 2)
+
+
+def test_update_da_cube(tmp_path):
+    """Tests that the DA cube is only created again, if any DA results are newer."""
+    jobdf = _generate_jobs(tmp_path, "job_%(PARAM1)s", PARAM1=[1, 2])
+    env = AutoSixEnvironment(working_directory=tmp_path, mask_text="", executable=Path("exe"))
+    cube_path = get_da_cube_path(tmp_path)
+
+    update_da_cube(jobdf, env)  # no DA results yet
+    assert not cube_path.exists()
+
+    da_path = get_tfs_da_path(jobdf.index[0], tmp_path)
+    da_path.parent.mkdir(parents=True)
+    tfs.write(da_path, tfs.read(DA_RESULTS_DIR / "da.tfs"))
+    update_da_cube(jobdf, env)
+    assert cube_path.exists()
+
+    with patch("pylhc_submitter.sixdesk_tools.da_cube.create_da_cube") as create_cube:
+        update_da_cube(jobdf, env)
+        create_cube.assert_not_called()
+
+        cube_time = cube_path.stat().st_mtime_ns
+        os.utime(da_path, ns=(cube_time + 10**9, cube_time + 10**9))
+        update_da_cube(jobdf, env)
+        create_cube.assert_called_once()
+
+
+def test_extract_da_data(tmp_path, monkeypatch):
+    """Tests the chunked, read-only extraction from the databases of multiple jobs."""
+    monkeypatch.setattr(extract_data_from_db, "CHUNK_SIZE", 100)
+    df_da = tfs.read(DA_RESULTS_DIR / "da.tfs")
+
+    jobnames = ["job_1", "job_2"]
+    for jobname in jobnames:
+        db_path = _write_da_database(jobname, tmp_path, df_da)
+    db_content = db_path.read_bytes()
+
+    results = extract_da_data_for_jobs(jobnames, tmp_path, max_workers=2)
+    assert list(results) == jobnames
+    for df_extracted in results.values():
+        assert df_extracted[SEED].dtype == np.int64
+        pd.testing.assert_frame_equal(
+            df_extracted, df_da.sort_values([SEED, ANGLE], ignore_index=True), check_like=False
+        )
+    assert db_path.read_bytes() == db_content
+
+
+def test_create_da_tfs_cache(tmp_path):
+    """Tests that the DA data is only extracted again, if the database has changed."""
+    jobname = "test_job"
+    df_da = tfs.read(DA_RESULTS_DIR / "da.tfs")
+    db_path = get_database_path(jobname, tmp_path)
+    db_path.parent.mkdir(parents=True)
+    db_path.write_text("")
+    get_autosix_results_path(jobname, tmp_path).mkdir()
+
+    with patch(
+        "pylhc_submitter.sixdesk_tools.post_process_da.extract_da_data", return_value=df_da
+    ) as mock_extract:
+        df_first = create_da_tfs(jobname, tmp_path)
+        df_cached = create_da_tfs(jobname, tmp_path)
+        assert mock_extract.call_count == 1
+        for df, df_expected in zip(df_cached, df_first):
+            pd.testing.assert_frame_equal(df, df_expected)
+            assert df.headers == df_expected.headers
+
+        os.utime(db_path, ns=(0, 0))
+        create_da_tfs(jobname, tmp_path)
+        assert mock_extract.call_count == 2
+
+        # cache of an incompatible version, i.e. unpickling fails
+        get_da_cache_path(jobname, tmp_path).write_bytes(b"cno_such_module\nNoSuchClass\n.")
+        df_new = create_da_tfs(jobname, tmp_path)
+        assert mock_extract.call_count == 3
+        pd.testing.assert_frame_equal(df_new[0], df_first[0])
+
+        create_da_tfs(jobname, tmp_path)
+        assert mock_extract.call_count == 3
+
+
 def test_polar_plot(tmp_path):
     df_angles = tfs.read(DA_RESULTS_DIR / "da_per_angle.tfs", index=ANGLE)
     df_da = tfs.read(DA_RESULTS_DIR / "da.tfs")
     fig = plot_polar(df_angles=df_angles, df_da=df_da, interpolated=False, fill=True)
     assert len(fig.axes) == 1
-    assert len(fig.axes[0].lines) == 63  # 60 Seeds, MEAN, MIN, MAX
+    assert len(fig.axes[0].lines) == 3  # MEAN, MIN, MAX
+    seed_lines = _get_line_collections(fig.axes[0])
+    assert len(seed_lines) == 1
+    assert len(seed_lines[0].get_segments()) == 60  # 60 Seeds
     # plt.show()
 
 
@@ -200,10 +971,123 @@ def test_polar_plot_interpolated(tmp_path):
     df_da = tfs.read(DA_RESULTS_DIR / "da.tfs")
     fig = plot_polar(df_angles=df_angles, df_da=df_da, interpolated=True, fill=False)
     assert len(fig.axes) == 1
-    assert len(fig.axes[0].lines) == 63  # 60 Seeds, MEAN, MIN, MAX
+    assert len(fig.axes[0].lines) == 3  # MEAN, MIN, MAX
+    seed_lines = _get_line_collections(fig.axes[0])
+    assert len(seed_lines) == 1
+    assert len(seed_lines[0].get_segments()) == 60  # 60 Seeds
+    assert all(len(segment) == 100 for segment in seed_lines[0].get_segments())
     # plt.show()
 
 
+def test_polar_plot_duplicated_seeds(caplog):
+    """Tests that duplicated seed/angle entries are only plotted once, with a warning."""
+    df_angles = tfs.read(DA_RESULTS_DIR / "da_per_angle.tfs", index=ANGLE)
+    df_da = tfs.read(DA_RESULTS_DIR / "da.tfs")
+    df_da = pd.concat([df_da, df_da.iloc[:3]], ignore_index=True)
+    fig = plot_polar(df_angles=df_angles, df_da=df_da, interpolated=False, fill=False)
+    seed_lines = _get_line_collections(fig.axes[0])
+    assert len(seed_lines[0].get_segments()) == 60  # 60 Seeds
+    assert "3 duplicated seed/angle entries" in caplog.text
+
+
+def test_polar_plots_for_jobs(tmp_path):
+    """Tests that the polar plots of multiple jobs are created in parallel."""
+    jobnames = ["test_job_1", "test_job_2"]
+    for jobname in jobnames:
+        get_autosix_results_path(jobname, tmp_path).mkdir(parents=True)
+        shutil.copy(DA_RESULTS_DIR / "da.tfs", get_tfs_da_path(jobname, tmp_path))
+        shutil.copy(
+            DA_RESULTS_DIR / "da_per_angle.tfs", get_tfs_da_angle_stats_path(jobname, tmp_path)
+        )
+
+    create_polar_plots_for_jobs(jobnames, tmp_path, max_workers=2)
+
+    for jobname in jobnames:
+        for da_col in DA_COLUMNS:
+            plot_path = get_autosix_results_path(jobname, tmp_path) / (
+                f"{jobname}_polar_plot_for_{da_col}.png"
+            )
+            assert plot_path.stat().st_size > 0
+
+
+def test_post_process_da_for_jobs(tmp_path):
+    """Tests that multiple jobs are post-processed at once and only changed databases are read."""
+    df_da = tfs.read(DA_RESULTS_DIR / "da.tfs")
+    jobnames = ["test_job_1", "test_job_2"]
+    for jobname in jobnames:
+        _write_da_database(jobname, tmp_path, df_da)
+        get_autosix_results_path(jobname, tmp_path).mkdir()
+
+    post_process_da_for_jobs(jobnames, tmp_path, max_workers=2)
+    for jobname in jobnames:
+        pd.testing.assert_frame_equal(
+            tfs.read(get_tfs_da_path(jobname, tmp_path)),
+            df_da.sort_values([SEED, ANGLE], ignore_index=True),
+        )
+        for da_col in DA_COLUMNS:
+            plot_path = get_autosix_results_path(jobname, tmp_path) / (
+                f"{jobname}_polar_plot_for_{da_col}.png"
+            )
+            assert plot_path.stat().st_size > 0
+
+    with patch(
+        "pylhc_submitter.sixdesk_tools.post_process_da.extract_da_data_for_jobs",
+        wraps=extract_da_data_for_jobs,
+    ) as mock_extract:
+        os.utime(get_database_path(jobnames[1], tmp_path), ns=(0, 0))
+        post_process_da_for_jobs(jobnames, tmp_path, max_workers=2)
+    assert mock_extract.call_args.args[0] == jobnames[1:]
+
+
+def test_run_jobs_post_process_at_once(tmp_path, caplog):
+    """Tests that, with parallel workspaces, the jobs ready for it are post-processed at once,
+    without checking their locks (or logging their banners) a second time."""
+    caplog.set_level(logging.INFO)
+    jobdf = _generate_jobs(
+        tmp_path,
+        jobid_mask="job_%(PARAM1)s",
+        PARAM1=[1, 2, 3],
+        TURNS=[10101],
+        AMPMIN=[2],
+        AMPMAX=[20],
+        AMPSTEP=[2],
+        ANGLES=[5],
+        SEED=["%SEEDRAN"],
+    )
+    post_process_index = STAGE_NAMES.index(PostProcess.name)
+    for jobname in jobdf.index:
+        get_workspace_path(jobname, tmp_path).mkdir(parents=True)
+        set_completed_stages(jobname, tmp_path, STAGE_NAMES[:post_process_index])
+    set_completed_stages("job_3", tmp_path, STAGE_NAMES[: post_process_index - 1])  # not ready
+
+    with (
+        patch(
+            "pylhc_submitter.sixdesk_tools.post_process_da.post_process_da_for_jobs"
+        ) as mock_post_process,
+        patch("pylhc_submitter.sixdesk_tools.submit.start_subprocess", side_effect=OSError),
+        patch("pylhc_submitter.autosix.is_locked", return_value=False) as mock_is_locked,
+    ):
+        run_jobs(
+            jobdf,
+            env=AutoSixEnvironment(
+                working_directory=tmp_path,
+                mask_text="Just a mask %(PARAM1)s %(SEED)s",
+                executable=Path("somethingcomplicated/pathomatic"),
+                parallel_workspaces=3,
+            ),
+        )
+
+    mock_post_process.assert_called_once()
+    assert mock_post_process.call_args.args[:2] == (["job_1", "job_2"], tmp_path)
+    for jobname in ("job_1", "job_2"):
+        assert get_completed_stages(jobname, tmp_path) == STAGE_NAMES[: post_process_index + 1]
+    assert get_completed_stages("job_3", tmp_path) == STAGE_NAMES[: post_process_index - 1]
+
+    assert sorted(call.args[0] for call in mock_is_locked.call_args_list) == list(jobdf.index)
+    for jobname in jobdf.index:
+        assert get_log_path(jobname, tmp_path).read_text().count(f"Job {jobname} ") == 2
+
+
 def test_twissfail_removal(tmp_path):
     jobname = "test_job"
     mad6t, mad6t1 = _create_mad6t_files(jobname, tmp_path)
@@ -243,19 +1127,69 @@ def test_max_materialize_setter(tmp_path):
     check_max_materialize_is(0)
 
 
+def test_max_materialize_in_overlay(tmp_path):
+    """Tests that max_materialize is only set in the SixDesk overlay of the workspace."""
+    sixdesk = _create_sixdesk_installation(tmp_path / "SixDesk")
+    subfile_path = sixdesk / HTCONDOR_RUNSIX_SUB
+
+    overlay = create_sixdesk_overlay("test_job", tmp_path, sixdesk=sixdesk)
+    set_max_materialize(overlay, 10)
+
+    assert "max_materialize" not in subfile_path.read_text()
+    assert "\nmax_materialize = 10\n" in (overlay / subfile_path.relative_to(sixdesk)).read_text()
+
+    assert not (overlay / "utilities" / "bash").is_symlink()
+    assert (overlay / "utilities" / "bash" / "run_six.sh").read_text() == "run_six"
+    assert (overlay / "utilities" / "externals").is_symlink()
+    assert (overlay / "utilities" / "templates" / "input").is_symlink()
+
+
 # Helper -----------------------------------------------------------------------
 
 
+def _write_da_database(jobname, basedir, df_da):
+    """Write the DA data into the ``da_post`` table of the database of the job."""
+    db_path = get_database_path(jobname, basedir)
+    db_path.parent.mkdir(parents=True)
+    with closing(sqlite3.connect(db_path)) as db:
+        df_db = df_da.set_axis(
+            ["seed", "angle", "alost1", "alost2", "Amin", "Amax"], axis="columns"
+        )
+        df_db.to_sql("da_post", db, index=False)
+    return db_path
+
+
+def _create_sixdesk_installation(sixdesk: Path) -> Path:
+    """Minimal SixDesk installation, to create overlays from."""
+    subfile_path = sixdesk / HTCONDOR_RUNSIX_SUB
+    subfile_path.parent.mkdir(parents=True)
+    shutil.copy(INPUTS / "sixdesk" / "htcondor_run_six.sub", subfile_path)
+    (sixdesk / "utilities" / "templates" / "input").mkdir()
+    (sixdesk / "utilities" / "bash").mkdir()
+    (sixdesk / "utilities" / "bash" / "run_six.sh").write_text("run_six")
+    (sixdesk / "utilities" / "externals").mkdir()
+    return sixdesk
+
+
+def _get_line_collections(ax):
+    return [c for c in ax.collections if isinstance(c, LineCollection)]
+
+
 def _create_subprocess_mocks(jobname, dirpath):
-    def subprocess_mock(*args, **kwargs):
+    def subprocess_mock(command, *args, cwd=None, **kwargs):
         dirpath.mkdir(exist_ok=True, parents=True)
-        get_masks_path(jobname, dirpath).mkdir(exist_ok=True, parents=True)
+        if "-N" in command:  # creation of a (new) workspace
+            new_job = command[command.index("-N") + 1].replace("workspace-", "", 1)
+            get_masks_path(new_job, cwd).mkdir(exist_ok=True, parents=True)
+        else:
+            get_masks_path(jobname, dirpath).mkdir(exist_ok=True, parents=True)
 
     mock_crate = patch(
-        "pylhc_submitter.sixdesk_tools.create_workspace.start_subprocess", new=subprocess_mock
+        "pylhc_submitter.sixdesk_tools.create_workspace.start_subprocess",
+        side_effect=subprocess_mock,
     )
     mock_submit = patch(
-        "pylhc_submitter.sixdesk_tools.submit.start_subprocess", new=subprocess_mock
+        "pylhc_submitter.sixdesk_tools.submit.start_subprocess", side_effect=subprocess_mock
     )
     return mock_crate, mock_submit
 
@@ -0,0 +1,88 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from pylhc_submitter.sixdesk_tools.stage_store import get_completed_stages
+
+HEAVY_MODULES = ("numpy", "pandas", "tfs", "scipy", "matplotlib", "htcondor", "htcondor2")
+PLOTTING_MODULES = ("scipy", "matplotlib")
+
+
+@pytest.mark.parametrize(
+    "module",
+    ["pylhc_submitter.job_submitter", "pylhc_submitter.autosix"],
+)
+def test_no_heavy_imports(module):
+    """Tests that the heavy dependencies are not loaded on import of the entrypoints,
+    so that they start quickly (e.g. for ``--help`` or the first stages)."""
+    code = f"import importlib\nimportlib.import_module({module!r})\n"
+    assert _get_loaded_modules(code, HEAVY_MODULES) == []
+
+
+def test_no_plotting_imports_early_stages(tmp_path):
+    """Tests that running the first stages of autosix, including the check of the
+    DA cube at the end, does not load the modules needed for the post-processing."""
+    code = (
+        "from pathlib import Path\n"
+        "from unittest.mock import patch\n"
+        "from pylhc_submitter.autosix import _generate_jobs, run_jobs, update_da_cube\n"
+        "from pylhc_submitter.constants.autosix import AutoSixEnvironment, get_masks_path\n"
+        "from pylhc_submitter.sixdesk_tools.stages import STAGE_ORDER\n"
+        f"basedir = Path({str(tmp_path)!r})\n"
+        "def create_workspace(command, *args, cwd=None, **kwargs):\n"
+        "    get_masks_path(command[-1].replace('workspace-', ''), cwd).mkdir(parents=True)\n"
+        "jobdf = _generate_jobs(\n"
+        "    basedir, 'job_%(PARAM1)s', PARAM1=[1, 2],\n"
+        "    TURNS=[1000], AMPMIN=[2], AMPMAX=[20], AMPSTEP=[2], ANGLES=[5], SEED=['%SEEDRAN'],\n"
+        ")\n"
+        "env = AutoSixEnvironment(\n"
+        "    working_directory=basedir, mask_text='mask %(PARAM1)s %(SEED)s', executable=Path('exe'),\n"
+        "    max_stage=STAGE_ORDER['create_job'], parallel_workspaces=2,\n"
+        ")\n"
+        "with patch('pylhc_submitter.sixdesk_tools.create_workspace.start_subprocess',\n"
+        "           side_effect=create_workspace):\n"
+        "    run_jobs(jobdf, env)\n"
+        "update_da_cube(jobdf, env)\n"
+    )
+    assert _get_loaded_modules(code, PLOTTING_MODULES) == []
+    assert get_completed_stages("job_1", tmp_path) == ["create_job"]
+
+
+def test_no_plotting_imports_main_early_stages(tmp_path):
+    """Tests that a full autosix run via ``main``, stopping before the post-processing,
+    does not load the modules needed for the post-processing."""
+    mask = tmp_path / "mask.mask"
+    mask.write_text("mask %(PARAM1)s %(SEED)s")
+    code = (
+        "from pathlib import Path\n"
+        "from unittest.mock import patch\n"
+        "from pylhc_submitter.autosix import main\n"
+        "from pylhc_submitter.constants.autosix import get_masks_path\n"
+        f"basedir = Path({str(tmp_path)!r})\n"
+        "def create_workspace(command, *args, cwd=None, **kwargs):\n"
+        "    get_masks_path(command[-1].replace('workspace-', ''), cwd).mkdir(parents=True)\n"
+        "with patch('pylhc_submitter.sixdesk_tools.create_workspace.start_subprocess',\n"
+        "           side_effect=create_workspace):\n"
+        "    main(\n"
+        f"        mask=Path({str(mask)!r}), working_directory=basedir, executable='exe',\n"
+        "        max_stage='create_job', jobid_mask='job_%(PARAM1)s',\n"
+        "        replace_dict=dict(\n"
+        "            PARAM1=[1, 2], TURNS=1000, AMPMIN=2, AMPMAX=20, AMPSTEP=2, ANGLES=5,\n"
+        "            SEED='%SEEDRAN',\n"
+        "        ),\n"
+        "    )\n"
+    )
+    assert _get_loaded_modules(code, PLOTTING_MODULES) == []
+    assert get_completed_stages("job_1", tmp_path) == ["create_job"]
+    assert get_completed_stages("job_2", tmp_path) == ["create_job"]
+
+
+def _get_loaded_modules(code: str, modules: tuple[str, ...]) -> list[str]:
+    """Run the code in a fresh interpreter and return which of the modules it has loaded."""
+    code += f"import json, sys\nprint(json.dumps([m for m in {modules!r} if m in sys.modules]))\n"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.splitlines()[-1])
@@ -0,0 +1,122 @@
+from pathlib import Path
+
+import pytest
+import tfs
+
+from pylhc_submitter.constants.job_submitter import (
+    COLUMN_JOB_DIRECTORY,
+    COLUMN_JOBID,
+    COLUMN_OUTPUT_FILE,
+    JOBSUMMARY_FILE,
+)
+from pylhc_submitter.job_collector import main as job_collect
+from pylhc_submitter.submitter.results import (
+    StudyResults,
+    get_manifest_path,
+    get_results_path,
+    read_manifest,
+)
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+OUTPUT_DIR = "Outputdata"
+PARAMS = {"PARAM1": ["a", "a", "b", "b"], "PARAM2": [1, 2, 1, 2]}
+
+
+def test_collect_results(tmp_path):
+    """Tests that the outputs of all finished jobs are collected together with their parameters."""
+    job_df = _create_study(tmp_path)
+    _write_job_outputs(tmp_path, job_df.index)
+
+    collected = job_collect(working_directory=tmp_path, num_processes=2)
+    assert sorted(collected) == sorted(job_df.index)
+
+    df = pq.read_table(get_results_path(tmp_path, "Results")).to_pandas()
+    assert len(df.index) == 3 * len(job_df.index)
+    for jobid, job in job_df.iterrows():
+        df_job = df.loc[df[COLUMN_JOBID] == jobid]
+        assert all(df_job["PARAM1"] == job["PARAM1"])
+        assert all(df_job["PARAM2"] == job["PARAM2"])
+        assert all(df_job[COLUMN_OUTPUT_FILE] == "out.tfs")
+        assert list(df_job["VALUE"]) == [job["PARAM2"] * i for i in range(3)]
+
+
+def test_collect_results_incrementally(tmp_path):
+    """Tests that re-running the collector only ingests the newly finished jobs."""
+    job_df = _create_study(tmp_path)
+    _write_job_outputs(tmp_path, job_df.index[:2])
+
+    first = job_collect(working_directory=tmp_path, num_processes=2)
+    assert sorted(first) == sorted(job_df.index[:2])
+
+    assert job_collect(working_directory=tmp_path, num_processes=2) == []
+
+    _write_job_outputs(tmp_path, job_df.index[2:])
+    second = job_collect(working_directory=tmp_path, num_processes=2)
+    assert sorted(second) == sorted(job_df.index[2:])
+
+    manifest = read_manifest(get_manifest_path(tmp_path, "Results"))
+    assert len(manifest["parts"]) == 2
+    assert sorted(manifest["jobs"]) == sorted(job_df.index)
+
+    df = pq.read_table(get_results_path(tmp_path, "Results")).to_pandas()
+    assert len(df.index) == 3 * len(job_df.index)
+
+    with pytest.raises(ValueError) as e:
+        job_collect(working_directory=tmp_path, file_pattern="*.dat")
+    assert "recollect" in str(e)
+
+    recollected = job_collect(working_directory=tmp_path, recollect=True)
+    assert sorted(recollected) == sorted(job_df.index)
+
+
+def test_study_results_query(tmp_path):
+    """Tests that the results are collected on first access and can be filtered
+    on the job-parameters, reading only the selected columns."""
+    job_df = _create_study(tmp_path)
+    _write_job_outputs(tmp_path, job_df.index)
+
+    study = StudyResults(tmp_path, num_processes=2)
+    assert get_manifest_path(tmp_path, "Results").is_file()
+    assert study.parameters == list(PARAMS.keys())
+
+    # each job is its own row-group, so that they can be skipped when filtering
+    part = next(get_results_path(tmp_path, "Results").glob("*.parquet"))
+    assert pq.ParquetFile(part).metadata.num_row_groups == len(job_df.index)
+
+    df = study.query(columns=["PARAM2", "VALUE"], PARAM1="a")
+    assert list(df.columns) == ["PARAM2", "VALUE"]
+    assert len(df.index) == 6
+
+    df = study.query(PARAM1="b", PARAM2=range(2, 10))
+    assert set(df[COLUMN_JOBID]) == {"b.2"}
+    assert list(df["VALUE"]) == [0, 2, 4]
+
+    assert study.query(PARAM1=["a", "b"], PARAM2=3).empty
+
+    with pytest.raises(KeyError) as e:
+        study.query(VALUE=2)
+    assert "VALUE" in str(e)
+
+
+# Helper -----------------------------------------------------------------------
+
+
+def _create_study(path: Path) -> tfs.TfsDataFrame:
+    """Creates a Jobs.tfs and job-directories as the job_submitter would."""
+    index = [f"{p1}.{p2}" for p1, p2 in zip(*PARAMS.values())]
+    job_df = tfs.TfsDataFrame(PARAMS, index=index)
+    job_df[COLUMN_JOB_DIRECTORY] = [str(path / f"Job.{jobid}") for jobid in index]
+    tfs.write(path / JOBSUMMARY_FILE, job_df, save_index=COLUMN_JOBID)
+    return job_df
+
+
+def _write_job_outputs(path: Path, jobids):
+    """Writes an output file per job, as the job itself would."""
+    for jobid in jobids:
+        output_dir = path / f"Job.{jobid}" / OUTPUT_DIR
+        output_dir.mkdir(parents=True)
+        param = int(jobid.split(".")[1])
+        tfs.write(
+            output_dir / "out.tfs", tfs.TfsDataFrame({"VALUE": [param * i for i in range(3)]})
+        )
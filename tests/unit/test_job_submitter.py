@@ -1,4 +1,5 @@
 import itertools
+import json
 from collections.abc import Sequence
 from dataclasses import asdict, dataclass, field
 from pathlib import Path
@@ -7,6 +8,7 @@ from typing import Any
 import numpy as np
 import pytest
 
+from pylhc_submitter.constants.job_submitter import TRACE_FILE
 from pylhc_submitter.job_submitter import main as job_submit
 from pylhc_submitter.submitter.iotools import uri_to_path
 from pylhc_submitter.utils.environment import on_linux, on_windows
@@ -42,6 +44,52 @@ def test_output_directory(tmp_path):
     job_submit(**asdict(setup))
 
 
+def test_trace_file(tmp_path):
+    """Tests that the timings of the phases of the run are written into the trace-file."""
+    setup = InputParameters(working_directory=tmp_path, run_local=True)
+    setup.create_mask(as_file=True)
+    job_submit(**asdict(setup))
+
+    trace = json.loads((tmp_path / TRACE_FILE).read_text())
+    spans = {span["name"]: span for span in trace["spans"]}
+    for name in ("generate_parameter_space", "create_folders", "write_job_scripts", "write_bash"):
+        assert spans[name]["parent"] == "create_jobs"
+        assert spans[name]["items"] == 6
+    assert spans["run_local"]["parent"] == "run_jobs"
+    for span in trace["spans"]:
+        assert span["seconds"] >= 0
+        assert span["status"] == "ok"
+        assert not span["failed"]
+        if on_linux():
+            assert span["peak_memory_growth_mb"] >= 0
+
+    summary = {entry["name"]: entry for entry in trace["summary"]}
+    assert summary.keys() == spans.keys()
+    assert summary["create_jobs"]["items"] == 6
+
+
+@run_only_on_linux
+def test_lazy_output_directory(tmp_path):
+    """Tests that with a lazy destination only the top-level destination is created
+    at submission and the jobs create their own destination directories when run."""
+    destination = tmp_path / "my_new_output" / "long_path"
+    setup = InputParameters(
+        working_directory=tmp_path,
+        dryrun=True,
+        run_local=True,
+        output_destination=destination,
+        lazy_destination=True,
+    )
+    setup.create_mask()
+    job_submit(**asdict(setup))
+    assert destination.is_dir()
+    assert not any(destination.glob("Job.*"))
+
+    setup.dryrun = False
+    job_submit(**asdict(setup))
+    _test_output(setup)
+
+
 def test_detects_wrong_uri(tmp_path):
     """Tests that wrong URI's are identified."""
     for test_uri in [
@@ -231,6 +279,7 @@ class InputParameters:
         default_factory=lambda: {"max_retries": "4", "some_other_argument": "some_other_parameter"}
     )
     output_destination: Path | None = None
+    lazy_destination: bool | None = False
     mask: Path | str = None  # will be set in create_mask
 
     def create_mask(